@@ -0,0 +1,225 @@
+"""百度翻译 API 本地模拟服务器，用于离线测试翻译客户端的吞吐量和延迟
+
+启动模拟服务器：
+    python benchmarks/baidu_mock_server.py --port 8765 --qps 10 --latency 80
+
+离线对比逐句请求与 BaiduTranslator（合并、连接池、限流）的表现：
+    python benchmarks/baidu_mock_server.py --bench 200 --qps 10 --latency 80
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class MockBaiduHandler(BaseHTTPRequestHandler):
+    """模拟 /api/trans/vip/translate：按行返回 trans_result，超出 QPS 返回 54003"""
+
+    def do_GET(self):
+        self.handle_translate(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode('utf-8')
+        self.handle_translate(parse_qs(body))
+
+    def handle_translate(self, params):
+        server = self.server
+        params = {k: v[0] for k, v in params.items()}
+        server.count_request()
+
+        if not server.admit():
+            server.rate_limited += 1
+            result = {'error_code': '54003', 'error_msg': 'Invalid Access Limit'}
+        elif not params.get('q'):
+            result = {'error_code': '54000', 'error_msg': 'Param q is empty'}
+        else:
+            lines = params['q'].split('\n')
+            time.sleep(server.latency + server.per_line_latency * len(lines))
+            to_lang = params.get('to', 'zh')
+            result = {
+                'from': params.get('from', 'auto'),
+                'to': to_lang,
+                'trans_result': [{
+                    'src': line,
+                    'dst': f"〔{to_lang}〕{line}"
+                } for line in lines]
+            }
+
+        payload = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockBaiduServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, qps=10, latency=0.08, per_line_latency=0.002):
+        super().__init__(address, MockBaiduHandler)
+        self.qps = qps
+        self.latency = latency
+        self.per_line_latency = per_line_latency
+        self.requests = 0
+        self.rate_limited = 0
+        self._window = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/trans/vip/translate"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def admit(self):
+        """滑动一秒窗口内的请求数不超过 QPS"""
+        with self._lock:
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 1.0:
+                self._window.popleft()
+            if len(self._window) >= self.qps:
+                return False
+            self._window.append(now)
+            return True
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def run_legacy(server, segments, interval, concurrency):
+    """旧实现：每句一个新的 requests.get，无连接复用、无合并"""
+    import requests
+
+    def translate(text, submitted):
+        try:
+            result = requests.get(server.url,
+                                  params={
+                                      'appid': 'bench',
+                                      'q': text,
+                                      'from': 'en',
+                                      'to': 'zh',
+                                      'salt': '1',
+                                      'sign': '-'
+                                  }).json()
+            ok = 'trans_result' in result
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - submitted
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = []
+        for text in segments:
+            futures.append(
+                executor.submit(translate, text, time.perf_counter()))
+            time.sleep(interval)
+        return [f.result() for f in futures]
+
+
+def run_client(server, segments, interval, qps):
+    """新实现：BaiduTranslator 合并请求、复用连接、令牌桶限流并退避重试"""
+    from realtime_stt_gui import BaiduTranslator
+
+    translator = BaiduTranslator('bench', 'bench', api_url=server.url, qps=qps)
+    pending = []
+    for text in segments:
+        submitted = time.perf_counter()
+        pending.append((translator.translate_async(text, 'en', 'zh'),
+                        submitted))
+        time.sleep(interval)
+
+    results = []
+    for future, submitted in pending:
+        dst = future.result()
+        results.append((dst is not None, time.perf_counter() - submitted))
+    return results
+
+
+def report(name, server, results, wall):
+    latencies = [latency * 1000 for ok, latency in results if ok]
+    failed = sum(1 for ok, _ in results if not ok)
+    print(f"{name}:")
+    print(f"  成功 {len(latencies)} / 失败 {failed}，耗时 {wall:.2f}s，"
+          f"吞吐 {len(latencies) / wall:.1f} 句/秒")
+    print(f"  HTTP 请求 {server.requests}，被限流 {server.rate_limited}")
+    print(f"  延迟 p50 {percentile(latencies, 50):.0f}ms，"
+          f"p95 {percentile(latencies, 95):.0f}ms，"
+          f"p99 {percentile(latencies, 99):.0f}ms")
+
+
+def run_bench(args):
+    segments = [f"segment {i}: this is a short utterance" for i in range(args.bench)]
+    for name, runner in (("逐句请求", lambda server: run_legacy(
+            server, segments, args.interval, args.concurrency)),
+                         ("BaiduTranslator", lambda server: run_client(
+                             server, segments, args.interval, args.qps))):
+        server = MockBaiduServer(('127.0.0.1', 0), args.qps,
+                                 args.latency / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        started = time.perf_counter()
+        results = runner(server)
+        report(name, server, results, time.perf_counter() - started)
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="百度翻译 API 本地模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--qps", type=int, default=10, help="模拟账户 QPS 上限")
+    parser.add_argument("--latency",
+                        type=float,
+                        default=80,
+                        help="模拟每个请求的服务端延迟(毫秒)")
+    parser.add_argument("--bench",
+                        type=int,
+                        default=0,
+                        metavar="N",
+                        help="发送 N 句对比逐句请求和 BaiduTranslator")
+    parser.add_argument("--interval",
+                        type=float,
+                        default=0.01,
+                        help="压测时句子到达间隔(秒)")
+    parser.add_argument("--concurrency",
+                        type=int,
+                        default=8,
+                        help="逐句请求的并发线程数")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_bench(args)
+        return
+
+    server = MockBaiduServer((args.host, args.port), args.qps,
+                             args.latency / 1000)
+    print(f"模拟百度翻译 API 已启动：{server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,413 @@
+"""转写引擎基准：在设置组合上回放音频样本，统计实时率、延迟、峰值内存和错误率
+
+    python benchmarks/bench_engine.py --models tiny base --beam-sizes 1 3 \\
+        --compute-types float32 int8 --output bench-results.json
+
+样本清单见 benchmarks/fixtures/manifest.json，音频文件放在同一目录下；
+可用 benchmarks/fetch_fixtures.py 下载公开语料的短句。没有录音时加 --synthetic
+用合成的类语音音频测量实时率、延迟和内存（不计算错误率）。
+每个设置组合在独立的子进程中运行，峰值内存互不影响；音频经与界面相同的
+文件输入路径（AudioFileSource + TranscriptionThread）送入录音器。
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import unicodedata
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURE_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+MANIFEST = os.path.join(FIXTURE_DIR, "manifest.json")
+SYNTHETIC_DIR = os.path.join(ROOT, "cache", "bench-synthetic")
+
+# 按字计算错误率的语言（没有空格分词）
+CHARACTER_LANGUAGES = ('zh', 'ja', 'ko')
+
+
+def normalize(text):
+    """统一全半角和大小写，去掉标点和空白以外的符号"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(c for c in text
+                   if not unicodedata.category(c).startswith(('P', 'S')))
+
+
+def edit_distance(reference, hypothesis):
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref in enumerate(reference, 1):
+        current = [i]
+        for j, hyp in enumerate(hypothesis, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1,
+                    previous[j - 1] + (ref != hyp)))
+        previous = current
+    return previous[-1]
+
+
+def error_counts(reference, hypothesis, language):
+    """返回 (指标名, 编辑距离, 参考长度)：中日韩为 CER，其他语言为 WER
+
+    没有参考文本（合成音频）时编辑距离和长度均为 0。
+    """
+    metric = 'cer' if language in CHARACTER_LANGUAGES else 'wer'
+    if reference is None:
+        return metric, 0, 0
+    if language in CHARACTER_LANGUAGES:
+        ref = list(normalize(reference).replace(" ", ""))
+        hyp = list(normalize(hypothesis).replace(" ", ""))
+        metric = 'cer'
+    else:
+        ref = normalize(reference).split()
+        hyp = normalize(hypothesis).split()
+        metric = 'wer'
+    return metric, edit_distance(ref, hyp), len(ref)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def rusage_peak_mb():
+    """本进程与已退出子进程的峰值常驻内存之和（MB）；不支持的平台返回 None
+
+    RealtimeSTT 的主模型在转写子进程中，只看 RUSAGE_SELF 会漏掉它。两者的
+    峰值不一定同时出现，因此是上界。子进程需已退出并被回收才计入。
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss +
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+class TreeRssSampler:
+    """后台定时采样本进程及子进程的常驻内存之和，记录峰值（需要 psutil）"""
+
+    def __init__(self, interval=0.2):
+        from realtime_stt_gui import process_tree_rss_mb
+        self.sample = process_tree_rss_mb
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        if self.sample() is not None:
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = self.sample()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        return self.peak
+
+
+def run_worker(job):
+    """子进程：加载一次模型，依次回放样本并输出 RESULT 行"""
+    from PyQt5.QtCore import QCoreApplication, Qt
+    import realtime_stt_gui as app
+
+    class BenchThread(app.TranscriptionThread):
+        """记录首个实时结果的时间，其他逻辑与界面使用的转录线程相同"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.speech_start = None
+            self.first_partial = None
+
+        def on_recorder_event(self, event):
+            if event == 'recording_start' and self.speech_start is None:
+                self.speech_start = time.monotonic()
+            super().on_recorder_event(event)
+
+        def on_realtime_update(self, text):
+            if text and self.first_partial is None:
+                self.first_partial = time.monotonic()
+            super().on_realtime_update(text)
+
+    qt_app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    sampler = TreeRssSampler().start()
+    settings = job['settings']
+    config = dict(app.DEFAULT_CONFIG,
+                  device=settings['device'],
+                  compute_type=settings['compute_type'],
+                  cpu_threads=settings['cpu_threads'],
+                  beam_size=settings['beam_size'],
+                  realtime_processing_pause=settings['realtime_processing_pause'],
+                  post_speech_silence_duration=settings[
+                      'post_speech_silence_duration'])
+
+    results = []
+    for fixture in job['fixtures']:
+        language = app.resolve_language(fixture['language'])
+        # 模型加载不计入转写耗时
+        key = app.make_recorder_key(settings['model'], language, config, True,
+                                    False)
+        app.RECORDER_POOL.preload(
+            key, app.build_recorder_kwargs(settings['model'], language,
+                                           config))
+
+        source = app.AudioFileSource([fixture['path']], job['pace'])
+        thread = BenchThread(model=settings['model'],
+                             enable_realtime=True,
+                             source=source)
+        thread.language = language
+        thread.config = dict(config)
+        segments = []
+        thread.text_signal.connect(
+            lambda text, speech_end: segments.append(
+                (text, speech_end, time.monotonic())), Qt.DirectConnection)
+
+        # 直接在本线程中运行转录循环，信号直接回调
+        thread.is_recording = True
+        started = time.monotonic()
+        thread.run()
+        elapsed = time.monotonic() - started
+
+        hypothesis = " ".join(text for text, _, _ in segments)
+        metric, errors, length = error_counts(fixture['reference'],
+                                              hypothesis, fixture['language'])
+        latencies = [(emitted - speech_end) * 1000
+                     for _, speech_end, emitted in segments
+                     if speech_end is not None]
+        results.append({
+            'id': fixture['id'],
+            'language': fixture['language'],
+            'audio_seconds': source.audio_seconds,
+            'elapsed_seconds': elapsed,
+            'rtf': elapsed / source.audio_seconds if source.audio_seconds else None,
+            'first_partial_ms': (thread.first_partial - thread.speech_start) *
+            1000 if thread.first_partial and thread.speech_start else None,
+            'final_latency_ms': latencies,
+            'segments': len(segments),
+            'hypothesis': hypothesis,
+            'reference': fixture['reference'],
+            'metric': metric,
+            'errors': errors,
+            'reference_length': length,
+            'error_rate': errors / length if length else None
+        })
+
+    sampled = sampler.stop()
+    app.RECORDER_POOL.shutdown()
+    qt_app.quit()
+    # 优先用采样得到的进程树峰值，没有 psutil 时退回 rusage 上界
+    print("RESULT " + json.dumps({
+        'fixtures': results,
+        'peak_rss_mb': sampled if sampled is not None else rusage_peak_mb(),
+        'rss_method': 'tree-sampled' if sampled is not None else 'rusage'
+    }, ensure_ascii=False), flush=True)
+
+
+def summarize(fixtures, peak_rss):
+    audio = sum(f['audio_seconds'] for f in fixtures)
+    latencies = [v for f in fixtures for v in f['final_latency_ms']]
+    partials = [f['first_partial_ms'] for f in fixtures
+                if f['first_partial_ms'] is not None]
+    error_rates = {}
+    for language in sorted({f['language'] for f in fixtures}):
+        items = [f for f in fixtures
+                 if f['language'] == language and f['reference'] is not None]
+        if not items:
+            continue
+        length = sum(f['reference_length'] for f in items)
+        error_rates[language] = {
+            'metric': items[0]['metric'],
+            'value': sum(f['errors'] for f in items) / length if length else None
+        }
+    return {
+        'rtf': sum(f['elapsed_seconds'] for f in fixtures) / audio
+        if audio else None,
+        'first_partial_ms_p50': percentile(partials, 0.5),
+        'final_latency_ms_p50': percentile(latencies, 0.5),
+        'final_latency_ms_p95': percentile(latencies, 0.95),
+        'peak_rss_mb': peak_rss,
+        'error_rates': error_rates
+    }
+
+
+def load_fixtures(manifest_path, languages):
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    available, missing = [], []
+    for fixture in manifest['fixtures']:
+        if languages and fixture['language'] not in languages:
+            continue
+        path = os.path.join(base, fixture['file'])
+        if os.path.exists(path):
+            available.append(dict(fixture, path=path))
+        else:
+            missing.append(fixture['file'])
+    return available, missing
+
+
+def synthetic_fixtures(languages):
+    """为每种语言生成一段合成类语音音频（没有参考文本）"""
+    from realtime_stt_gui import synthesize_speech
+    fixtures = []
+    for seed, language in enumerate(languages or ['zh', 'en', 'ja']):
+        path = os.path.join(SYNTHETIC_DIR, f"synthetic-{language}.wav")
+        if not os.path.exists(path):
+            synthesize_speech(path, seconds=12.0, seed=seed)
+        fixtures.append({
+            'id': f"synthetic-{language}",
+            'language': language,
+            'file': os.path.basename(path),
+            'reference': None,
+            'path': path
+        })
+    return fixtures
+
+
+def _fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--manifest", default=MANIFEST)
+    parser.add_argument("--languages", nargs="+", help="只运行这些语言的样本")
+    parser.add_argument("--synthetic",
+                        action="store_true",
+                        help="使用合成的类语音音频（不计算错误率）")
+    parser.add_argument("--models", nargs="+", default=["tiny"])
+    parser.add_argument("--beam-sizes", nargs="+", type=int, default=[3])
+    parser.add_argument("--compute-types", nargs="+", default=["float32"])
+    parser.add_argument("--pauses",
+                        nargs="+",
+                        type=float,
+                        default=[0.2],
+                        help="realtime_processing_pause")
+    parser.add_argument("--silences",
+                        nargs="+",
+                        type=float,
+                        default=[0.8],
+                        help="post_speech_silence_duration")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--cpu-threads",
+                        type=int,
+                        default=0,
+                        help="CPU 推理线程数，0 表示自动")
+    parser.add_argument("--pace",
+                        choices=["realtime", "fast"],
+                        default="fast",
+                        help="音频送入速度")
+    parser.add_argument("--timeout", type=float, default=1800,
+                        help="每个设置组合的超时（秒）")
+    parser.add_argument("--output",
+                        default=f"bench-engine-{datetime.now():%Y%m%d-%H%M%S}.json")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(json.loads(args.worker))
+        return 0
+
+    if args.synthetic:
+        fixtures, missing = synthetic_fixtures(args.languages), []
+    else:
+        fixtures, missing = load_fixtures(args.manifest, args.languages)
+    if missing:
+        print(f"缺少 {len(missing)} 个音频样本，已跳过：{', '.join(missing)}")
+    if not fixtures:
+        print(f"没有可用的音频样本，请按 {args.manifest} 放置音频文件，"
+              "或运行 benchmarks/fetch_fixtures.py 下载，"
+              "或加 --synthetic 使用合成音频")
+        return 1
+
+    matrix = [
+        dict(zip(('model', 'beam_size', 'compute_type',
+                  'realtime_processing_pause', 'post_speech_silence_duration'),
+                 combo), device=args.device, cpu_threads=args.cpu_threads)
+        for combo in itertools.product(args.models, args.beam_sizes,
+                                       args.compute_types, args.pauses,
+                                       args.silences)
+    ]
+    print(f"{len(fixtures)} 个样本 × {len(matrix)} 组设置，送入速度 {args.pace}\n")
+    print(f"{'model':<8}{'beam':>5}{'compute':>10}{'pause':>7}{'silence':>8}"
+          f"{'RTF':>7}{'首字ms':>8}{'p50ms':>8}{'p95ms':>8}{'RSS MB':>8}  错误率")
+
+    results = []
+    for settings in matrix:
+        job = {'settings': settings, 'fixtures': fixtures, 'pace': args.pace}
+        entry = {'settings': settings}
+        try:
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker",
+                 json.dumps(job, ensure_ascii=False)],
+                capture_output=True, text=True, timeout=args.timeout)
+            payload = None
+            for line in proc.stdout.splitlines():
+                if line.startswith("RESULT "):
+                    # 其他线程的输出可能落在同一行，只解析第一个 JSON 对象
+                    payload = json.JSONDecoder().raw_decode(line[7:])[0]
+            if payload is None:
+                raise RuntimeError(proc.stderr.strip().splitlines()[-1]
+                                   if proc.stderr.strip() else "子进程无输出")
+            entry['fixtures'] = payload['fixtures']
+            entry['summary'] = summarize(payload['fixtures'],
+                                         payload['peak_rss_mb'])
+            entry['summary']['rss_method'] = payload.get('rss_method')
+        except Exception as e:
+            entry['error'] = str(e)
+            print(f"{settings['model']:<8}{settings['beam_size']:>5}"
+                  f"{settings['compute_type']:>10}  运行失败: {e}")
+            results.append(entry)
+            continue
+
+        summary = entry['summary']
+        rates = ", ".join(
+            f"{lang} {rate['metric'].upper()} {_fmt(rate['value'], '.1%')}"
+            for lang, rate in summary['error_rates'].items())
+        print(f"{settings['model']:<8}{settings['beam_size']:>5}"
+              f"{settings['compute_type']:>10}"
+              f"{settings['realtime_processing_pause']:>7}"
+              f"{settings['post_speech_silence_duration']:>8}"
+              f"{_fmt(summary['rtf'], '.2f'):>7}"
+              f"{_fmt(summary['first_partial_ms_p50'], '.0f'):>8}"
+              f"{_fmt(summary['final_latency_ms_p50'], '.0f'):>8}"
+              f"{_fmt(summary['final_latency_ms_p95'], '.0f'):>8}"
+              f"{_fmt(summary['peak_rss_mb'], '.0f'):>8}  {rates}")
+        results.append(entry)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'manifest': None if args.synthetic else os.path.relpath(
+            args.manifest, ROOT),
+        'pace': args.pace,
+        'missing_fixtures': missing,
+        'results': results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""日语注音微基准：对比逐行调用 kakasi 的旧实现与 FuriganaAnnotator
+
+    python benchmarks/bench_furigana.py --lines 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 会议场景的日语语料：短句和固定说法大量重复
+CORPUS = [
+    "おはようございます。",
+    "はい、分かりました。",
+    "それでは会議を始めます。",
+    "今日の議題は三つあります。",
+    "まず先週の進捗について報告します。",
+    "開発チームは新しい機能の実装を完了しました。",
+    "テスト環境での検証はまだ終わっていません。",
+    "来週の月曜日までに資料を準備してください。",
+    "この件について何か質問はありますか。",
+    "予算の見直しが必要だと思います。",
+    "お客様からの要望を整理しました。",
+    "性能の問題は解決しましたか。",
+    "音声認識の精度が向上しました。",
+    "翻訳機能の遅延を短縮したいです。",
+    "次回の打ち合わせは木曜日の午後三時です。",
+    "すみません、もう一度説明していただけますか。",
+    "その方針で進めましょう。",
+    "担当者を決めておきます。",
+    "ありがとうございました。",
+    "以上で本日の会議を終了します。",
+]
+
+
+def legacy_add_furigana(kakasi, text):
+    """旧实现：每行整句转换，逐字符判断汉字，字符串累加"""
+    result = kakasi.convert(text)
+    annotated_text = ""
+    for item in result:
+        orig = item['orig']
+        hira = item['hira']
+        if orig != hira and any('\u4e00' <= c <= '\u9fff' for c in orig):
+            annotated_text += f"<span style='color: #0066cc'>{orig}({hira})</span>"
+        else:
+            annotated_text += orig
+    return annotated_text
+
+
+def make_lines(count, seed):
+    """随机拼接一到三句，模拟实际转写出的行"""
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice(CORPUS) for _ in range(rng.randint(1, 3)))
+        for _ in range(count)
+    ]
+
+
+def measure(name, annotate, lines):
+    started = time.perf_counter()
+    outputs = [annotate(line) for line in lines]
+    elapsed = time.perf_counter() - started
+    print(f"{name}: {len(lines) / elapsed:,.0f} 行/秒（{elapsed:.3f}s）")
+    return outputs, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日语注音微基准")
+    parser.add_argument("--lines", type=int, default=5000, help="测试行数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from pykakasi import kakasi
+    from realtime_stt_gui import FuriganaAnnotator
+
+    lines = make_lines(args.lines, args.seed)
+    legacy = kakasi()
+    annotator = FuriganaAnnotator()
+    annotator.load()
+
+    before, legacy_time = measure("旧实现", lambda t: legacy_add_furigana(legacy, t),
+                                  lines)
+    after, new_time = measure("FuriganaAnnotator", annotator.annotate, lines)
+
+    mismatches = sum(1 for a, b in zip(before, after) if a != b)
+    print(f"加速比 {legacy_time / new_time:.1f}x，缓存命中 {annotator.hits} / "
+          f"未命中 {annotator.misses}，输出不一致 {mismatches} 行")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""下载基准测试用的短句录音：从 FLEURS 测试集取每种语言的前几句
+
+需要 datasets 库（pip install "datasets<4" soundfile）。音频写入
+benchmarks/fixtures/fleurs/，并生成同目录下的样本清单：
+
+    python benchmarks/fetch_fixtures.py --count 3
+    python benchmarks/bench_engine.py --manifest benchmarks/fixtures/fleurs/manifest.json
+"""
+import argparse
+import json
+import os
+import sys
+import wave
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "fleurs")
+
+# 基准语言代码 -> FLEURS 配置名
+FLEURS_CONFIGS = {
+    'zh': 'cmn_hans_cn',
+    'en': 'en_us',
+    'ja': 'ja_jp',
+}
+
+
+def write_wav(path, samples, sample_rate):
+    """把 [-1, 1] 浮点样本写成 16 kHz 单声道 16 位 WAV"""
+    import numpy as np
+    samples = np.asarray(samples, dtype=np.float32)
+    if sample_rate != 16000:
+        target = int(len(samples) * 16000 / sample_rate)
+        samples = np.interp(np.linspace(0, len(samples) - 1, target),
+                            np.arange(len(samples)), samples)
+    pcm = (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(pcm.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--languages",
+                        nargs="+",
+                        default=list(FLEURS_CONFIGS),
+                        choices=list(FLEURS_CONFIGS))
+    parser.add_argument("--count", type=int, default=2, help="每种语言的句数")
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    try:
+        from datasets import load_dataset
+    except ImportError:
+        print("需要 datasets 库：pip install \"datasets<4\" soundfile")
+        return 1
+
+    os.makedirs(args.output, exist_ok=True)
+    fixtures = []
+    for language in args.languages:
+        config = FLEURS_CONFIGS[language]
+        print(f"正在下载 FLEURS {config} ...")
+        try:
+            dataset = load_dataset("google/fleurs",
+                                   config,
+                                   split="test",
+                                   streaming=True,
+                                   trust_remote_code=True)
+            for index, item in enumerate(dataset):
+                if index >= args.count:
+                    break
+                name = f"fleurs-{language}-{index + 1:02d}.wav"
+                write_wav(os.path.join(args.output, name),
+                          item['audio']['array'],
+                          item['audio']['sampling_rate'])
+                fixtures.append({
+                    'id': name[:-4],
+                    'language': language,
+                    'file': name,
+                    'reference': item['raw_transcription']
+                })
+        except Exception as e:
+            print(f"下载 {config} 失败: {e}")
+
+    if not fixtures:
+        return 1
+    manifest = os.path.join(args.output, "manifest.json")
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump({'sample_rate': 16000, 'fixtures': fixtures},
+                  f,
+                  ensure_ascii=False,
+                  indent=2)
+    print(f"已写入 {len(fixtures)} 个样本，清单 {manifest}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""多客户端转写服务压测：多个客户端同时按实时速度推送同一段音频
+
+先启动服务：
+    python realtime_stt_gui.py --server --model base --compute-type int8
+
+再用 8 个客户端推送 16 kHz 单声道 16 位 WAV：
+    python benchmarks/server_load.py samples/meeting.wav --clients 8 --language ja
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realtime_stt_gui import (FRAME_AUDIO, FRAME_END, FRAME_JSON, recv_frame,
+                              send_frame)
+
+CHUNK_SECONDS = 0.1
+
+
+def read_pcm(path):
+    with wave.open(path, "rb") as f:
+        if (f.getframerate(), f.getnchannels(), f.getsampwidth()) != (16000, 1,
+                                                                       2):
+            raise ValueError("需要 16 kHz 单声道 16 位 PCM WAV")
+        return f.readframes(f.getnframes())
+
+
+def run_client(index, args, pcm, results):
+    sock = socket.create_connection((args.host, args.port))
+    hello = {'language': args.language, 'translate': args.translate}
+    send_frame(sock, FRAME_JSON, json.dumps(hello).encode())
+    stream = sock.makefile('rb')
+    stats = {'finals': 0, 'partials': 0, 'latencies': [], 'error': None}
+    results[index] = stats
+
+    def receive():
+        while True:
+            kind, payload = recv_frame(stream)
+            if kind is None:
+                return
+            message = json.loads(payload)
+            if message['type'] == 'final':
+                stats['finals'] += 1
+                if message['latency_ms'] is not None:
+                    stats['latencies'].append(message['latency_ms'])
+                if args.verbose:
+                    print(f"[{index}] {message['text']}")
+            elif message['type'] == 'partial':
+                stats['partials'] += 1
+            elif message['type'] == 'error':
+                stats['error'] = message['error']
+                return
+            elif message['type'] == 'end':
+                stats['dropped'] = message['dropped']
+                return
+
+    receiver = threading.Thread(target=receive)
+    receiver.start()
+    step = int(16000 * CHUNK_SECONDS) * 2
+    next_at = time.monotonic()
+    try:
+        for start in range(0, len(pcm), step):
+            send_frame(sock, FRAME_AUDIO, pcm[start:start + step])
+            next_at += CHUNK_SECONDS
+            time.sleep(max(0.0, next_at - time.monotonic()))
+        send_frame(sock, FRAME_END, b"")
+    except OSError:
+        pass  # 被服务端拒绝或断开
+    receiver.join()
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("wav")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--language", default="自动检测")
+    parser.add_argument("--translate", action="store_true")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    pcm = read_pcm(args.wav)
+    results = {}
+    threads = [
+        threading.Thread(target=run_client, args=(i, args, pcm, results))
+        for i in range(args.clients)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"{args.clients} 个客户端，音频 {len(pcm) / 32000:.1f}秒，"
+          f"总耗时 {time.monotonic() - started:.1f}秒")
+    for index in sorted(results):
+        stats = results[index]
+        if stats['error']:
+            print(f"  客户端 {index}: 被拒绝（{stats['error']}）")
+            continue
+        latencies = sorted(stats['latencies'])
+        p50 = latencies[len(latencies) // 2] if latencies else 0
+        worst = latencies[-1] if latencies else 0
+        print(f"  客户端 {index}: 整句 {stats['finals']}，预览 {stats['partials']}，"
+              f"丢弃 {stats.get('dropped', 0)}，延迟 p50 {p50:.0f} ms / "
+              f"最大 {worst:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,108 +1,1878 @@
+import time
+
+_STARTUP_T0 = time.perf_counter()  # 启动计时起点
+
 import sys
 import os
+import argparse
+import platform
+import glob
+import gzip
 import json
+import shutil
 import hashlib
 import random
-import requests
+import queue
 import re
+import socketserver
+import sqlite3
+import struct
+import subprocess
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QPushButton, QTextEdit, QComboBox, QLabel,
                              QCheckBox, QHBoxLayout, QFrame, QDialog,
                              QTabWidget, QSpinBox, QDoubleSpinBox, QGridLayout,
-                             QGroupBox, QLineEdit)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QThreadPool, QRunnable
-from PyQt5.QtGui import QColor
-from RealtimeSTT import AudioToTextRecorder
-
-try:
-    from pykakasi import kakasi
-    KAKASI = kakasi()
-except ImportError:
-    print("请安装 pykakasi 库以支持日语注音功能：pip install pykakasi")
-    KAKASI = None
+                             QGroupBox, QLineEdit, QListView, QTableWidget,
+                             QTableWidgetItem, QFileDialog, QHeaderView)
+from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QThreadPool, QRunnable,
+                          QObject, QTimer, QAbstractListModel, QModelIndex)
+from PyQt5.QtGui import QColor, QTextCursor
+
+# torch、RealtimeSTT、requests 等重量级依赖在后台或首次使用时才导入
+_STARTUP_IMPORTED = time.perf_counter()
 
 # 创建日志文件夹和固定日志文件
 LOG_DIR = "logs"
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
-LOG_FILE = os.path.join(LOG_DIR, "transcript.md")
+# 转写日志分段文件名前缀
+LOG_SEGMENT_PREFIX = "transcript-"
+# 分段存储之前的单一日志文件，首次启动时改名为 LEGACY_LOG_NAME 并建立索引
+LEGACY_LOG_FILE = "transcript.md"
+LEGACY_LOG_NAME = LOG_SEGMENT_PREFIX + "legacy.md"
+LEGACY_SESSION_RE = re.compile(
+    r'^### (?:🆕 新会话 `(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})`'
+    r'|🎬 录音开始 `(\d{2}:\d{2}:\d{2})`)')
+# 结构化转写记录文件名前缀（每天一个 JSONL 文件）
+SEGMENT_FILE_PREFIX = "segments-"
+
+# 缓存文件夹（翻译缓存等）
+CACHE_DIR = "cache"
+TRANSLATION_CACHE_FILE = os.path.join(CACHE_DIR, "translations.sqlite3")
+SEARCH_INDEX_FILE = os.path.join(CACHE_DIR, "search.sqlite3")
+MODEL_MEMORY_FILE = os.path.join(CACHE_DIR, "model_memory.json")
+ENGINE_PROFILE_FILE = "engine_profile.json"
+CALIBRATION_MANIFEST = os.path.join("benchmarks", "fixtures", "manifest.json")
 
 # 百度翻译 API 配置
 BAIDU_APPID = "20241206002221379"  # 替换为你的百度翻译 API ID
 BAIDU_KEY = "p0Fns03NOhQ7PLSL3QBc"  # 替换为你的百度翻译密钥
 BAIDU_API_URL = "https://fanyi-api.baidu.com/api/trans/vip/translate"
 
+# 界面语言到 Whisper 语言代码的映射
+LANGUAGE_MAP = {
+    '自动检测': None,
+    '中文 (Chinese)': 'zh',
+    '英语 (English)': 'en',
+    '日语 (Japanese)': 'ja',
+    '韩语 (Korean)': 'ko',
+    '俄语 (Russian)': 'ru',
+    '德语 (German)': 'de',
+    '法语 (French)': 'fr',
+    '西班牙语 (Spanish)': 'es'
+}
+
+# 界面语言到百度翻译源语言代码的映射
+BAIDU_FROM_LANG = {
+    "英语 (English)": "en",
+    "日语 (Japanese)": "jp",
+    "韩语 (Korean)": "kor",
+    "俄语 (Russian)": "ru",
+    "德语 (German)": "de",
+    "法语 (French)": "fra",
+    "西班牙语 (Spanish)": "spa",
+    "自动检测": "auto"
+}
+
+# 目标语言到百度翻译语言代码的映射
+BAIDU_TO_LANG = {
+    "中文": "zh",
+    "英语": "en",
+    "日语": "jp",
+    "韩语": "kor",
+    "俄语": "ru",
+    "德语": "de",
+    "法语": "fra",
+    "西班牙语": "spa"
+}
+
+# 默认配置，界面和批量模式共用
+DEFAULT_CONFIG = {
+    'silero_sensitivity': 0.8,  # 默认灵敏度调整为 0.8
+    'post_speech_silence_duration': 0.8,  # 默认静音检测调整为 0.8s
+    'min_length_of_recording': 0.5,
+    'beam_size': 3,
+    'realtime_model': 'tiny',  # 实时预览使用的模型，空字符串表示与主模型相同
+    'beam_size_realtime': 3,
+    'realtime_processing_pause': 0.2,
+    'device': 'cpu',
+    'compute_type': 'float32',  # 默认使用 float32
+    'cpu_threads': 0,  # CPU 推理线程数，0 表示自动
+    'num_workers': 1,  # 可并行转写的模型实例数
+    'recorder_pool_memory_mb': 4096,  # 常驻模型内存上限
+    'preload_model': True,  # 后台预加载所选模型
+    'enable_translation': True,
+    'translation_backend': 'baidu',  # 翻译后端：baidu / local
+    'local_translation_dir': os.path.join("models", "translation"),  # 本地翻译模型目录
+    'local_translation_threads': 0,  # 本地翻译推理线程数，0 表示自动
+    'local_translation_beam_size': 2,
+    'baidu_appid': BAIDU_APPID,
+    'baidu_key': BAIDU_KEY,
+    'baidu_qps': 1,  # 百度翻译账户的 QPS 上限
+    'translation_concurrency': 4,  # 同时进行的翻译请求数
+    'translation_queue_size': 64,  # 等待输出的翻译条数上限
+    'translation_deadline': 8.0,  # 单句翻译截止时间(秒)，超时跳过
+    'translation_drain_timeout': 5.0,  # 停止录音时等待剩余翻译的时间(秒)
+    'speculative_translation': False,  # 说话过程中翻译实时预览中已稳定的部分
+    'speculative_agreement': 2,  # 连续几次实时结果一致的前缀视为稳定
+    'log_fsync_policy': 'session',  # 日志 fsync 策略：none / session / interval
+    'log_fsync_interval': 5.0,  # 定时 fsync 的间隔(秒)
+    'log_rotation': 'daily',  # 日志分段方式：daily / size
+    'log_max_segment_mb': 64,  # 按大小分段时每个文件的上限(MB)
+    'log_retention_days': 0,  # 日志保留天数，0 表示永久保留
+    'log_compress': True,  # 后台压缩已关闭的日志分段
+    'metrics_textfile': "",  # 定期导出延迟统计的路径（.prom 或 .json），留空不导出
+    'metrics_export_interval': 15.0,  # 延迟统计导出间隔（秒）
+    'engine_process': True,  # 在独立进程中运行识别引擎，界面不受推理影响
+    'audio_buffer_seconds': 10.0,  # 音频环形缓冲区容量（秒）
+    'audio_overflow_policy': 'drop_oldest',  # 缓冲区写满时：drop_oldest / drop_newest / block
+    'latency_target': 2.0,  # 自动调优的语音结束到出字延迟目标（秒）
+    'server_max_segment_seconds': 30.0,  # 服务模式下单句最长时长，超过时强制切分
+    'view_max_segments': 2000,  # 完整转写视图在内存中保留的句数
+    'target_language': '中文'
+}
+
+# 批量转写支持的音频格式
+AUDIO_EXTENSIONS = ('.wav', '.flac')
+
+# 输入来源：显示名称 -> 送入速度（None 表示麦克风）
+INPUT_SOURCES = {
+    "麦克风": None,
+    "音频文件（实时速度）": 'realtime',
+    "音频文件（最快速度）": 'fast'
+}
+
+# 各模型常驻内存的粗略估计（MB），用于常驻引擎池的内存预算
+MODEL_MEMORY_MB = {
+    'tiny': 150,
+    'base': 300,
+    'small': 900,
+    'medium': 2600,
+    'large': 5200
+}
+
+# 各设备可选的计算精度（第一个为推荐值）
+DEVICE_COMPUTE_TYPES = {
+    'cpu': ["int8", "int8_float32", "int16", "float32"],
+    'cuda': ["float16", "int8_float16", "int8", "float32"]
+}
+
+# 相对 float32 的权重内存比例，尚未实测时用于估计
+COMPUTE_TYPE_MEMORY_RATIO = {
+    'float32': 1.0,
+    'float16': 0.5,
+    'int16': 0.5,
+    'int8_float16': 0.3,
+    'int8_float32': 0.3,
+    'int8': 0.3
+}
+
+_MEASURED_MEMORY = None
+_MEASURED_MEMORY_LOCK = threading.Lock()
+
+
+def _measured_memory():
+    """加载实测的模型内存表（需持有锁）"""
+    global _MEASURED_MEMORY
+    if _MEASURED_MEMORY is None:
+        try:
+            with open(MODEL_MEMORY_FILE, "r", encoding="utf-8") as f:
+                _MEASURED_MEMORY = json.load(f)
+        except (OSError, ValueError):
+            _MEASURED_MEMORY = {}
+    return _MEASURED_MEMORY
+
+
+def measured_model_memory(model, device, compute_type):
+    """返回实测的录音器加载内存（MB），未测量过时返回 None
+
+    实测值是加载整个录音器前后进程树常驻内存之差，除模型权重外还包括 VAD
+    模型、torch 等运行时和单独加载的实时模型，比模型本身大。
+    """
+    with _MEASURED_MEMORY_LOCK:
+        return _measured_memory().get(f"{model}/{device}/{compute_type}")
+
+
+def model_memory_mb(model, device, compute_type):
+    """模型常驻内存：优先使用实测值，否则按精度比例估计"""
+    measured = measured_model_memory(model, device, compute_type)
+    if measured:
+        return measured
+    return MODEL_MEMORY_MB.get(model, 1000) * COMPUTE_TYPE_MEMORY_RATIO.get(
+        compute_type, 1.0)
+
+
+def recorder_memory_mb(model, realtime_model, device, compute_type):
+    """录音器的总内存：主模型加上单独加载的实时模型"""
+    if not realtime_model or realtime_model == model:
+        return model_memory_mb(model, device, compute_type)
+    measured = measured_model_memory(f"{model}+{realtime_model}", device,
+                                     compute_type)
+    if measured:
+        return measured
+    return (model_memory_mb(model, device, compute_type) +
+            model_memory_mb(realtime_model, device, compute_type))
+
+
+def key_memory_mb(key):
+    """按常驻录音器的键估计其内存（未启用实时转写时不加载实时模型）"""
+    return recorder_memory_mb(key[0], key[8] if key[4] else None, key[2],
+                              key[3])
+
+
+def record_model_memory(model, device, compute_type, memory_mb):
+    """保存一次实测的录音器加载内存（见 measured_model_memory）"""
+    with _MEASURED_MEMORY_LOCK:
+        table = _measured_memory()
+        table[f"{model}/{device}/{compute_type}"] = round(memory_mb)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(MODEL_MEMORY_FILE, "w", encoding="utf-8") as f:
+                json.dump(table, f, indent=2)
+        except OSError as e:
+            print(f"保存模型内存记录失败: {e}")
+
 
-def translate_text(text, from_lang='en', to_lang='zh'):
-    """使用百度翻译 API 翻译文本"""
+def process_tree_usage():
+    """本进程及其子进程的 (CPU 秒数, 常驻内存 MB)；没有 psutil 时只统计本进程"""
     try:
-        salt = str(random.randint(32768, 65536))
-        sign = hashlib.md5(
-            (BAIDU_APPID + text + salt + BAIDU_KEY).encode()).hexdigest()
-
-        params = {
-            'appid': BAIDU_APPID,
-            'q': text,
-            'from': from_lang,
-            'to': to_lang,
-            'salt': salt,
-            'sign': sign
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil:
+        process = psutil.Process()
+        cpu_seconds = 0.0
+        rss = 0
+        for proc in [process] + process.children(recursive=True):
+            try:
+                times = proc.cpu_times()
+                cpu_seconds += times.user + times.system
+                rss += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        return cpu_seconds, rss / 1024 / 1024
+    times = os.times()
+    rss_mb = None
+    try:
+        with open("/proc/self/statm") as f:
+            rss_mb = int(f.read().split()[1]) * os.sysconf(
+                "SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    return times.user + times.system, rss_mb
+
+
+def process_tree_rss_mb():
+    """本进程及其子进程（RealtimeSTT 的转写进程）的常驻内存（MB），需要 psutil"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    process = psutil.Process()
+    total = 0
+    for proc in [process] + process.children(recursive=True):
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / 1024 / 1024
+
+
+# 百度翻译可重试的错误码：请求超时、系统错误、访问频率受限、长 query 请求频繁
+BAIDU_RETRY_CODES = {'52001', '52002', '54003', '54005'}
+
+
+class TokenBucket:
+    """令牌桶限流器，按账户 QPS 发放请求令牌"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """阻塞直到取得一个令牌"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Translator(ABC):
+    """翻译后端接口：translate_async(文本, 源语言, 目标语言) 返回结果为译文或 None 的 Future
+
+    语言代码沿用百度翻译的代码（zh / en / jp / kor ...，源语言可为 auto）。
+    基类统计各后端最近请求从提交到完成的耗时，供配置页面对比。
+    """
+
+    name = ""
+    label = ""
+    cache_namespace = ""  # 翻译缓存中区分后端的前缀
+
+    def __init__(self):
+        self._latencies = deque(maxlen=1000)
+        self._requests = 0
+        self._failures = 0
+        self._stats_lock = threading.Lock()
+
+    @abstractmethod
+    def translate_async(self, text, from_lang='en', to_lang='zh'):
+        """提交一句翻译，返回 Future"""
+
+    def translate(self, text, from_lang='en', to_lang='zh'):
+        """同步翻译一句文本"""
+        return self.translate_async(text, from_lang, to_lang).result()
+
+    def _track(self, future):
+        """记录一次请求的耗时和成败"""
+        started = time.monotonic()
+
+        def on_done(done):
+            elapsed_ms = (time.monotonic() - started) * 1000
+            failed = done.exception() is not None or done.result() is None
+            with self._stats_lock:
+                self._requests += 1
+                if failed:
+                    self._failures += 1
+                else:
+                    self._latencies.append(elapsed_ms)
+
+        future.add_done_callback(on_done)
+        return future
+
+    def stats(self):
+        """请求数、失败数和最近成功请求耗时的 p50/p95（毫秒）"""
+        with self._stats_lock:
+            values = sorted(self._latencies)
+            requests, failures = self._requests, self._failures
+
+        def percentile(q):
+            if not values:
+                return None
+            return values[min(len(values) - 1, int(q * len(values)))]
+
+        return {
+            'requests': requests,
+            'failures': failures,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95)
         }
 
-        response = requests.get(BAIDU_API_URL, params=params)
-        result = response.json()
 
-        if 'trans_result' in result:
-            return result['trans_result'][0]['dst']
+class BaiduTranslator(Translator):
+    """百度翻译客户端：复用连接、合并短时间内到达的句子、令牌桶限流、退避重试"""
+
+    name = 'baidu'
+    label = "百度翻译（在线）"
+
+    def __init__(self,
+                 appid,
+                 key,
+                 api_url=BAIDU_API_URL,
+                 qps=1,
+                 coalesce_window=0.05,
+                 max_batch_chars=2000,
+                 max_retries=3,
+                 timeout=5.0,
+                 pool_size=4):
+        super().__init__()
+        self.appid = appid
+        self.key = key
+        self.api_url = api_url
+        self.coalesce_window = coalesce_window
+        self.max_batch_chars = max_batch_chars
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.bucket = TokenBucket(qps)
+        self.session = None
+        self._queue = queue.Queue()
+        self._executor = None
+        self._dispatcher = None
+        self._lock = threading.Lock()
+
+    def set_credentials(self, appid, key):
+        self.appid = appid
+        self.key = key
+
+    def set_qps(self, qps):
+        self.bucket = TokenBucket(qps)
+
+    def translate_async(self, text, from_lang='en', to_lang='zh'):
+        """提交一句待翻译文本，返回 Future，结果为译文或 None"""
+        self._ensure_started()
+        future = Future()
+        # 多句合并为一个多行 q，句内换行需要去掉
+        text = " ".join(text.split())
+        if not text:
+            future.set_result(None)
+        else:
+            self._track(future)
+            self._queue.put((text, from_lang, to_lang, future))
+        return future
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._dispatcher is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                self.session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1,
+                                      pool_maxsize=self.pool_size)
+                self.session.mount("https://", adapter)
+                self.session.mount("http://", adapter)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size,
+                    thread_name_prefix="baidu-translate")
+                self._dispatcher = threading.Thread(target=self._dispatch_loop,
+                                                    name="baidu-dispatch",
+                                                    daemon=True)
+                self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        """收集合并窗口内到达的句子，按语言对打包发送"""
+        while True:
+            batch = [self._queue.get()]
+            chars = len(batch[0][0])
+            deadline = time.monotonic() + self.coalesce_window
+            while chars < self.max_batch_chars:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                chars += len(item[0])
+
+            # 等待限流令牌期间到达的句子并入同一批
+            self.bucket.acquire()
+            while chars < self.max_batch_chars:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                chars += len(item[0])
+
+            groups = {}
+            for item in batch:
+                groups.setdefault((item[1], item[2]), []).append(item)
+            for index, ((from_lang, to_lang),
+                        items) in enumerate(groups.items()):
+                if index:
+                    self.bucket.acquire()
+                self._executor.submit(self._send_batch, items, from_lang,
+                                      to_lang)
+
+    def _send_batch(self, items, from_lang, to_lang):
+        try:
+            results = self._request([item[0] for item in items], from_lang,
+                                    to_lang)
+        except Exception as e:
+            print(f"翻译请求失败: {e}")
+            results = [None] * len(items)
+        for item, result in zip(items, results):
+            item[3].set_result(result)
+
+    def _request(self, texts, from_lang, to_lang):
+        """发送一个多行请求，并把 trans_result 按行拆回各句"""
+        import requests
+        q = "\n".join(texts)
+        for attempt in range(self.max_retries + 1):
+            # 首次请求的令牌已由分发线程取得
+            if attempt:
+                self.bucket.acquire()
+            salt = str(random.randint(32768, 65536))
+            sign = hashlib.md5(
+                (self.appid + q + salt + self.key).encode()).hexdigest()
+            params = {
+                'appid': self.appid,
+                'q': q,
+                'from': from_lang,
+                'to': to_lang,
+                'salt': salt,
+                'sign': sign
+            }
+            try:
+                response = self.session.post(self.api_url,
+                                             data=params,
+                                             timeout=self.timeout)
+                result = response.json()
+            except (requests.RequestException, ValueError) as e:
+                error = str(e)
+            else:
+                if 'trans_result' in result:
+                    dst = [item['dst'] for item in result['trans_result']]
+                    if len(dst) != len(texts):
+                        print(f"翻译结果行数不匹配: {len(dst)} != {len(texts)}")
+                        return [None] * len(texts)
+                    return dst
+                error = result.get('error_msg', '未知错误')
+                if str(result.get('error_code')) not in BAIDU_RETRY_CODES:
+                    print(f"翻译错误: {error}")
+                    return [None] * len(texts)
+
+            if attempt < self.max_retries:
+                time.sleep(0.5 * 2**attempt + random.random() * 0.1)
+        print(f"翻译错误: {error}（已重试 {self.max_retries} 次）")
+        return [None] * len(texts)
+
+
+# 百度翻译语言代码 -> OPUS-MT 模型使用的 ISO 639-1 代码
+LOCAL_LANG_CODES = {
+    'zh': 'zh',
+    'en': 'en',
+    'jp': 'ja',
+    'kor': 'ko',
+    'ru': 'ru',
+    'de': 'de',
+    'fra': 'fr',
+    'spa': 'es'
+}
+
+KANA_RE = re.compile(r'[぀-ヿ]')
+HANGUL_RE = re.compile(r'[가-힯]')
+CYRILLIC_RE = re.compile(r'[Ѐ-ӿ]')
+
+
+def guess_language(text):
+    """源语言为 auto 时按文字粗略判断语言（本地翻译没有语言检测）"""
+    if KANA_RE.search(text):
+        return 'ja'
+    if HANGUL_RE.search(text):
+        return 'ko'
+    if re.search(r'[\u4e00-\u9fff]', text):
+        return 'zh'
+    if CYRILLIC_RE.search(text):
+        return 'ru'
+    return 'en'
+
+
+class LocalTranslator(Translator):
+    """本地离线翻译：CTranslate2 在 CPU 上运行 Marian（OPUS-MT）模型，不需要网络
+
+    每个语言对一个模型目录 <model_dir>/<源>-<目标>（如 en-zh），由
+    ct2-transformers-converter 转换并带上 source.spm / target.spm；目录中可选的
+    source_prefix.txt 是需要加在句首的目标语言标记（如 >>cmn_Hans<<）。没有
+    直接的语言对时经英语中转。短时间内到达的句子合并为一批，一次前向计算完成。
+    """
+
+    name = 'local'
+    label = "本地模型（离线）"
+    cache_namespace = 'local'
+
+    def __init__(self,
+                 model_dir=os.path.join("models", "translation"),
+                 threads=0,
+                 beam_size=2,
+                 coalesce_window=0.05,
+                 max_batch=16):
+        super().__init__()
+        self.model_dir = model_dir
+        self.threads = threads  # 0 表示由 CTranslate2 决定
+        self.beam_size = beam_size
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self._models = {}  # (源, 目标) -> (translator, 源 spm, 目标 spm, 句首标记)
+        self._missing = set()
+        self._queue = queue.Queue()
+        self._dispatcher = None
+        self._lock = threading.Lock()
+        self._model_lock = threading.Lock()  # 加载模型较慢，不占用提交用的锁
+
+    def configure(self, model_dir, threads, beam_size):
+        with self._model_lock:
+            if (model_dir, threads) != (self.model_dir, self.threads):
+                self._models.clear()  # 下一批翻译时按新设置重新加载
+                self._missing.clear()
+            self.model_dir = model_dir
+            self.threads = threads
+            self.beam_size = beam_size
+
+    def pairs(self):
+        """模型目录中可用的语言对"""
+        if not os.path.isdir(self.model_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.model_dir)
+            if os.path.exists(os.path.join(self.model_dir, name, "model.bin")))
+
+    def translate_async(self, text, from_lang='en', to_lang='zh'):
+        """提交一句待翻译文本，返回 Future，结果为译文或 None"""
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop,
+                                                    name="local-translate",
+                                                    daemon=True)
+                self._dispatcher.start()
+        future = Future()
+        text = " ".join(text.split())
+        if not text:
+            future.set_result(None)
         else:
-            print(f"翻译错误: {result.get('error_msg', '未知错误')}")
+            self._track(future)
+            self._queue.put((text, from_lang, to_lang, future))
+        return future
+
+    def _dispatch_loop(self):
+        """收集合并窗口内到达的句子，按语言对分组后成批翻译"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.coalesce_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            groups = {}
+            for item in batch:
+                source = LOCAL_LANG_CODES.get(item[1]) or guess_language(
+                    item[0])
+                target = LOCAL_LANG_CODES.get(item[2], item[2])
+                groups.setdefault((source, target), []).append(item)
+            for (source, target), items in groups.items():
+                try:
+                    results = self._translate_batch([item[0] for item in items],
+                                                    source, target)
+                except Exception as e:
+                    print(f"本地翻译失败: {e}")
+                    results = [None] * len(items)
+                for item, result in zip(items, results):
+                    item[3].set_result(result)
+
+    def _route(self, source, target):
+        """返回需要依次运行的语言对；没有可用模型时返回 None"""
+        if source == target:
+            return []
+
+        def exists(pair):
+            return os.path.exists(
+                os.path.join(self.model_dir, f"{pair[0]}-{pair[1]}",
+                             "model.bin"))
+
+        if exists((source, target)):
+            return [(source, target)]
+        if exists((source, 'en')) and exists(('en', target)):
+            return [(source, 'en'), ('en', target)]
+        return None
+
+    def _translate_batch(self, texts, source, target):
+        route = self._route(source, target)
+        if route is None:
+            if (source, target) not in self._missing:
+                self._missing.add((source, target))
+                print(f"没有本地翻译模型: {source}-{target}"
+                      f"（模型目录 {self.model_dir}）")
+            return [None] * len(texts)
+        for pair in route:
+            texts = self._run_model(pair, texts)
+        return texts
+
+    def _model(self, pair):
+        with self._model_lock:
+            model = self._models.get(pair)
+            if model:
+                return model
+            import ctranslate2
+            import sentencepiece
+
+            path = os.path.join(self.model_dir, f"{pair[0]}-{pair[1]}")
+            translator = ctranslate2.Translator(path,
+                                                device="cpu",
+                                                intra_threads=self.threads)
+            source_spm = sentencepiece.SentencePieceProcessor(
+                model_file=os.path.join(path, "source.spm"))
+            target_spm = sentencepiece.SentencePieceProcessor(
+                model_file=os.path.join(path, "target.spm"))
+            prefix = []
+            prefix_path = os.path.join(path, "source_prefix.txt")
+            if os.path.exists(prefix_path):
+                with open(prefix_path, "r", encoding="utf-8") as f:
+                    prefix = f.read().split()
+            model = (translator, source_spm, target_spm, prefix)
+            self._models[pair] = model
+            return model
+
+    def _run_model(self, pair, texts):
+        translator, source_spm, target_spm, prefix = self._model(pair)
+        tokens = [
+            prefix + source_spm.encode(text, out_type=str) + ["</s>"]
+            for text in texts
+        ]
+        results = translator.translate_batch(tokens,
+                                             beam_size=self.beam_size,
+                                             max_batch_size=self.max_batch,
+                                             max_decoding_length=256)
+        return [
+            target_spm.decode_pieces(result.hypotheses[0]) or None
+            for result in results
+        ]
+
+
+class TranslationCache:
+    """两级翻译缓存：内存 LRU + SQLite 持久化，相同的在途请求只发一次"""
+
+    def __init__(self,
+                 path,
+                 memory_size=2048,
+                 max_entries=200000,
+                 max_age_days=90):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._inserts = 0
+        # 磁盘命中的最近使用时间先记在内存中，随下一次写入或后台批量更新，
+        # 读取路径不提交事务
+        self._touched = {}
+        self._flushing = False
+        self.reset_stats()
+
+    @staticmethod
+    def normalize(text):
+        """归一化文本：全半角统一、合并空白、忽略大小写"""
+        return " ".join(unicodedata.normalize('NFKC', text).split()).casefold()
+
+    def reset_stats(self):
+        with self._lock:
+            self.memory_hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+            self.merged = 0
+            self.saved_chars = 0
+            self.miss_seconds = 0.0
+
+    def stats(self):
+        """返回命中统计及估算节省的字符数（计费）和等待时间"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits + self.merged
+            average = self.miss_seconds / self.misses if self.misses else 0.0
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'merged': self.merged,
+                'misses': self.misses,
+                'saved_chars': self.saved_chars,
+                'saved_seconds': hits * average
+            }
+
+    def translate_async(self, text, from_lang, to_lang, backend, namespace=""):
+        """查缓存，未命中时调用 backend(text, from_lang, to_lang) 返回的 Future
+
+        namespace 区分不同翻译后端的结果；百度翻译为空，沿用已有的缓存条目
+        """
+        key = (self.normalize(text), from_lang,
+               f"{namespace}:{to_lang}" if namespace else to_lang)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.saved_chars += len(text)
+                return self._done(self._memory[key])
+            if key in self._inflight:
+                self.merged += 1
+                self.saved_chars += len(text)
+                return self._inflight[key]
+
+        cached = self._disk_get(key)
+        with self._lock:
+            if cached is not None:
+                self.disk_hits += 1
+                self.saved_chars += len(text)
+                self._remember(key, cached)
+                return self._done(cached)
+            if key in self._inflight:
+                self.merged += 1
+                self.saved_chars += len(text)
+                return self._inflight[key]
+            self.misses += 1
+            future = Future()
+            self._inflight[key] = future
+
+        started = time.monotonic()
+
+        def on_done(backend_future):
+            try:
+                result = backend_future.result()
+            except Exception as e:
+                print(f"翻译请求失败: {e}")
+                result = None
+            with self._lock:
+                self.miss_seconds += time.monotonic() - started
+                self._inflight.pop(key, None)
+                if result is not None:
+                    self._remember(key, result)
+            if result is not None:
+                self._disk_put(key, result)
+            future.set_result(result)
+
+        backend(text, from_lang, to_lang).add_done_callback(on_done)
+        return future
+
+    @staticmethod
+    def _done(result):
+        future = Future()
+        future.set_result(result)
+        return future
+
+    def _remember(self, key, result):
+        """写入内存 LRU（需持有锁）"""
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path,
+                                       timeout=10,
+                                       check_same_thread=False)
+            # WAL 模式下读取不会被其他进程（如批量转写）的写入阻塞
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    text TEXT, from_lang TEXT, to_lang TEXT, result TEXT,
+                    last_used REAL,
+                    PRIMARY KEY (text, from_lang, to_lang))""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_used "
+                             "ON translations (last_used)")
+            self._evict()
+        return self._db
+
+    def _disk_get(self, key):
+        try:
+            with self._db_lock:
+                db = self._connect()
+                row = db.execute(
+                    "SELECT result FROM translations "
+                    "WHERE text = ? AND from_lang = ? AND to_lang = ?",
+                    key).fetchone()
+        except sqlite3.Error as e:
+            print(f"读取翻译缓存失败: {e}")
             return None
+        if row is None:
+            return None
+        with self._lock:
+            self._touched[key] = time.time()
+            flush = len(self._touched) >= 256 and not self._flushing
+            self._flushing = self._flushing or flush
+        if flush:
+            threading.Thread(target=self.flush, daemon=True).start()
+        return row[0]
+
+    def _take_touched(self):
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._flushing = False
+        return [(used, ) + key for key, used in touched.items()]
+
+    def _write_touched(self, db, touched):
+        """更新最近使用时间（需持有数据库锁）"""
+        db.executemany(
+            "UPDATE translations SET last_used = MAX(last_used, ?) "
+            "WHERE text = ? AND from_lang = ? AND to_lang = ?", touched)
+
+    def flush(self):
+        """把记在内存中的最近使用时间写入数据库"""
+        touched = self._take_touched()
+        if not touched:
+            return
+        try:
+            with self._db_lock:
+                db = self._connect()
+                self._write_touched(db, touched)
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"更新翻译缓存失败: {e}")
+
+    def _disk_put(self, key, result):
+        try:
+            with self._db_lock:
+                db = self._connect()
+                db.execute(
+                    "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                    key + (result, time.time()))
+                self._write_touched(db, self._take_touched())
+                self._inserts += 1
+                if self._inserts % 1000 == 0:
+                    self._evict()
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"写入翻译缓存失败: {e}")
+
+    def _evict(self):
+        """删除过期条目，并按最近使用时间把条目数压到上限以内（需持有数据库锁）"""
+        cutoff = time.time() - self.max_age_days * 86400
+        self._db.execute("DELETE FROM translations WHERE last_used < ?",
+                         (cutoff, ))
+        self._db.execute(
+            "DELETE FROM translations WHERE rowid IN ("
+            "SELECT rowid FROM translations ORDER BY last_used DESC "
+            "LIMIT -1 OFFSET ?)", (self.max_entries, ))
+        self._db.commit()
+
+
+BAIDU_TRANSLATOR = BaiduTranslator(BAIDU_APPID, BAIDU_KEY)
+LOCAL_TRANSLATOR = LocalTranslator()
+TRANSLATORS = {
+    translator.name: translator
+    for translator in (BAIDU_TRANSLATOR, LOCAL_TRANSLATOR)
+}
+TRANSLATION_CACHE = TranslationCache(TRANSLATION_CACHE_FILE)
+
+
+def translate_async(text, from_lang='en', to_lang='zh', backend='baidu'):
+    """经过翻译缓存调用所选翻译后端，返回 Future"""
+    translator = TRANSLATORS[backend]
+    return TRANSLATION_CACHE.translate_async(text, from_lang, to_lang,
+                                             translator.translate_async,
+                                             translator.cache_namespace)
+
+
+def configure_translators(config):
+    """按配置设置百度翻译凭据和限流、本地翻译模型目录和线程数"""
+    BAIDU_TRANSLATOR.set_credentials(config['baidu_appid'], config['baidu_key'])
+    BAIDU_TRANSLATOR.set_qps(config['baidu_qps'])
+    LOCAL_TRANSLATOR.configure(config['local_translation_dir'],
+                               config['local_translation_threads'],
+                               config['local_translation_beam_size'])
+
+
+def translator_config(args):
+    """命令行中的翻译设置，未指定的项使用默认配置"""
+    config = {'translation_backend': args.translator}
+    for key in ('baidu_appid', 'baidu_key', 'baidu_qps',
+                'local_translation_dir', 'local_translation_threads'):
+        value = getattr(args, key)
+        config[key] = DEFAULT_CONFIG[key] if value is None else value
+    return config
+
+
+def format_translator_stats():
+    """各翻译后端的请求数和耗时，供配置页面显示"""
+    lines = []
+    for translator in TRANSLATORS.values():
+        stats = translator.stats()
+        if not stats['requests']:
+            lines.append(f"{translator.label}：暂无请求")
+            continue
+        latency = "-" if stats['p50'] is None else (
+            f"p50 {stats['p50']:.0f} ms，p95 {stats['p95']:.0f} ms")
+        lines.append(f"{translator.label}：{stats['requests']} 次，{latency}，"
+                     f"失败 {stats['failures']}")
+    return "\n".join(lines)
+
+
+def translate_text(text, from_lang='en', to_lang='zh', backend='baidu'):
+    """使用所选翻译后端翻译文本（经过翻译缓存）"""
+    try:
+        return translate_async(text, from_lang, to_lang, backend).result()
     except Exception as e:
         print(f"翻译请求失败: {e}")
         return None
 
 
-def add_furigana(text):
-    """为日语文本中的汉字添加平假名注音，并用HTML格式添加颜色"""
-    if not KAKASI or not text:
-        return text
-
-    try:
-        # 使用 kakasi 转换
-        result = KAKASI.convert(text)
-
-        # 构建带注音和颜色的文本
-        annotated_text = ""
-        for item in result:
+# 汉字匹配和注音短语切分（按日文标点和空白切分，短语是注音缓存的单位）
+KANJI_RE = re.compile(r'[\u4e00-\u9fff]')
+PHRASE_SPLIT_RE = re.compile(r'([\s、。，．・！？!?,.「」『』（）()]+)')
+
+
+class FuriganaAnnotator:
+    """日语注音引擎：首次需要时才加载 pykakasi，按短语缓存注音结果"""
+
+    def __init__(self, cache_size=8192):
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._kakasi = None
+        self._load_failed = False
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """加载 pykakasi，失败时只提示一次"""
+        with self._lock:
+            if self._kakasi is None and not self._load_failed:
+                try:
+                    from pykakasi import kakasi
+                    self._kakasi = kakasi()
+                except ImportError:
+                    print("请安装 pykakasi 库以支持日语注音功能：pip install pykakasi")
+                    self._load_failed = True
+            return self._kakasi
+
+    def annotate(self, text):
+        """为日语文本中的汉字添加平假名注音，并用HTML格式添加颜色"""
+        if not text or not KANJI_RE.search(text) or not self.load():
+            return text
+
+        parts = []
+        for phrase in PHRASE_SPLIT_RE.split(text):
+            if not KANJI_RE.search(phrase):
+                parts.append(phrase)
+                continue
+            with self._lock:
+                annotated = self._cache.get(phrase)
+                if annotated is not None:
+                    self._cache.move_to_end(phrase)
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    annotated = self._convert(phrase)
+                    self._cache[phrase] = annotated
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            parts.append(annotated)
+        return "".join(parts)
+
+    def _convert(self, phrase):
+        """调用 kakasi 转换一个短语（需持有锁）"""
+        parts = []
+        for item in self._kakasi.convert(phrase):
             orig = item['orig']
             hira = item['hira']
 
             # 如果原文是汉字且有对应的平假名，添加带颜色的注音
-            if orig != hira and any('\u4e00' <= c <= '\u9fff' for c in orig):
-                annotated_text += f"<span style='color: #0066cc'>{orig}({hira})</span>"
+            if orig != hira and KANJI_RE.search(orig):
+                parts.append(
+                    f"<span style='color: #0066cc'>{orig}({hira})</span>")
             else:
-                annotated_text += orig
+                parts.append(orig)
+        return "".join(parts)
+
 
-        return annotated_text
+FURIGANA = FuriganaAnnotator()
+
+
+def add_furigana(text):
+    """为日语文本中的汉字添加平假名注音，并用HTML格式添加颜色"""
+    try:
+        return FURIGANA.annotate(text)
     except Exception as e:
         print(f"添加注音失败: {e}")
         return text
 
 
+def make_recorder_key(model,
+                      language,
+                      config,
+                      enable_realtime,
+                      use_microphone=False):
+    """生成常驻录音器的键：这些参数变化时必须重新加载模型
+
+    界面的麦克风和文件输入都经环形缓冲区送入，录音器本身不打开麦克风。
+    """
+    return (model, language, config['device'], config['compute_type'],
+            bool(enable_realtime), bool(use_microphone),
+            config.get('cpu_threads', 0), config.get('num_workers', 1),
+            config.get('realtime_model') or model)
+
+
+def build_recorder_kwargs(model, language, config):
+    """根据配置构建 AudioToTextRecorder 的构造参数"""
+    return dict(
+        model=model,
+        language=LANGUAGE_MAP.get(language),
+        silero_sensitivity=config['silero_sensitivity'],
+        post_speech_silence_duration=config['post_speech_silence_duration'],
+        min_length_of_recording=config['min_length_of_recording'],
+        beam_size=config['beam_size'],
+        realtime_model_type=config.get('realtime_model') or model,
+        use_main_model_for_realtime=config.get('realtime_model') in ('',
+                                                                    model),
+        beam_size_realtime=config.get('beam_size_realtime', 3),
+        realtime_processing_pause=config['realtime_processing_pause'],
+        device=config['device'],
+        compute_type=config['compute_type'],
+        cpu_threads=config.get('cpu_threads', 0),
+        num_workers=config.get('num_workers', 1))
+
+
+# 不需要重新加载模型、可以直接写入已加载录音器的参数
+RUNTIME_RECORDER_OPTIONS = ('silero_sensitivity',
+                            'post_speech_silence_duration',
+                            'min_length_of_recording', 'beam_size',
+                            'beam_size_realtime', 'realtime_processing_pause')
+
+
+# 单句延迟统计的阶段，均相对 VAD 检测到语音结束的时间
+LATENCY_STAGES = {
+    'text_return': "text() 返回",
+    'signal_delivered': "信号送达界面",
+    'gui_append': "界面追加",
+    'log_write': "日志写入",
+    'translation_done': "翻译完成",
+    'translation_preview': "推测译文"
+}
+
+
+class LatencyTracker:
+    """各阶段延迟的滚动统计，可导出 JSON 快照或 Prometheus textfile"""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._samples = {
+            stage: deque(maxlen=window)
+            for stage in LATENCY_STAGES
+        }
+        self._counts = dict.fromkeys(LATENCY_STAGES, 0)
+        self._sums = dict.fromkeys(LATENCY_STAGES, 0.0)
+
+    def record(self, stage, speech_end, at=None):
+        """记录一句在某阶段的延迟；没有语音结束时间的句子不统计"""
+        if speech_end is None:
+            return
+        latency = ((at or time.monotonic()) - speech_end) * 1000
+        with self._lock:
+            self._samples[stage].append(latency)
+            self._counts[stage] += 1
+            self._sums[stage] += latency
+
+    def percentiles(self):
+        """返回各阶段的 p50/p95/p99（毫秒，基于最近的滚动窗口）"""
+        with self._lock:
+            samples = {k: sorted(v) for k, v in self._samples.items()}
+            counts = dict(self._counts)
+            sums = dict(self._sums)
+        result = {}
+        for stage, values in samples.items():
+            result[stage] = {'count': counts[stage], 'sum': sums[stage]}
+            for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+                result[stage][name] = values[min(
+                    len(values) - 1, int(q * len(values)))] if values else None
+        return result
+
+    def snapshot(self, labels):
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'labels': labels,
+            'stages': self.percentiles()
+        }
+
+    def to_prometheus(self, labels):
+        """Prometheus textfile 格式（summary）"""
+        base = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+        lines = [
+            "# HELP realtime_stt_segment_latency_ms 语音结束到各处理阶段的延迟",
+            "# TYPE realtime_stt_segment_latency_ms summary"
+        ]
+        for stage, stats in self.percentiles().items():
+            stage_labels = f'stage="{stage}"' + (f",{base}" if base else "")
+            for name, q in (('p50', "0.5"), ('p95', "0.95"), ('p99', "0.99")):
+                if stats[name] is not None:
+                    lines.append(
+                        f'realtime_stt_segment_latency_ms{{{stage_labels},'
+                        f'quantile="{q}"}} {stats[name]:.3f}')
+            lines.append(f"realtime_stt_segment_latency_ms_sum{{{stage_labels}}} "
+                         f"{stats['sum']:.3f}")
+            lines.append(f"realtime_stt_segment_latency_ms_count"
+                         f"{{{stage_labels}}} {stats['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path, labels):
+        """按扩展名导出：.prom 为 Prometheus textfile，其他为 JSON（原子替换）"""
+        if path.endswith(".prom"):
+            content = self.to_prometheus(labels)
+        else:
+            content = json.dumps(self.snapshot(labels),
+                                 ensure_ascii=False,
+                                 indent=2)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+LATENCY = LatencyTracker()
+
+# 录音器状态：状态名 -> (显示文本, 样式属性)
+RECORDER_STATES = {
+    'initializing': ("👂 正在初始化...", ""),
+    'listening': ("👂 正在监听...", "listening"),
+    'recording': ("🎙️ 正在录音...", "recording"),
+    'transcribing': ("⚙️ 正在转录...", "transcribing"),
+    'stopped': ("⏹️ 已停止", ""),
+    'error': ("❌ 发生错误", "")
+}
+
+# RealtimeSTT 回调事件 -> 状态
+RECORDER_EVENTS = {
+    'vad_detect_start': 'listening',
+    'recording_start': 'recording',
+    'recording_stop': 'transcribing',
+    'transcription_start': 'transcribing'
+}
+
+
+class RecorderStateMachine:
+    """录音器状态机：由 RealtimeSTT 回调驱动，仅在状态真正变化时通知"""
+
+    def __init__(self, on_change):
+        self.on_change = on_change
+        self.state = None
+        self.changed_at = None
+        self._lock = threading.Lock()
+
+    def handle_event(self, event):
+        state = RECORDER_EVENTS.get(event)
+        if state:
+            self.transition(state)
+
+    def transition(self, state):
+        with self._lock:
+            if state == self.state:
+                return
+            self.state = state
+            self.changed_at = time.monotonic()
+            changed_at = self.changed_at
+        self.on_change(state, changed_at)
+
+
+def recorder_parameters(recorder_class):
+    """录音器类构造函数接受的参数名"""
+    import inspect
+    return inspect.signature(recorder_class.__init__).parameters
+
+
+def recorder_supports(name):
+    """已安装的 RealtimeSTT 是否支持某个参数；引擎尚未导入时返回 None"""
+    module = sys.modules.get('RealtimeSTT')
+    if module is None:
+        return None
+    return name in recorder_parameters(module.AudioToTextRecorder)
+
+
+class ResidentRecorder:
+    """常驻的录音器，回调转发给当前使用它的转录线程"""
+
+    def __init__(self, key, recorder_kwargs):
+        self.key = key
+        from RealtimeSTT import AudioToTextRecorder
+
+        self.listener = None
+        self.last_used = time.monotonic()
+        self.memory_mb = key_memory_mb(key)
+        enable_realtime = key[4]
+        recorder_kwargs, environ = self._supported_kwargs(
+            AudioToTextRecorder, recorder_kwargs)
+        rss_before = process_tree_rss_mb()
+        # 环境变量只在创建录音器（及其转写子进程）期间生效，之后恢复原值
+        saved = {name: os.environ.get(name) for name in environ}
+        os.environ.update(environ)
+        try:
+            self.recorder = AudioToTextRecorder(
+                enable_realtime_transcription=enable_realtime,
+                on_realtime_transcription_update=self._on_realtime_update
+                if enable_realtime else None,
+                on_recording_start=lambda: self._dispatch('recording_start'),
+                on_recording_stop=lambda: self._dispatch('recording_stop'),
+                on_transcription_start=lambda *args: self._dispatch(
+                    'transcription_start'),
+                on_vad_detect_start=lambda: self._dispatch('vad_detect_start'),
+                on_vad_detect_stop=lambda: self._dispatch('vad_detect_stop'),
+                use_microphone=key[5],
+                **recorder_kwargs)
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+        # 记录加载整个录音器的内存增量（含 VAD、运行时和实时模型；
+        # 并行加载其他模型时只是近似值）
+        rss_after = process_tree_rss_mb()
+        if rss_before is not None and rss_after is not None and rss_after > rss_before:
+            self.memory_mb = rss_after - rss_before
+            label = key[0]
+            if enable_realtime and key[8] != key[0]:
+                label = f"{key[0]}+{key[8]}"
+            record_model_memory(label, key[2], key[3], self.memory_mb)
+
+    @staticmethod
+    def _supported_kwargs(recorder_class, recorder_kwargs):
+        """去掉旧版 RealtimeSTT 不支持的参数，返回 (参数, 创建期间的环境变量)
+
+        旧版不支持 cpu_threads 时改用 OMP_NUM_THREADS 传给转写子进程。这只是
+        尽力而为：子进程在创建录音器时启动并继承环境变量，faster-whisper 在
+        cpu_threads 为 0 时采用它；本进程中已初始化的 torch / CTranslate2 不受影响。
+        """
+        parameters = recorder_parameters(recorder_class)
+        kwargs = dict(recorder_kwargs)
+        environ = {}
+        for name in ('cpu_threads', 'num_workers'):
+            if name in parameters:
+                continue
+            value = kwargs.pop(name, None)
+            if name == 'cpu_threads' and value:
+                environ['OMP_NUM_THREADS'] = str(value)
+            elif name == 'num_workers' and value and value > 1:
+                print("当前 RealtimeSTT 版本不支持 num_workers，已忽略")
+        return kwargs, environ
+
+    def _on_realtime_update(self, text):
+        listener = self.listener
+        if listener:
+            listener.on_realtime_update(text)
+
+    def _dispatch(self, event):
+        listener = self.listener
+        if listener:
+            listener.on_recorder_event(event)
+
+    def apply_config(self, config):
+        """把运行时可调的参数写入已加载的录音器"""
+        for name in RUNTIME_RECORDER_OPTIONS:
+            if name in config and hasattr(self.recorder, name):
+                setattr(self.recorder, name, config[name])
+
+    def abort(self):
+        """中断正在阻塞的 text() 调用"""
+        if hasattr(self.recorder, 'abort'):
+            self.recorder.abort()
+
+    def shutdown(self):
+        try:
+            if hasattr(self.recorder, 'shutdown'):
+                self.recorder.shutdown()
+            else:
+                self.recorder.stop()
+        except Exception as e:
+            print(f"关闭录音器错误: {e}")
+
+
+class RecorderPool:
+    """常驻录音器池：相同键的会话复用已加载的模型，空闲引擎按内存上限淘汰"""
+
+    def __init__(self, memory_limit_mb=4096):
+        self.memory_limit_mb = memory_limit_mb
+        self._lock = threading.Condition()
+        self._entries = {}  # key -> ResidentRecorder
+        self._loading = set()
+        self._in_use = set()
+
+    def acquire(self, key, recorder_kwargs):
+        """取出（必要时加载）录音器；若同键正在后台预加载则等待其完成"""
+        with self._lock:
+            while key in self._loading:
+                self._lock.wait()
+            entry = self._entries.get(key)
+            if entry is None:
+                self._evict_idle(key_memory_mb(key))
+                self._loading.add(key)
+            else:
+                self._in_use.add(key)
+                entry.last_used = time.monotonic()
+                return entry
+
+        entry = self._load(key, recorder_kwargs)
+        if entry is None:
+            return None
+        with self._lock:
+            self._in_use.add(key)
+        return entry
+
+    def release(self, key):
+        """归还录音器，模型保持常驻"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                entry.listener = None
+                entry.last_used = time.monotonic()
+            self._in_use.discard(key)
+            self._evict_idle(0)
+
+    def preload(self, key, recorder_kwargs):
+        """后台预加载模型，已加载或正在加载时直接返回"""
+        with self._lock:
+            if key in self._entries or key in self._loading:
+                return
+            self._evict_idle(key_memory_mb(key))
+            self._loading.add(key)
+        self._load(key, recorder_kwargs)
+
+    def set_memory_limit(self, memory_limit_mb):
+        with self._lock:
+            self.memory_limit_mb = memory_limit_mb
+            self._evict_idle(0)
+
+    def shutdown(self):
+        """关闭所有常驻录音器"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._in_use.clear()
+        for entry in entries:
+            entry.shutdown()
+
+    def _load(self, key, recorder_kwargs):
+        entry = None
+        try:
+            entry = ResidentRecorder(key, recorder_kwargs)
+        except Exception as e:
+            print(f"录音器初始化错误: {e}")
+        with self._lock:
+            self._loading.discard(key)
+            if entry:
+                self._entries[key] = entry
+            self._lock.notify_all()
+        return entry
+
+    def _evict_idle(self, incoming_mb):
+        """按最久未使用顺序淘汰空闲录音器，直到满足内存上限（需持有锁）"""
+        used = sum(e.memory_mb for e in self._entries.values())
+        idle = sorted((e for k, e in self._entries.items()
+                       if k not in self._in_use),
+                      key=lambda e: e.last_used)
+        for entry in idle:
+            if used + incoming_mb <= self.memory_limit_mb:
+                break
+            del self._entries[entry.key]
+            used -= entry.memory_mb
+            # 关闭模型进程较慢，放到后台执行
+            threading.Thread(target=entry.shutdown, daemon=True).start()
+
+
+RECORDER_POOL = RecorderPool()
+
+RECORDER_QUEUE_CHUNKS = 8  # 录音器内部音频队列最多保留的块数
+PRELOAD_DEBOUNCE_MS = 500  # 切换模型、语言后等待多久再预加载
+
+RING_POLICIES = {
+    'drop_oldest': "丢弃最早的音频",
+    'drop_newest': "丢弃新到的音频",
+    'block': "阻塞写入方",
+}
+
+
+class AudioRingBuffer:
+    """共享内存中的定长 int16 音频环形缓冲区（单生产者、单消费者）
+
+    读取返回缓冲区内存的 NumPy 视图，不复制数据；消费完后调用 consume()
+    才释放空间，已交给消费者、尚未释放的数据不会被覆盖，drop_oldest 只丢弃
+    其后尚未读取的数据。写满时按溢出策略处理。头部计数器（读写位置、溢出次数、最大延迟）同样位于共享内存，
+    其他进程按名称 attach() 后即可读取 metrics()。
+    """
+
+    # 头部 int64 字段
+    WRITE, READ, OVERRUNS, DROPPED, MAX_LAG_US, CAPACITY, FRAME, CLOSED = range(8)
+    HEADER_BYTES = 8 * 8
+
+    def __init__(self, capacity, frame_samples=512, policy='drop_oldest',
+                 sample_rate=16000):
+        from multiprocessing import shared_memory
+
+        if policy not in RING_POLICIES:
+            raise ValueError(f"未知的溢出策略: {policy}")
+        self.policy = policy
+        self.sample_rate = sample_rate
+        self._owner = True
+        # 容量按帧取整，保证每帧的写入时间戳占一个槽位
+        frames = max(2, -(-int(capacity) // frame_samples))
+        capacity = frames * frame_samples
+        size = self.HEADER_BYTES + capacity * 2 + frames * 8
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._map_arrays(capacity, frame_samples)
+        self._cond = threading.Condition()
+        self._leased = 0  # 已交给消费者、尚未 consume() 的样本数
+
+    @classmethod
+    def attach(cls, name):
+        """按名称附加到其他进程创建的缓冲区（只用于读取计数器）"""
+        ring = cls.__new__(cls)
+        from multiprocessing import shared_memory
+        import numpy as np
+        try:
+            # 附加方不负责删除共享内存（Python 3.13+）
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # 引擎进程由界面进程启动，两者共用 resource_tracker，重复登记无影响
+            shm = shared_memory.SharedMemory(name=name)
+        header = np.ndarray((8, ), np.int64, buffer=shm.buf)
+        capacity, frame_samples = int(header[cls.CAPACITY]), int(
+            header[cls.FRAME])
+        del header
+        ring.policy = None
+        ring.sample_rate = 16000
+        ring._owner = False
+        ring._shm = shm
+        ring._map_arrays(capacity, frame_samples)
+        ring._cond = threading.Condition()
+        ring._leased = 0
+        return ring
+
+    def _map_arrays(self, capacity, frame_samples):
+        import numpy as np
+        buf = self._shm.buf
+        self.header = np.ndarray((8, ), np.int64, buffer=buf)
+        self.samples = np.ndarray((capacity, ),
+                                  np.int16,
+                                  buffer=buf,
+                                  offset=self.HEADER_BYTES)
+        self.stamps = np.ndarray((capacity // frame_samples, ),
+                                 np.float64,
+                                 buffer=buf,
+                                 offset=self.HEADER_BYTES + capacity * 2)
+        if self._owner:
+            self.header[:] = 0
+            self.header[self.CAPACITY] = capacity
+            self.header[self.FRAME] = frame_samples
+        self.capacity = capacity
+        self.frame_samples = frame_samples
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def fill(self):
+        return int(self.header[self.WRITE] - self.header[self.READ])
+
+    def write(self, pcm, policy=None, timeout=None):
+        """写入 int16 样本，返回实际写入的样本数；policy 可临时覆盖溢出策略"""
+        import numpy as np
+        pcm = np.asarray(pcm, dtype=np.int16).reshape(-1)
+        policy = policy or self.policy
+        header = self.header
+        with self._cond:
+            dropped = 0
+            if len(pcm) > self.capacity:
+                dropped = len(pcm) - self.capacity
+                pcm = pcm[-self.capacity:]
+            n = len(pcm)
+            free = self.capacity - self.fill
+            if n > free and policy == 'block':
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while n > self.capacity - self.fill and not header[self.CLOSED]:
+                    wait = 0.05
+                    if deadline is not None:
+                        wait = min(wait, deadline - time.monotonic())
+                        if wait <= 0:
+                            break
+                    self._cond.wait(wait)
+                free = self.capacity - self.fill
+            if n > free and policy == 'drop_oldest':
+                # 只能丢弃尚未交给消费者的数据
+                drop = min(n - free, self.fill - self._leased)
+                if drop and self._leased:
+                    self._discard(drop)
+                elif drop:
+                    header[self.READ] += drop
+                free += drop
+                dropped += drop
+            if n > free:
+                # drop_newest 或阻塞超时丢弃新到数据的尾部；drop_oldest 可丢弃的
+                # 旧数据不足（其余已租出）时保留新到数据中最新的部分
+                dropped += n - free
+                pcm = pcm[n - free:] if policy == 'drop_oldest' else pcm[:free]
+                n = free
+            if dropped:
+                header[self.OVERRUNS] += 1
+                header[self.DROPPED] += dropped
+            if n == 0 or header[self.CLOSED]:
+                return 0
+
+            start = int(header[self.WRITE])
+            self._store(start, pcm)
+            frames = np.arange(start // self.frame_samples,
+                               (start + n - 1) // self.frame_samples + 1)
+            self.stamps[frames % len(self.stamps)] = time.monotonic()
+            header[self.WRITE] = start + n
+            self._cond.notify_all()
+            return n
+
+    def _views(self, start, n):
+        """从绝对位置 start 起 n 个样本的视图（环绕时为两段）"""
+        offset = start % self.capacity
+        first = min(n, self.capacity - offset)
+        views = [self.samples[offset:offset + first]]
+        if n > first:
+            views.append(self.samples[:n - first])
+        return views
+
+    def _store(self, start, pcm):
+        offset = start % self.capacity
+        first = min(len(pcm), self.capacity - offset)
+        self.samples[offset:offset + first] = pcm[:first]
+        self.samples[:len(pcm) - first] = pcm[first:]
+
+    def _discard(self, drop):
+        """丢弃租出部分之后最早的 drop 个样本（需持有锁）
+
+        租出的数据仍被消费者以视图引用，读位置不能移动：把其后保留的数据前移
+        覆盖被丢弃的部分，写位置随之后退。只在溢出时发生。
+        """
+        import numpy as np
+        header = self.header
+        start = int(header[self.READ]) + self._leased
+        keep = int(header[self.WRITE]) - start - drop
+        if keep > 0:
+            kept = np.concatenate(self._views(start + drop, keep))
+            stamp = self.stamps[((start + drop) // self.frame_samples) %
+                                len(self.stamps)]
+            self._store(start, kept)
+            # 前移后各帧的写入时间取保留数据中最早的一帧（偏保守），不改租出部分所在帧
+            frames = np.arange(-(-start // self.frame_samples),
+                               (start + keep - 1) // self.frame_samples + 1)
+            self.stamps[frames % len(self.stamps)] = stamp
+        header[self.WRITE] = start + max(keep, 0)
+
+    def read(self, max_samples=None, timeout=None):
+        """返回最多 max_samples 个未读样本的零拷贝视图列表（环绕时为两段）
+
+        没有数据时最多等待 timeout 秒并返回空列表。视图在 consume() 之前
+        保持有效。
+        """
+        with self._cond:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self.fill <= self._leased and not self.header[self.CLOSED]:
+                wait = 0.05
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        return []
+                self._cond.wait(wait)
+            start = int(self.header[self.READ]) + self._leased
+            n = int(self.header[self.WRITE]) - start
+            if max_samples is not None:
+                n = min(n, max_samples)
+            if n <= 0:
+                return []
+            self._leased += n
+            return self._views(start, n)
+
+    def consume(self, n=None):
+        """释放已读取的样本，并按最早一帧的写入时间更新最大延迟"""
+        with self._cond:
+            n = self._leased if n is None else min(n, self._leased)
+            if n <= 0:
+                return
+            start = int(self.header[self.READ])
+            stamp = self.stamps[(start // self.frame_samples) %
+                                len(self.stamps)]
+            lag_us = int((time.monotonic() - stamp) * 1e6)
+            if lag_us > self.header[self.MAX_LAG_US]:
+                self.header[self.MAX_LAG_US] = lag_us
+            self.header[self.READ] = start + n
+            self._leased -= n
+            self._cond.notify_all()
+
+    def metrics(self):
+        """填充率、溢出次数、丢弃的音频秒数和最大延迟（毫秒）；已关闭时返回 None"""
+        header = self.header
+        if header is None:
+            return None
+        return {
+            'fill': int(header[self.WRITE] - header[self.READ]) / self.capacity,
+            'overruns': int(header[self.OVERRUNS]),
+            'dropped_seconds': int(header[self.DROPPED]) / self.sample_rate,
+            'max_lag_ms': int(header[self.MAX_LAG_US]) / 1000,
+            'capacity_seconds': self.capacity / self.sample_rate,
+        }
+
+    def stop(self):
+        """标记缓冲区已关闭，唤醒等待中的读写方"""
+        with self._cond:
+            self.header[self.CLOSED] = 1
+            self._cond.notify_all()
+
+    def close(self):
+        """释放共享内存映射；创建者同时删除共享内存"""
+        # 释放 NumPy 视图后才能关闭映射
+        self.header = self.samples = self.stamps = None
+        try:
+            if self._owner:
+                self._shm.unlink()
+            self._shm.close()
+        except (BufferError, FileNotFoundError) as e:
+            print(f"释放音频缓冲区失败: {e}")
+
+
+def format_ring_metrics(metrics):
+    """把环形缓冲区计数器格式化为状态栏文本"""
+    text = (f"音频缓冲 {metrics['fill']:.0%} · 溢出 {metrics['overruns']}"
+            f" · 最大延迟 {metrics['max_lag_ms']:.0f} ms")
+    if metrics['dropped_seconds']:
+        text += f"（丢弃 {metrics['dropped_seconds']:.1f}秒）"
+    return text
+
+
+class MicrophoneCapture:
+    """用 PyAudio 采集麦克风（16 kHz 单声道 int16）写入环形缓冲区
+
+    设备不支持 16 kHz 时按设备默认采样率采集再线性重采样。回调中不能阻塞，
+    缓冲区写满时按丢弃策略处理（block 策略按 drop_oldest 处理）。
+    """
+
+    def __init__(self, ring):
+        self.ring = ring
+        self._audio = None
+        self._stream = None
+        self._rate = ring.sample_rate
+
+    def start(self):
+        import pyaudio
+        self._audio = pyaudio.PyAudio()
+        frames = self.ring.frame_samples
+        try:
+            self._stream = self._open(pyaudio, self.ring.sample_rate, frames)
+        except OSError:
+            info = self._audio.get_default_input_device_info()
+            self._rate = int(info['defaultSampleRate'])
+            frames = int(frames * self._rate / self.ring.sample_rate)
+            self._stream = self._open(pyaudio, self._rate, frames)
+        self._stream.start_stream()
+
+    def _open(self, pyaudio, rate, frames):
+        return self._audio.open(format=pyaudio.paInt16,
+                                channels=1,
+                                rate=rate,
+                                input=True,
+                                frames_per_buffer=frames,
+                                stream_callback=self._on_audio)
+
+    def _on_audio(self, data, frame_count, time_info, status):
+        import numpy as np
+        import pyaudio
+        pcm = np.frombuffer(data, dtype=np.int16)
+        if self._rate != self.ring.sample_rate:
+            target = int(len(pcm) * self.ring.sample_rate / self._rate)
+            pcm = np.interp(np.linspace(0, len(pcm) - 1, target),
+                            np.arange(len(pcm)), pcm).astype(np.int16)
+        policy = 'drop_oldest' if self.ring.policy == 'block' else None
+        self.ring.write(pcm, policy=policy)
+        return None, pyaudio.paContinue
+
+    def stop(self):
+        try:
+            if self._stream:
+                self._stream.stop_stream()
+                self._stream.close()
+            if self._audio:
+                self._audio.terminate()
+        except Exception as e:
+            print(f"关闭麦克风错误: {e}")
+        self._stream = self._audio = None
+
+
+class AudioFileSource:
+    """把 WAV/FLAC 文件（或目录）经 feed_audio 送入录音器，代替麦克风输入"""
+
+    SAMPLE_RATE = 16000
+    CHUNK_SAMPLES = 512  # 与 RealtimeSTT 默认缓冲区一致
+    QUIET_LEVEL = 300  # 平均幅度低于此值的块视为停顿
+
+    def __init__(self, paths, pace='realtime'):
+        self.files = collect_audio_files(paths)
+        self.pace = pace
+        self.current_file = None
+        self.fed_seconds = 0.0
+        self.audio_seconds = 0.0  # 已解码的音频时长（不含补充的静音）
+
+    def chunks(self, tail_silence):
+        """逐块产出 (16 kHz 单声道 int16 PCM, 是否停顿)；每个文件末尾补一段静音"""
+        import numpy as np
+        from faster_whisper import decode_audio
+
+        step = self.CHUNK_SAMPLES
+        silence = bytes(2 * step)
+        for path in self.files:
+            self.current_file = path
+            audio = decode_audio(path, sampling_rate=self.SAMPLE_RATE)
+            pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+            self.audio_seconds += len(pcm) / self.SAMPLE_RATE
+            for start in range(0, len(pcm), step):
+                chunk = pcm[start:start + step]
+                if len(chunk) < step:
+                    chunk = np.pad(chunk, (0, step - len(chunk)))
+                yield chunk.tobytes(), np.abs(chunk).mean() < self.QUIET_LEVEL
+            # 末尾静音让 VAD 结束最后一句
+            for _ in range(int(tail_silence * self.SAMPLE_RATE / step) + 1):
+                yield silence, True
+
+
+def session_compute_share(realtime_busy, final_busy):
+    """返回 (实时模型占比, 主模型占比)，尚无数据时返回 None"""
+    total = realtime_busy + final_busy
+    if total <= 0:
+        return None
+    return realtime_busy / total, final_busy / total
+
+
+def session_ring_metrics(ring, ring_stats):
+    """当前会话（或上一个会话结束时）的环形缓冲区计数器"""
+    metrics = ring.metrics() if ring else None
+    return metrics or ring_stats
+
+
 class TranscriptionThread(QThread):
-    text_signal = pyqtSignal(str)
+    text_signal = pyqtSignal(str, object)  # 文本, 语音结束时间
     realtime_signal = pyqtSignal(str)
     finished_signal = pyqtSignal()
-    status_signal = pyqtSignal(str)  # 新增状态信号
+    status_signal = pyqtSignal(str, float)  # 状态信号（状态名, 时间戳）
+    ring_signal = pyqtSignal(str)  # 环形缓冲区的共享内存名称
+    language_signal = pyqtSignal(str)  # 自动检测到的语言，先于对应的文本发出
 
-    def __init__(self, model="tiny", enable_realtime=True):
+    def __init__(self, model="tiny", enable_realtime=True, source=None):
         super().__init__()
         self.enable_realtime = enable_realtime
+        self.source = source  # AudioFileSource，None 表示使用麦克风
+        self.segment_pending = False  # 已检测到语音结束、等待 text() 返回
+        self.source_finished = False
         self.recorder = None
+        self.resident = None
         self.model = model
         self.is_recording = False
         self.language = None
+        self.state_machine = RecorderStateMachine(self.status_signal.emit)
+        self.speech_end = None  # 当前句 VAD 检测到语音结束的时间
+        # 实时模型和主模型各自的推理耗时（秒），用于估算算力占比
+        self.realtime_busy = 0.0
+        self.final_busy = 0.0
+        self._last_realtime_at = None
+        # 音频经共享内存环形缓冲区送入录音器，积压和溢出都在这里统计
+        self.ring = None
+        self.ring_stats = None  # 会话结束时的缓冲区计数器
+        self._capture = None
+        self._audio_threads = []
         self.config = {
             'silero_sensitivity': 0.7,
             'post_speech_silence_duration': 0.5,
@@ -114,99 +1884,206 @@ class TranscriptionThread(QThread):
         }
 
     def setup_recorder(self):
+        """从常驻录音器池取出录音器，键不变时无需重新加载模型"""
         try:
-            language_map = {
-                '自动检测': None,
-                '中文 (Chinese)': 'zh',
-                '英语 (English)': 'en',
-                '日语 (Japanese)': 'ja',
-                '韩语 (Korean)': 'ko',
-                '俄语 (Russian)': 'ru',
-                '德语 (German)': 'de',
-                '法语 (French)': 'fr',
-                '西班牙语 (Spanish)': 'es'
-            }
-
-            self.recorder = AudioToTextRecorder(
-                model=self.model,
-                language=language_map.get(self.language),
-                enable_realtime_transcription=self.enable_realtime,
-                on_realtime_transcription_update=self.on_realtime_update
-                if self.enable_realtime else None,
-                silero_sensitivity=self.config['silero_sensitivity'],
-                post_speech_silence_duration=self.
-                config['post_speech_silence_duration'],
-                min_length_of_recording=self.config['min_length_of_recording'],
-                beam_size=self.config['beam_size'],
-                realtime_processing_pause=self.
-                config['realtime_processing_pause'],
-                device=self.config['device'],
-                compute_type=self.config['compute_type'])
-
-            # 设置音频缓冲区大小限制
-            self.recorder.audio_queue_size_limit = 100  # 限制音频队列大小
+            key = make_recorder_key(self.model, self.language, self.config,
+                                    self.enable_realtime)
+            self.resident = RECORDER_POOL.acquire(
+                key, build_recorder_kwargs(self.model, self.language,
+                                           self.config))
+            if not self.resident:
+                self.is_recording = False
+                return
+
+            self.resident.apply_config(self.config)
+            self.resident.listener = self
+            self.recorder = self.resident.recorder
 
         except Exception as e:
             print(f"录音器初始化错误: {e}")
             self.is_recording = False
 
     def on_realtime_update(self, text):
+        # RealtimeSTT 每次实时转写前等待 realtime_processing_pause，两次更新的
+        # 间隔减去该等待即为一次实时推理的耗时
+        now = time.monotonic()
+        if self._last_realtime_at is not None:
+            pause = self.config['realtime_processing_pause']
+            self.realtime_busy += max(0.0, now - self._last_realtime_at - pause)
+        self._last_realtime_at = now
         if self.is_recording and text:
             self.realtime_signal.emit(text)
 
-    def check_status(self):
-        """检查录音器状态"""
-        if not self.recorder:
-            return "⚠️ 未初始化"
-
-        try:
-            # 检查录音器的内部状态
-            if not self.is_recording:
-                return "⏹️ 已停止"
-
-            if hasattr(self.recorder, '_audio_recorder'):
-                recorder = self.recorder._audio_recorder
-                if hasattr(recorder, '_recording') and recorder._recording:
-                    return "🎙️ 正在录音..."
-                elif hasattr(
-                        recorder,
-                        '_processing_audio') and recorder._processing_audio:
-                    return "⚙️ 正在转录..."
-                elif hasattr(recorder, '_listening') and recorder._listening:
-                    return "🗣️ 请说话..."
+    def compute_share(self):
+        return session_compute_share(self.realtime_busy, self.final_busy)
 
-            return "👂 正在监听..."
-        except Exception as e:
-            print(f"状态检查错误: {e}")
-            return "⚠️ 状态未知"
+    def on_recorder_event(self, event):
+        if event in ('recording_start', 'recording_stop'):
+            self._last_realtime_at = None
+        if self.is_recording:
+            if event == 'recording_stop':
+                self.speech_end = time.monotonic()
+                self.segment_pending = True
+            self.state_machine.handle_event(event)
 
     def run(self):
         try:
+            self.state_machine.transition('initializing')
             self.setup_recorder()
-            self.status_signal.emit("👂 正在初始化...")
-            while self.is_recording:
-                if self.recorder:
-                    # 更新状态
-                    current_status = self.check_status()
-                    self.status_signal.emit(current_status)
-
-                    # 获取转录文本
-                    text = self.recorder.text()
-                    if text:
-                        self.text_signal.emit(text)
-                self.msleep(100)
+            if self.recorder:
+                self._start_audio()
+            # text() 会阻塞到一段语音转录完成，状态由回调推送，无需轮询
+            while self.is_recording and self.recorder:
+                self.speech_end = None
+                text = self.recorder.text()
+                self.segment_pending = False
+                if self.speech_end is not None:
+                    self.final_busy += time.monotonic() - self.speech_end
+                if text:
+                    LATENCY.record('text_return', self.speech_end)
+                    detected = getattr(self.recorder, 'detected_language',
+                                       None)
+                    if detected:
+                        self.language_signal.emit(detected)
+                    self.text_signal.emit(text, self.speech_end)
         except Exception as e:
             print(f"录音线程运行错误: {e}")
-            self.status_signal.emit("❌ 发生错误")
+            self.state_machine.transition('error')
         finally:
+            self._stop_audio()
             self.cleanup()
-            self.status_signal.emit("⏹️ 已停止")
+            self.state_machine.transition('stopped')
             self.finished_signal.emit()
 
+    def _start_audio(self):
+        """创建环形缓冲区，启动送入录音器的线程和音频来源（文件或麦克风）"""
+        capacity = int(self.config.get('audio_buffer_seconds', 10.0) *
+                       AudioFileSource.SAMPLE_RATE)
+        self.ring = AudioRingBuffer(capacity,
+                                    AudioFileSource.CHUNK_SAMPLES,
+                                    self.config.get('audio_overflow_policy',
+                                                    'drop_oldest'))
+        self.ring_signal.emit(self.ring.name)
+        self._audio_threads = [
+            threading.Thread(target=self._pump_ring, daemon=True)
+        ]
+        if self.source:
+            self._audio_threads.append(
+                threading.Thread(target=self._feed_source, daemon=True))
+        else:
+            self._capture = MicrophoneCapture(self.ring)
+            try:
+                self._capture.start()
+            except Exception as e:
+                print(f"打开麦克风失败: {e}")
+                self._capture = None
+                self.stop_recording()
+        for thread in self._audio_threads:
+            thread.start()
+
+    def _stop_audio(self):
+        if self._capture:
+            self._capture.stop()
+            self._capture = None
+        if self.ring is None:
+            return
+        self.ring.stop()
+        for thread in self._audio_threads:
+            thread.join(timeout=5)
+        self._audio_threads = []
+        self.ring_stats = self.ring.metrics()
+        ring, self.ring = self.ring, None
+        ring.close()
+
+    def ring_metrics(self):
+        return session_ring_metrics(self.ring, self.ring_stats)
+
+    def _pump_ring(self):
+        """把环形缓冲区中的音频送入录音器
+
+        录音器内部队列只保留几块音频，推理跟不上时积压留在环形缓冲区，
+        由溢出策略决定丢弃哪部分，而不是让内部队列无限增长。
+        """
+        ring = self.ring
+        chunk = ring.frame_samples
+        # 自上次看到录音器队列为空以来送入的块数；录音器队列是
+        # multiprocessing.Queue，macOS 上 qsize() 不可用，只能用 empty()
+        pending = 0
+        try:
+            while self.is_recording:
+                # 先等录音器消化积压再读取，等待期间不持有租约，溢出时可丢弃旧数据
+                while self.is_recording and pending > RECORDER_QUEUE_CHUNKS:
+                    if self.recorder.audio_queue.empty():
+                        pending = 0
+                    else:
+                        time.sleep(0.005)
+                views = ring.read(chunk * 4, timeout=0.1)
+                if not views:
+                    continue
+                for view in views:
+                    self.recorder.feed_audio(view)
+                    pending += -(-len(view) // chunk)
+                del views
+                ring.consume()
+        except Exception as e:
+            print(f"送入音频错误: {e}")
+            self.stop_recording()
+
+    def _feed_source(self):
+        """按设定速度把音频文件送入录音器，送完并转录完最后一句后结束会话
+
+        RealtimeSTT 按墙钟时间判断静音时长，因此最快速度模式下停顿仍按实时
+        送入，直到足以结束一句；语音和更长的停顿则尽快送入。每句转录完成前
+        不再送入新音频，保证分句结果与实时速度一致。
+        """
+        import numpy as np
+        step = AudioFileSource.CHUNK_SAMPLES / AudioFileSource.SAMPLE_RATE
+        hold = self.config['post_speech_silence_duration'] + 0.3
+        quiet_run = 0.0
+        next_at = time.monotonic()
+        try:
+            for chunk, quiet in self.source.chunks(hold + 0.5):
+                if not self.is_recording:
+                    return
+                paced = True
+                if self.source.pace == 'fast':
+                    quiet_run = quiet_run + step if quiet else 0.0
+                    paced = quiet and quiet_run <= hold
+                    while self.is_recording and self.segment_pending:
+                        time.sleep(0.005)
+                if paced:
+                    now = time.monotonic()
+                    next_at = max(next_at, now - step) + step
+                    if next_at > now:
+                        time.sleep(next_at - now)
+                # 文件输入不能丢音频：缓冲区满时等待送入线程腾出空间
+                self.ring.write(np.frombuffer(chunk, dtype=np.int16),
+                                policy='block')
+                self.source.fed_seconds += step
+
+            # 等录音器处理完剩余音频、最后一句转录完成
+            idle_since = None
+            while self.is_recording:
+                busy = (self.segment_pending or self.recorder.is_recording
+                        or self.ring.fill
+                        or not self.recorder.audio_queue.empty())
+                if busy:
+                    idle_since = None
+                elif idle_since is None:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since > 0.5:
+                    break
+                time.sleep(0.05)
+        except Exception as e:
+            print(f"读取音频文件失败: {e}")
+        self.source_finished = True
+        self.stop_recording()
+
     def cleanup(self):
         try:
-            if self.recorder:
-                self.recorder.stop()
+            if self.resident:
+                RECORDER_POOL.release(self.resident.key)
+                self.resident = None
                 self.recorder = None
         except Exception as e:
             print(f"清理录音器错误: {e}")
@@ -219,6 +2096,1114 @@ class TranscriptionThread(QThread):
     def stop_recording(self):
         """停止录音"""
         self.is_recording = False
+        # 唤醒阻塞在 text() 中的线程，录音器本身保持常驻
+        if self.resident:
+            self.resident.abort()
+
+
+def _engine_host_main(conn):
+    """引擎宿主进程：常驻录音器池，按界面进程的命令运行转写会话
+
+    会话在本进程中以 TranscriptionThread 的转录循环运行，信号直接回调并经
+    管道发回界面进程；每秒上报一次本进程（含 RealtimeSTT 子进程）的 CPU 和内存。
+    """
+    from PyQt5.QtCore import QCoreApplication
+    qt_app = QCoreApplication.instance() or QCoreApplication([])  # noqa: F841
+    send_lock = threading.Lock()
+
+    def send(*message):
+        with send_lock:
+            try:
+                conn.send(message)
+            except (OSError, EOFError):
+                pass  # 界面进程已退出
+
+    def report_usage():
+        while True:
+            cpu_seconds, rss_mb = process_tree_usage()
+            send('usage', cpu_seconds, rss_mb, time.monotonic())
+            time.sleep(1.0)
+
+    commands = queue.SimpleQueue()
+    current = {'id': None, 'thread': None}
+    stopped = set()
+
+    def read_commands():
+        # 停止命令需要在转录循环运行期间处理，不能排在会话之后
+        while True:
+            try:
+                command = conn.recv()
+            except (EOFError, OSError):
+                command = ('shutdown', )
+            if command[0] in ('stop', 'shutdown'):
+                if command[0] == 'stop':
+                    stopped.add(command[1])
+                thread = current['thread']
+                if thread and (command[0] == 'shutdown'
+                               or current['id'] == command[1]):
+                    thread.stop_recording()
+            if command[0] != 'stop':
+                commands.put(command)
+            if command[0] == 'shutdown':
+                return
+
+    threading.Thread(target=report_usage, daemon=True).start()
+    threading.Thread(target=read_commands, daemon=True).start()
+    send('ready', os.getpid())
+
+    while True:
+        command = commands.get()
+        if command[0] == 'shutdown':
+            break
+        if command[0] == 'preload':
+            # 预加载大模型可能要几十秒，放到后台线程，之后的 'start' 不必等待；
+            # start 需要的正是正在预加载的模型时，acquire() 会等它加载完成
+            threading.Thread(target=RECORDER_POOL.preload,
+                             args=(command[1], command[2]),
+                             daemon=True).start()
+            continue
+
+        # 'start'：运行一次转写会话
+        _, session_id, session = command
+        RECORDER_POOL.set_memory_limit(
+            session['config']['recorder_pool_memory_mb'])
+        source = None
+        if session['source']:
+            source = AudioFileSource(*session['source'])
+        thread = TranscriptionThread(model=session['model'],
+                                     enable_realtime=session['enable_realtime'],
+                                     source=source)
+        thread.language = session['language']
+        thread.config = session['config']
+        thread.text_signal.connect(
+            lambda text, speech_end: send('text', session_id, text,
+                                          speech_end, time.monotonic()),
+            Qt.DirectConnection)
+        thread.realtime_signal.connect(
+            lambda text: send('realtime', session_id, text),
+            Qt.DirectConnection)
+        thread.status_signal.connect(
+            lambda state, changed_at: send('status', session_id, state,
+                                           changed_at), Qt.DirectConnection)
+        thread.ring_signal.connect(
+            lambda name: send('ring', session_id, name), Qt.DirectConnection)
+        thread.language_signal.connect(
+            lambda language: send('language', session_id, language),
+            Qt.DirectConnection)
+        current['id'], current['thread'] = session_id, thread
+        if session_id not in stopped:
+            thread.is_recording = True
+            thread.run()
+        current['id'], current['thread'] = None, None
+        stopped.discard(session_id)
+        send(
+            'finished', session_id, {
+                'source_finished': thread.source_finished,
+                'fed_seconds': source.fed_seconds if source else 0.0,
+                'audio_seconds': source.audio_seconds if source else 0.0,
+                'realtime_busy': thread.realtime_busy,
+                'final_busy': thread.final_busy,
+                'ring': thread.ring_stats
+            })
+
+    RECORDER_POOL.shutdown()
+
+
+class EngineHost:
+    """独立的引擎宿主进程：推理、VAD 和音频采集都不占用界面进程，崩溃后自动重启"""
+
+    def __init__(self):
+        import multiprocessing
+        # Qt 已启动多个线程，fork 不安全，统一使用 spawn
+        self._context = multiprocessing.get_context('spawn')
+        self.messages = queue.Queue()  # 会话消息，由 RemoteTranscriptionThread 消费
+        self.pid = None
+        self.cpu_percent = None
+        self.rss_mb = None
+        self.restarts = 0
+        self._last_usage = None
+        self._closing = False
+        self._lock = threading.Lock()
+        self._start_process()
+
+    def _start_process(self):
+        parent_conn, child_conn = self._context.Pipe()
+        # RealtimeSTT 会再启动转写子进程，宿主进程不能是 daemon
+        process = self._context.Process(target=_engine_host_main,
+                                        args=(child_conn, ),
+                                        name="engine-host")
+        process.start()
+        child_conn.close()
+        self.process = process
+        self.conn = parent_conn
+        threading.Thread(target=self._read,
+                         args=(parent_conn, process),
+                         daemon=True).start()
+
+    def _read(self, conn, process):
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            if message[0] == 'usage':
+                self._update_usage(*message[1:])
+            elif message[0] == 'ready':
+                self.pid = message[1]
+            else:
+                self.messages.put(message)
+
+        process.join(timeout=2)
+        if self._closing:
+            return
+        print(f"引擎进程异常退出（退出码 {process.exitcode}），正在重启")
+        self.restarts += 1
+        self.cpu_percent = self.rss_mb = self._last_usage = None
+        time.sleep(min(5, self.restarts))  # 连续崩溃时逐步退避
+        with self._lock:
+            if self._closing:
+                return
+            self._start_process()
+        self.messages.put(('crashed', process.exitcode))
+
+    def _update_usage(self, cpu_seconds, rss_mb, measured_at):
+        if self._last_usage:
+            last_cpu, last_at = self._last_usage
+            if measured_at > last_at:
+                self.cpu_percent = (cpu_seconds - last_cpu) / (measured_at -
+                                                               last_at) * 100
+        self._last_usage = (cpu_seconds, measured_at)
+        self.rss_mb = rss_mb
+
+    def send(self, *message):
+        with self._lock:
+            try:
+                self.conn.send(message)
+            except (OSError, EOFError):
+                pass  # 进程重启中，会话会收到 crashed 消息
+
+    def close(self, timeout=5):
+        self._closing = True
+        self.send('shutdown')
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class RemoteTranscriptionThread(QThread):
+    """在引擎宿主进程中运行转写会话，本线程只转发结果；接口与 TranscriptionThread 相同"""
+    text_signal = pyqtSignal(str, object)  # 文本, 语音结束时间
+    realtime_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal()
+    status_signal = pyqtSignal(str, float)
+    ring_signal = pyqtSignal(str)
+    language_signal = pyqtSignal(str)
+
+    _session_ids = iter(range(1, sys.maxsize))
+
+    def __init__(self, host, model="tiny", enable_realtime=True, source=None):
+        super().__init__()
+        self.host = host
+        self.model = model
+        self.enable_realtime = enable_realtime
+        self.source = source
+        self.language = None
+        self.config = {}
+        self.is_recording = False
+        self.source_finished = False
+        self.realtime_busy = 0.0
+        self.final_busy = 0.0
+        self.ring = None  # 附加到引擎进程中的环形缓冲区，只读取计数器
+        self.ring_stats = None
+        self.session_id = next(self._session_ids)
+
+    def _session(self):
+        return {
+            'model': self.model,
+            'enable_realtime': self.enable_realtime,
+            'language': self.language,
+            'config': self.config,
+            'source': (self.source.files, self.source.pace)
+            if self.source else None
+        }
+
+    def run(self):
+        # 丢弃上一个会话遗留的消息
+        while not self.host.messages.empty():
+            self.host.messages.get_nowait()
+        self.host.send('start', self.session_id, self._session())
+        while True:
+            message = self.host.messages.get()
+            kind = message[0]
+            if kind == 'crashed':
+                self._detach_ring()
+                self.status_signal.emit('error', time.monotonic())
+                # 麦克风会话在重启后的进程中继续，文件输入会话直接结束
+                if self.is_recording and self.source is None:
+                    self.host.send('start', self.session_id, self._session())
+                    continue
+                break
+            if message[1] != self.session_id:
+                continue
+            if kind == 'text':
+                _, _, text, speech_end, returned_at = message
+                LATENCY.record('text_return', speech_end, returned_at)
+                self.text_signal.emit(text, speech_end)
+            elif kind == 'realtime':
+                self.realtime_signal.emit(message[2])
+            elif kind == 'status':
+                self.status_signal.emit(message[2], message[3])
+            elif kind == 'language':
+                self.language_signal.emit(message[2])
+            elif kind == 'ring':
+                self._detach_ring()
+                try:
+                    self.ring = AudioRingBuffer.attach(message[2])
+                except (OSError, ValueError) as e:
+                    print(f"读取音频缓冲区计数器失败: {e}")
+                self.ring_signal.emit(message[2])
+            elif kind == 'finished':
+                stats = message[2]
+                self._detach_ring()
+                self.ring_stats = stats['ring']
+                self.source_finished = stats['source_finished']
+                self.realtime_busy = stats['realtime_busy']
+                self.final_busy = stats['final_busy']
+                if self.source:
+                    self.source.fed_seconds = stats['fed_seconds']
+                    self.source.audio_seconds = stats['audio_seconds']
+                break
+        self.is_recording = False
+        self.finished_signal.emit()
+
+    def compute_share(self):
+        return session_compute_share(self.realtime_busy, self.final_busy)
+
+    def ring_metrics(self):
+        return session_ring_metrics(self.ring, self.ring_stats)
+
+    def _detach_ring(self):
+        ring, self.ring = self.ring, None
+        if ring:
+            ring.close()
+
+    def start_recording(self):
+        self.is_recording = True
+        self.start()
+
+    def stop_recording(self):
+        self.is_recording = False
+        self.host.send('stop', self.session_id)
+
+
+def resolve_language(value):
+    """把界面语言名称或语言代码（如 ja）解析为界面语言名称"""
+    if value in LANGUAGE_MAP:
+        return value
+    for name, code in LANGUAGE_MAP.items():
+        if code == value:
+            return name
+    raise ValueError(f"不支持的语言: {value}")
+
+
+def language_arg(value):
+    """命令行 --language 参数：无效时报告为参数错误"""
+    try:
+        return resolve_language(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def collect_audio_files(patterns):
+    """展开目录和通配符，返回排序后的 WAV/FLAC 文件列表"""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                files.extend(
+                    os.path.join(root, name) for name in names
+                    if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            files.extend(path for path in glob.glob(pattern, recursive=True)
+                         if path.lower().endswith(AUDIO_EXTENSIONS))
+    return sorted(set(files))
+
+
+# 批量转写工作进程内的模型和配置（每个进程加载一份）
+_BATCH_MODEL = None
+_BATCH_CONFIG = None
+
+
+def _init_batch_worker(model, config):
+    """批量转写工作进程初始化：每个进程只加载一次模型
+
+    翻译不在工作进程中进行，由主进程统一限速并共用翻译缓存。
+    """
+    global _BATCH_MODEL, _BATCH_CONFIG
+    from faster_whisper import WhisperModel
+    _BATCH_MODEL = WhisperModel(model,
+                                device=config['device'],
+                                compute_type=config['compute_type'],
+                                cpu_threads=config['cpu_threads'],
+                                num_workers=1)
+    _BATCH_CONFIG = config
+
+
+def _format_offset(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def batch_output_paths(files, output_dir):
+    """按输入文件相对公共目录的路径在输出目录下生成同样的子目录结构
+
+    不同目录中的同名文件不会互相覆盖；同一目录下仅扩展名不同的文件
+    （如 a.wav 与 a.flac）在结果文件名中保留扩展名。
+    """
+    paths = [os.path.abspath(path) for path in files]
+    try:
+        base = os.path.commonpath([os.path.dirname(path) for path in paths])
+    except ValueError:
+        base = None  # Windows 上跨盘符，没有公共目录
+    outputs = {}
+    for path, absolute in zip(files, paths):
+        if base is None:
+            relative = os.path.splitdrive(absolute)[1].lstrip("\\/")
+        else:
+            relative = os.path.relpath(absolute, base)
+        outputs[path] = os.path.splitext(relative)[0]
+    taken = {}
+    for path, stem in outputs.items():
+        taken.setdefault(os.path.normcase(stem), []).append(path)
+    for path, stem in outputs.items():
+        if len(taken[os.path.normcase(stem)]) > 1:
+            stem += os.path.splitext(path)[1]
+        outputs[path] = os.path.join(output_dir, stem + ".md")
+    return outputs
+
+
+def _transcribe_batch_file(path, language):
+    """在工作进程中转写单个文件，返回 (文件, 识别语言, 音频时长, 耗时, 句子列表)"""
+    config = _BATCH_CONFIG
+    started = time.perf_counter()
+    segments, info = _BATCH_MODEL.transcribe(
+        path,
+        language=LANGUAGE_MAP.get(language),
+        beam_size=config['beam_size'])
+
+    detected = resolve_language(info.language) if info.language in \
+        LANGUAGE_MAP.values() else language
+    segments = [(segment.start, segment.text.strip()) for segment in segments]
+    segments = [(start, text) for start, text in segments if text]
+    return path, detected, info.duration, time.perf_counter() - started, \
+        segments
+
+
+def write_batch_output(path, detected, duration, segments, output_path,
+                       config):
+    """在主进程中翻译一个文件的句子并写入 output_path"""
+    from_lang = BAIDU_FROM_LANG.get(detected, "auto")
+    to_lang = BAIDU_TO_LANG.get(config['target_language'], "zh")
+    translate = config['enable_translation'] and detected != "中文 (Chinese)"
+
+    lines = [
+        f"# 🎙️ 转写记录：{os.path.basename(path)}\n\n",
+        f"- 📁 **文件**：`{path}`\n",
+        f"- 🤖 **模型**：`{config['model']}`\n",
+        f"- 🌐 **语言**：`{detected}`\n",
+        f"- ⏱️ **时长**：`{duration:.1f}秒`\n\n",
+        "## 📄 转写内容\n\n"
+    ]
+    # 整个文件的句子一次提交：百度翻译合并请求，本地模型成批计算
+    translations = [
+        translate_async(text, from_lang, to_lang, config['translation_backend'])
+        if translate else None for _, text in segments
+    ]
+    for (start, text), translation in zip(segments, translations):
+        lines.append(f"`[{_format_offset(start)}]`\n")
+        if detected == "日语 (Japanese)":
+            lines.append(f"> {add_furigana(text)}\n")
+        else:
+            lines.append(f"> {text}\n")
+        translated_text = translation.result() if translation else None
+        if translated_text:
+            lines.append(f"> 🔄 译文：{translated_text}\n")
+        lines.append("\n")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def run_batch(args):
+    """无界面批量转写：按进程池分发文件，每个进程常驻一份模型"""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    files = collect_audio_files(args.batch)
+    if not files:
+        print("未找到 WAV/FLAC 文件")
+        return 1
+
+    language = resolve_language(args.language)
+    config = dict(DEFAULT_CONFIG,
+                  model=args.model,
+                  device=args.device,
+                  compute_type=args.compute_type,
+                  beam_size=args.beam_size,
+                  cpu_threads=args.cpu_threads,
+                  enable_translation=args.translate,
+                  target_language=args.target_language,
+                  **translator_config(args))
+    # cpu_threads 为 0 时由 CTranslate2 决定，默认每个模型 4 个线程
+    threads = args.cpu_threads or 4
+    workers = args.workers or max(1, (os.cpu_count() or 1) // threads)
+    workers = min(workers, len(files))
+    os.makedirs(args.output, exist_ok=True)
+    outputs = batch_output_paths(files, args.output)
+
+    print(f"批量转写 {len(files)} 个文件：{workers} 个进程 × "
+          f"{args.cpu_threads or '自动'} 线程，模型 {args.model}/{args.compute_type}")
+    # 工作进程只负责转写，翻译在主进程中进行：百度翻译的 QPS 限制对整个
+    # 批量任务生效，所有文件共用一个翻译缓存连接
+    if args.translate:
+        configure_translators(config)
+    started = time.perf_counter()
+    audio_seconds = 0.0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_batch_worker,
+                             initargs=(args.model, config)) as executor:
+        futures = {
+            executor.submit(_transcribe_batch_file, path, language): path
+            for path in files
+        }
+        for future in as_completed(futures):
+            try:
+                path, detected, duration, elapsed, segments = future.result()
+                write_batch_output(path, detected, duration, segments,
+                                   outputs[path], config)
+                audio_seconds += duration
+                print(f"✅ {path}（音频 {duration:.1f}秒，耗时 {elapsed:.1f}秒）")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {futures[future]} 转写失败: {e}")
+
+    TRANSLATION_CACHE.flush()
+    wall_seconds = time.perf_counter() - started
+    print("\n批量转写完成：")
+    print(f"- 文件：{len(files) - failed} 成功 / {failed} 失败")
+    print(f"- 音频总时长：{audio_seconds / 3600:.2f} 小时")
+    print(f"- 实际耗时：{wall_seconds / 3600:.2f} 小时")
+    print(f"- 吞吐量：{audio_seconds / max(wall_seconds, 1e-6):.1f} "
+          "音频小时/实际小时")
+    return 1 if failed else 0
+
+
+# 自动调优的候选项，均按准确度从低到高排列
+TUNE_MODELS = ["tiny", "base", "small", "medium", "large"]
+TUNE_BEAM_SIZES = [1, 3, 5]
+TUNE_PAUSES = [0.1, 0.2, 0.3, 0.5, 1.0]
+COMPUTE_TYPE_ACCURACY = [
+    "int8", "int8_float16", "int8_float32", "int16", "float16", "float32"
+]
+
+
+def machine_fingerprint(device):
+    """标识当前硬件，硬件变化后旧的调优结果不再使用"""
+    return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}|{device}"
+
+
+def load_engine_profile(device):
+    """读取与当前硬件匹配的调优结果，没有时返回 None"""
+    try:
+        with open(ENGINE_PROFILE_FILE, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if profile.get('fingerprint') != machine_fingerprint(device):
+        return None
+    return profile
+
+
+# 调优结果包含的设置项
+TUNED_KEYS = ('model', 'beam_size', 'compute_type', 'realtime_processing_pause')
+
+
+def engine_profile_settings(profile):
+    """调优结果中应套用的设置：调优值，加上用户之后手动修改的值"""
+    settings = {key: profile[key] for key in TUNED_KEYS}
+    settings.update(profile.get('overrides', {}))
+    return settings
+
+
+def save_engine_profile(profile):
+    tmp_path = ENGINE_PROFILE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, ENGINE_PROFILE_FILE)
+
+
+# 合成校准音频的元音共振峰 (F1, F2, F3)，Hz
+SYNTH_VOWELS = [(730, 1090, 2440), (270, 2290, 3010), (300, 870, 2240),
+                (530, 1840, 2480), (570, 840, 2410)]
+
+
+def synthesize_speech(path, seconds=8.0, sample_rate=16000, seed=0):
+    """合成一段类语音音频（16 位单声道 WAV）：音节、停顿和语调与说话相近
+
+    由变化基频的脉冲串经元音共振峰滤波得到，辅音用短噪声代替。内容没有意义，
+    模型对它的转写耗时不代表真实语音，只用于基准测试的 --synthetic 模式检查
+    测量流程，不用于自动调优。
+    """
+    import wave
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    pieces = []
+    total = int(seconds * sample_rate)
+    produced = 0
+    while produced < total:
+        for _ in range(rng.integers(2, 5)):  # 一个词 2～4 个音节
+            length = int(rng.uniform(0.14, 0.26) * sample_rate)
+            t = np.arange(length) / sample_rate
+            f0 = rng.uniform(100, 170) * (1 + 0.15 * np.sin(2 * np.pi * t * 2))
+            phase = np.cumsum(f0 / sample_rate)
+            pulses = (np.diff(np.floor(phase), prepend=0) > 0).astype(float)
+            spectrum = np.fft.rfft(pulses)
+            freqs = np.fft.rfftfreq(length, 1 / sample_rate)
+            gain = np.zeros_like(freqs)
+            for formant, amplitude in zip(SYNTH_VOWELS[rng.integers(5)],
+                                          (1.0, 0.6, 0.3)):
+                gain += amplitude / (1 + ((freqs - formant) / 80)**2)
+            voiced = np.fft.irfft(spectrum * gain, length)
+            voiced *= np.hanning(length)**0.5
+            consonant = rng.normal(0, 0.3, int(0.04 * sample_rate))
+            consonant *= np.hanning(len(consonant))
+            pieces += [consonant * voiced.std(), voiced]
+            produced += length + len(consonant)
+        pause = int(rng.uniform(0.05, 0.35) * sample_rate)
+        pieces.append(rng.normal(0, 1e-4, pause))
+        produced += pause
+    audio = np.concatenate(pieces)[:total]
+    audio = (audio / np.abs(audio).max() * 0.5 * 32767).astype(np.int16)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(audio.tobytes())
+    return path
+
+
+def calibration_sample():
+    """返回校准音频 (路径, 语言代码)，没有真实录音时返回 None
+
+    使用基准样本清单中第一个存在的录音（benchmarks/fetch_fixtures.py 下载）。
+    """
+    try:
+        with open(CALIBRATION_MANIFEST, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    base = os.path.dirname(CALIBRATION_MANIFEST)
+    for fixture in manifest.get('fixtures', []):
+        path = os.path.join(base, fixture['file'])
+        if os.path.exists(path):
+            return path, fixture['language']
+    return None
+
+
+def model_is_cached(model_name):
+    """模型是否已在本地缓存中（调优不为候选模型下载文件）"""
+    try:
+        from faster_whisper.utils import download_model
+        download_model(model_name, local_files_only=True)
+        return True
+    except Exception:
+        return False
+
+
+def transcribe_until(model, audio, cancelled, **kwargs):
+    """逐段取转写结果，每段之间检查是否取消；取消时返回 False"""
+    segments, _ = model.transcribe(audio, **kwargs)
+    for _ in segments:
+        if cancelled():
+            return False
+    return not cancelled()
+
+
+def tune_engine(sample_path,
+                language,
+                device,
+                silence_duration,
+                latency_target,
+                progress=print,
+                cancelled=lambda: False,
+                cpu_threads=0,
+                current_model=None):
+    """在本机测量候选设置的转写耗时，选出满足延迟目标的最准确设置
+
+    语音结束到出字的延迟按“静音检测时长 + 整句转写耗时”估计；实时处理间隔取
+    能跟上实时模型（RealtimeSTT 默认 tiny，beam 3）处理 3 秒片段的最小值。
+    某个模型在最快设置下也超出目标时不再尝试更大的模型。只测量本地已缓存的
+    模型和当前选择的模型，不为其他候选模型下载文件。
+    """
+    from faster_whisper import WhisperModel, decode_audio
+
+    audio = decode_audio(sample_path, sampling_rate=16000)
+    compute_types = DEVICE_COMPUTE_TYPES.get(device, ["float32"])
+    measurements = []
+    realtime_cost = {}
+    for model_name in TUNE_MODELS:
+        if model_name != current_model and not model_is_cached(model_name):
+            print(f"跳过未下载的模型: {model_name}")
+            continue
+        model_fits = False
+        for compute_type in compute_types:
+            if cancelled():
+                return None
+            progress(f"⏳ 正在调优：{model_name} / {compute_type}")
+            try:
+                model = WhisperModel(model_name,
+                                     device=device,
+                                     compute_type=compute_type,
+                                     cpu_threads=cpu_threads)
+            except Exception as e:
+                print(f"加载 {model_name}/{compute_type} 失败: {e}")
+                continue
+            # 预热一次，避免把首次调用的初始化开销算进去
+            if not transcribe_until(model, audio[:16000], cancelled,
+                                    language=language):
+                return None
+            if model_name == "tiny":
+                started = time.perf_counter()
+                if not transcribe_until(model, audio[:48000], cancelled,
+                                        language=language, beam_size=3):
+                    return None
+                realtime_cost[compute_type] = time.perf_counter() - started
+            for beam_size in TUNE_BEAM_SIZES:
+                started = time.perf_counter()
+                if not transcribe_until(model, audio, cancelled,
+                                        language=language,
+                                        beam_size=beam_size):
+                    return None
+                latency = silence_duration + time.perf_counter() - started
+                measurements.append({
+                    'model': model_name,
+                    'compute_type': compute_type,
+                    'beam_size': beam_size,
+                    'latency': round(latency, 3)
+                })
+                model_fits = model_fits or latency <= latency_target
+            del model
+        if not model_fits:
+            break
+
+    if not measurements:
+        return None
+
+    def accuracy(m):
+        return (TUNE_MODELS.index(m['model']), m['beam_size'],
+                COMPUTE_TYPE_ACCURACY.index(m['compute_type'])
+                if m['compute_type'] in COMPUTE_TYPE_ACCURACY else 0,
+                -m['latency'])
+
+    fitting = [m for m in measurements if m['latency'] <= latency_target]
+    best = max(fitting, key=accuracy) if fitting else min(
+        measurements, key=lambda m: m['latency'])
+    cost = realtime_cost.get(best['compute_type'])
+    if cost is None:
+        # 没有测量 tiny 模型时使用 RealtimeSTT 的默认处理间隔
+        pause = DEFAULT_CONFIG['realtime_processing_pause']
+    else:
+        pause = next((p for p in TUNE_PAUSES if p >= cost * 1.5),
+                     TUNE_PAUSES[-1])
+    return {
+        'fingerprint': machine_fingerprint(device),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'sample': sample_path,
+        'latency_target': latency_target,
+        'met_target': bool(fitting),
+        'model': best['model'],
+        'beam_size': best['beam_size'],
+        'compute_type': best['compute_type'],
+        'realtime_processing_pause': pause,
+        'expected_latency': best['latency'],
+        'measurements': measurements
+    }
+
+
+class RealtimeRenderer(QObject):
+    """实时文本渲染调度：每帧最多渲染一次，丢弃过时的中间结果，只替换变化的后缀"""
+
+    def __init__(self, text_edit, frame_interval_ms=16):
+        super().__init__(text_edit)
+        self.text_edit = text_edit
+        self.frame_interval = frame_interval_ms / 1000
+        self.pending = None
+        self.displayed = ""
+        self.received = 0
+        self.rendered = 0
+        self.last_render = 0.0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.render)
+
+    def submit(self, text):
+        """收到新的实时结果：距上次渲染已满一帧则立即渲染，否则等到下一帧"""
+        self.received += 1
+        self.pending = text
+        if self.timer.isActive():
+            return
+        wait = self.last_render + self.frame_interval - time.monotonic()
+        if wait <= 0:
+            self.render()
+        else:
+            self.timer.start(int(wait * 1000) + 1)
+
+    def render(self):
+        text = self.pending
+        self.pending = None
+        if text is None or text == self.displayed:
+            return
+
+        # 只替换与已显示文本不同的后缀，QTextCursor 位置以 UTF-16 计
+        prefix = os.path.commonprefix([self.displayed, text])
+        cursor = QTextCursor(self.text_edit.document())
+        cursor.setPosition(len(prefix.encode("utf-16-le")) // 2)
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        cursor.insertText(text[len(prefix):])
+
+        scroll_bar = self.text_edit.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+        self.displayed = text
+        self.rendered += 1
+        self.last_render = time.monotonic()
+
+    def reset(self):
+        self.timer.stop()
+        self.pending = None
+        self.displayed = ""
+        self.received = 0
+        self.rendered = 0
+        self.text_edit.clear()
+
+
+# 推测翻译按分句切分：全角标点直接切分，半角标点须后跟空白（避免切开 3.14）
+CLAUSE_END_RE = re.compile(r'[。！？；，、]|[.!?;,](?=\s)')
+SPECULATIVE_MAX_CHARS = 40  # 没有标点时，稳定部分超过此长度也送去翻译
+NO_SPACE_LANGS = ('zh', 'cht', 'jp', 'kor')
+
+
+class SpeculativeTranslator(QObject):
+    """实时预览的推测翻译：说话过程中就翻译已稳定的前缀，整句结束时先显示推测译文
+
+    连续几次实时结果的公共前缀视为稳定，只把新稳定的分句送去翻译（经翻译缓存，
+    整句与某个分句相同时直接命中）。新的结果改写了已翻译的部分时回退，被取代
+    的在途请求的结果直接丢弃。所有方法都在界面线程调用。
+    """
+
+    text_changed = pyqtSignal(str)  # 当前句子的推测译文
+    _chunk_done = pyqtSignal(int, object)  # 分句编号, 译文（跨线程送回界面线程）
+
+    def __init__(self, agreement=2, parent=None):
+        super().__init__(parent)
+        self.agreement = agreement
+        self._chunk_done.connect(self._on_chunk_done)
+        self._next_id = 0
+        self._pending = {}  # 编号 -> 分句，尚未返回且未被取代
+        self._waiting = []  # (分句列表, 回调)：整句已结束、等待推测译文补齐
+        self.reset_stats()
+        self.reset()
+
+    def reset_stats(self):
+        self.sent = 0
+        self.superseded = 0
+        self.previews = 0
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'superseded': self.superseded,
+            'previews': self.previews
+        }
+
+    def reset(self):
+        """开始新的句子：丢弃尚未稳定的内容"""
+        self.history = deque(maxlen=max(1, self.agreement))
+        self.committed = ""  # 已送去翻译的稳定前缀
+        self.chunks = []
+        self.joiner = ""
+        self.text_changed.emit("")
+
+    def clear(self):
+        """停止录音：所有在途请求的结果都不再使用"""
+        self._pending.clear()
+        self._waiting.clear()
+        self.reset()
+
+    def update(self, text, from_lang, to_lang, backend):
+        """收到新的实时结果"""
+        self.history.append(text)
+        if len(self.history) < self.history.maxlen:
+            return
+        stable = os.path.commonprefix(list(self.history))
+        if not stable.startswith(self.committed):
+            self._rollback(stable)
+
+        new = stable[len(self.committed):]
+        cut = 0
+        for match in CLAUSE_END_RE.finditer(new):
+            cut = match.end()
+        if not cut and len(new) >= SPECULATIVE_MAX_CHARS:
+            # 没有标点：按空格切分，避免切开单词；不用空格的语言整段送出
+            space = new.rstrip().rfind(" ")
+            cut = space if space > 0 else len(new)
+        if not cut:
+            return
+
+        source = new[:cut]
+        self.committed += source
+        if not source.strip():
+            return
+        self.joiner = "" if to_lang in NO_SPACE_LANGS else " "
+        chunk = {'id': self._next_id, 'source': source, 'translation': None}
+        self._next_id += 1
+        self.chunks.append(chunk)
+        self._pending[chunk['id']] = chunk
+        self.sent += 1
+        future = translate_async(source.strip(), from_lang, to_lang, backend)
+        future.add_done_callback(
+            lambda f: self._chunk_done.emit(chunk['id'], f.result()))
+        self._emit_text()
+
+    def _rollback(self, stable):
+        """新的结果改写了已翻译的部分：保留仍然一致的分句，其余作废"""
+        committed = ""
+        for keep, chunk in enumerate(self.chunks):
+            if not stable.startswith(committed + chunk['source']):
+                break
+            committed += chunk['source']
+        else:
+            keep = len(self.chunks)
+        for chunk in self.chunks[keep:]:
+            if self._pending.pop(chunk['id'], None):
+                self.superseded += 1
+        del self.chunks[keep:]
+        self.committed = committed
+        self._emit_text()
+
+    def finish(self, text, callback):
+        """整句识别完成：推测部分与最终结果一致时，推测译文齐全后调用 callback(译文, 是否完整)
+
+        最终结果与推测的原文不一致时放弃推测译文，等待整句翻译。
+        """
+
+        def squeeze(value):
+            return "".join(TranslationCache.normalize(value).split())
+
+        covered = "".join(chunk['source'] for chunk in self.chunks)
+        chunks = self.chunks
+        if covered.strip() and squeeze(text).startswith(squeeze(covered)):
+            complete = squeeze(text) == squeeze(covered)
+            self._waiting.append((chunks, self.joiner, complete, callback))
+            self._flush_waiting()
+        else:
+            for chunk in chunks:
+                if self._pending.pop(chunk['id'], None):
+                    self.superseded += 1
+        self.reset()
+
+    def _on_chunk_done(self, chunk_id, translation):
+        chunk = self._pending.pop(chunk_id, None)
+        if chunk is None:
+            return  # 已被更新的结果取代
+        chunk['translation'] = translation or ""
+        self._emit_text()
+        self._flush_waiting()
+
+    def _flush_waiting(self):
+        waiting = []
+        for chunks, joiner, complete, callback in self._waiting:
+            if any(chunk['translation'] is None for chunk in chunks):
+                waiting.append((chunks, joiner, complete, callback))
+                continue
+            translation = joiner.join(
+                chunk['translation'] for chunk in chunks if chunk['translation'])
+            if translation:
+                self.previews += 1
+                callback(translation, complete and all(
+                    chunk['translation'] for chunk in chunks))
+        self._waiting = waiting
+
+    def _emit_text(self):
+        self.text_changed.emit(
+            self.joiner.join(chunk['translation'] or "…"
+                             for chunk in self.chunks))
+
+
+SPILL_FILE_PREFIX = "transcript-view-"
+
+
+class SegmentSpill:
+    """完整转写的磁盘溢出文件：超出内存上限的句子写入 JSONL，按需分页读回
+
+    句子更新（如译文迟到）时追加新记录并指向它，旧记录留在文件中直到关闭。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = {}  # 句子序号 -> 文件偏移
+        self._file = None
+
+    @staticmethod
+    def remove_stale(directory):
+        """删除崩溃后遗留的其他进程的溢出文件"""
+        for path in glob.glob(
+                os.path.join(directory, SPILL_FILE_PREFIX + "*.jsonl")):
+            name = os.path.basename(path)[len(SPILL_FILE_PREFIX):-len(".jsonl")]
+            if not name.isdigit() or int(name) == os.getpid():
+                continue
+            if os.name != 'nt':
+                try:
+                    os.kill(int(name), 0)
+                    continue  # 进程仍在运行
+                except ProcessLookupError:
+                    pass
+                except PermissionError:
+                    continue
+            try:
+                # Windows 上不能删除其他进程打开中的文件，删除失败即仍在使用
+                os.remove(path)
+            except OSError:
+                pass
+
+    def write(self, index, segment, replace=False):
+        """写入一句；已写入的句子只有 replace 为 True 时才写入新版本"""
+        if index in self.offsets and not replace:
+            return
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "w+b")
+        self._file.seek(0, os.SEEK_END)
+        self.offsets[index] = self._file.tell()
+        self._file.write(
+            json.dumps(segment, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def read(self, index):
+        self._file.seek(self.offsets[index])
+        return json.loads(self._file.readline())
+
+    def update(self, index, **fields):
+        """更新一句已溢出到磁盘的记录"""
+        if index not in self.offsets:
+            return
+        segment = self.read(index)
+        segment.update(fields)
+        self.write(index, segment, replace=True)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+            os.remove(self.path)
+        self.offsets = {}
+
+
+class TranscriptModel(QAbstractListModel):
+    """完整转写列表模型：内存中只保留一个窗口的句子，其余溢出到磁盘，向上滚动时分页读回"""
+
+    def __init__(self, max_segments=2000, page_size=200, parent=None):
+        super().__init__(parent)
+        self.max_segments = max_segments
+        self.page_size = page_size
+        SegmentSpill.remove_stale(CACHE_DIR)
+        self.spill = SegmentSpill(
+            os.path.join(CACHE_DIR,
+                         f"{SPILL_FILE_PREFIX}{os.getpid()}.jsonl"))
+        self._segments = []
+        self._first = 0  # 内存窗口第一句的全局序号
+        self._changed = set()  # 读回内存后又被修改、溢出文件中已过时的句子
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._segments)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        segment = self._segments[index.row()]
+        text = f"[{segment['time']}] {segment['text']}"
+        if segment.get('translation'):
+            text += f"\n🔄 {segment['translation']}"
+        return text
+
+    def append_segment(self, current_time, text, trim=True):
+        """追加一句，返回全局序号；trim 为 True 时把内存窗口压回上限"""
+        index = self._first + len(self._segments)
+        row = len(self._segments)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._segments.append({
+            'time': current_time,
+            'text': text,
+            'translation': None
+        })
+        self.endInsertRows()
+        if trim:
+            self.trim()
+        return index
+
+    def set_translation(self, index, translation):
+        row = index - self._first
+        if row < 0:
+            # 已移出内存的句子直接更新溢出文件
+            self.spill.update(index, translation=translation)
+        elif row < len(self._segments):
+            self._segments[row]['translation'] = translation
+            if index in self.spill.offsets:
+                self._changed.add(index)
+            model_index = self.index(row)
+            self.dataChanged.emit(model_index, model_index)
+
+    def trim(self):
+        """把最早的句子写入溢出文件并移出内存"""
+        excess = len(self._segments) - self.max_segments
+        if excess <= 0:
+            return
+        for offset in range(excess):
+            index = self._first + offset
+            self.spill.write(index,
+                             self._segments[offset],
+                             replace=index in self._changed)
+            self._changed.discard(index)
+        self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+        del self._segments[:excess]
+        self._first += excess
+        self.endRemoveRows()
+
+    def can_page_back(self):
+        return self._first > 0
+
+    def page_back(self):
+        """从溢出文件读回上一页，返回读回的句数"""
+        count = min(self.page_size, self._first)
+        if count <= 0:
+            return 0
+        start = self._first - count
+        segments = [self.spill.read(i) for i in range(start, self._first)]
+        self.beginInsertRows(QModelIndex(), 0, count - 1)
+        self._segments[:0] = segments
+        self._first = start
+        self.endInsertRows()
+        return count
+
+    def clear(self):
+        self.beginResetModel()
+        self._segments = []
+        self._first = 0
+        self._changed.clear()
+        self.spill.close()
+        self.endResetModel()
 
 
 class MaterialButton(QPushButton):
@@ -231,8 +3216,10 @@ class MaterialButton(QPushButton):
 
 class ConfigDialog(QDialog):
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, model="tiny"):
         super().__init__(parent)
+        self.model = model  # 用于显示所选精度下该模型的内存占用
+        self.retune_requested = False
         self.init_ui()
 
     def init_ui(self):
@@ -289,6 +3276,10 @@ class ConfigDialog(QDialog):
         trans_tab = self.create_trans_tab()
         tabs.addTab(trans_tab, "翻译设置")
 
+        # 日志设置
+        log_tab = self.create_log_tab()
+        tabs.addTab(log_tab, "日志设置")
+
         layout.addWidget(tabs)
 
         # 按钮
@@ -367,27 +3358,154 @@ class ConfigDialog(QDialog):
 
         # 计算精度选项
         self.compute_type_combo = QComboBox()
-        self.compute_type_combo.addItems(["float16", "float32"])
         grid.addWidget(QLabel("计算精度:"), 3, 0)
         grid.addWidget(self.compute_type_combo, 3, 1)
+        self.memory_label = QLabel("")
+        grid.addWidget(self.memory_label, 3, 2)
 
-        # 当设备切换时自动调整精度
+        # 当设备切换时只提供该设备支持的精度
         def on_device_changed(device):
-            if device == "cpu":
-                self.compute_type_combo.setCurrentText("float32")
-                self.compute_type_combo.setEnabled(False)
-            else:
-                self.compute_type_combo.setEnabled(True)
+            current = self.compute_type_combo.currentText()
+            types = DEVICE_COMPUTE_TYPES.get(device, ["float32"])
+            self.compute_type_combo.clear()
+            self.compute_type_combo.addItems(types)
+            if current in types:
+                self.compute_type_combo.setCurrentText(current)
 
         self.device_combo.currentTextChanged.connect(on_device_changed)
+        self.compute_type_combo.currentTextChanged.connect(
+            self.update_memory_label)
         # 初始化时检查一次
         on_device_changed(self.device_combo.currentText())
 
+        # 常驻模型内存上限
+        self.pool_memory = QSpinBox()
+        self.pool_memory.setRange(256, 65536)
+        self.pool_memory.setSingleStep(256)
+        self.pool_memory.setValue(4096)
+        grid.addWidget(QLabel("常驻模型内存上限(MB):"), 4, 0)
+        grid.addWidget(self.pool_memory, 4, 1)
+
+        # 后台预加载所选模型
+        self.preload_model = QCheckBox("后台预加载所选模型")
+        self.preload_model.setChecked(True)
+        grid.addWidget(self.preload_model, 5, 0, 1, 2)
+
+        # 完整转写视图的内存句数上限
+        self.view_max_segments = QSpinBox()
+        self.view_max_segments.setRange(100, 100000)
+        self.view_max_segments.setSingleStep(500)
+        self.view_max_segments.setValue(2000)
+        grid.addWidget(QLabel("完整转写内存句数:"), 6, 0)
+        grid.addWidget(self.view_max_segments, 6, 1)
+
+        # CPU 推理线程数和并行模型实例数
+        self.cpu_threads = QSpinBox()
+        self.cpu_threads.setRange(0, os.cpu_count() or 64)
+        self.cpu_threads.setSpecialValueText("自动")
+        grid.addWidget(QLabel("CPU 推理线程数:"), 7, 0)
+        grid.addWidget(self.cpu_threads, 7, 1)
+
+        self.num_workers = QSpinBox()
+        self.num_workers.setRange(1, 16)
+        self.num_workers.setValue(1)
+        grid.addWidget(QLabel("并行模型实例数:"), 8, 0)
+        grid.addWidget(self.num_workers, 8, 1)
+        if recorder_supports('num_workers') is False:
+            self.num_workers.setEnabled(False)
+            self.num_workers.setToolTip("当前安装的 RealtimeSTT 版本不支持此参数")
+
+        # 自动调优的延迟目标
+        self.latency_target = QDoubleSpinBox()
+        self.latency_target.setRange(0.5, 10.0)
+        self.latency_target.setSingleStep(0.5)
+        self.latency_target.setValue(2.0)
+        grid.addWidget(QLabel("出字延迟目标(秒):"), 9, 0)
+        grid.addWidget(self.latency_target, 9, 1)
+
+        # 硬件变化后重新调优（保存配置后开始）
+        self.retune_button = MaterialButton("重新调优", "secondary")
+        grid.addWidget(self.retune_button, 10, 0, 1, 2)
+
+        def on_retune():
+            self.retune_requested = True
+            self.accept()
+
+        self.retune_button.clicked.connect(on_retune)
+
+        # 实时预览模型和主模型分开设置
+        self.realtime_model_combo = QComboBox()
+        self.realtime_model_combo.addItem("同主模型", "")
+        for name in MODEL_MEMORY_MB:
+            self.realtime_model_combo.addItem(name, name)
+        self.realtime_model_combo.setCurrentIndex(
+            self.realtime_model_combo.findData("tiny"))
+        self.realtime_model_combo.currentIndexChanged.connect(
+            self.update_memory_label)
+        grid.addWidget(QLabel("实时预览模型:"), 11, 0)
+        grid.addWidget(self.realtime_model_combo, 11, 1)
+
+        self.beam_size_realtime = QSpinBox()
+        self.beam_size_realtime.setRange(1, 10)
+        self.beam_size_realtime.setValue(3)
+        grid.addWidget(QLabel("实时 Beam Size:"), 12, 0)
+        grid.addWidget(self.beam_size_realtime, 12, 1)
+
+        # 上次录音中实时模型和主模型的推理耗时占比
+        self.compute_share_label = QLabel("算力占比：录音后统计")
+        grid.addWidget(self.compute_share_label, 13, 0, 1, 3)
+
+        # 独立的引擎进程
+        self.engine_process = QCheckBox("在独立进程中运行识别引擎（崩溃后自动重启）")
+        self.engine_process.setChecked(True)
+        grid.addWidget(self.engine_process, 14, 0, 1, 3)
+
+        # 音频环形缓冲区：推理跟不上时积压在这里，写满时按策略处理
+        self.audio_buffer_seconds = QDoubleSpinBox()
+        self.audio_buffer_seconds.setRange(1.0, 120.0)
+        self.audio_buffer_seconds.setSingleStep(1.0)
+        self.audio_buffer_seconds.setValue(10.0)
+        grid.addWidget(QLabel("音频缓冲区(秒):"), 15, 0)
+        grid.addWidget(self.audio_buffer_seconds, 15, 1)
+
+        self.audio_overflow_policy = QComboBox()
+        for policy, label in RING_POLICIES.items():
+            self.audio_overflow_policy.addItem(label, policy)
+        self.audio_overflow_policy.setToolTip(
+            "麦克风无法等待，阻塞策略对麦克风按丢弃最早的音频处理；文件输入总是等待")
+        grid.addWidget(QLabel("缓冲区写满时:"), 16, 0)
+        grid.addWidget(self.audio_overflow_policy, 16, 1)
+        self.update_memory_label()
+
         group.setLayout(grid)
         layout.addWidget(group)
         tab.setLayout(layout)
         return tab
 
+    def update_memory_label(self, *args):
+        """显示主模型与实时模型的内存占用（实测值或估计值）及合计"""
+        compute_type = self.compute_type_combo.currentText()
+        if not compute_type or not hasattr(self, 'realtime_model_combo'):
+            return
+        device = self.device_combo.currentText()
+
+        def describe(model):
+            measured = measured_model_memory(model, device, compute_type)
+            if measured:
+                # 实测的是整个录音器的加载增量，含 VAD 和运行时
+                return f"{model} 录音器实测约 {measured} MB", measured
+            estimate = model_memory_mb(model, device, compute_type)
+            return f"{model} 估计约 {estimate:.0f} MB", estimate
+
+        realtime_model = self.realtime_model_combo.currentData()
+        text, _ = describe(self.model)
+        if realtime_model and realtime_model != self.model:
+            realtime_text, _ = describe(realtime_model)
+            total = recorder_memory_mb(self.model, realtime_model, device,
+                                       compute_type)
+            text = f"{text}；实时 {realtime_text}；合计约 {total:.0f} MB"
+        self.memory_label.setText(text)
+
     def create_trans_tab(self):
         tab = QWidget()
         layout = QGridLayout()
@@ -419,6 +3537,172 @@ class ConfigDialog(QDialog):
         grid.addWidget(QLabel("目标语言:"), 3, 0)
         grid.addWidget(self.target_lang, 3, 1)
 
+        # 账户 QPS 上限
+        self.baidu_qps = QSpinBox()
+        self.baidu_qps.setRange(1, 100)
+        self.baidu_qps.setValue(1)
+        grid.addWidget(QLabel("QPS 上限:"), 4, 0)
+        grid.addWidget(self.baidu_qps, 4, 1)
+
+        # 翻译并发数
+        self.trans_concurrency = QSpinBox()
+        self.trans_concurrency.setRange(1, 16)
+        self.trans_concurrency.setValue(4)
+        grid.addWidget(QLabel("翻译并发数:"), 5, 0)
+        grid.addWidget(self.trans_concurrency, 5, 1)
+
+        # 单句翻译截止时间
+        self.trans_deadline = QDoubleSpinBox()
+        self.trans_deadline.setRange(1.0, 60.0)
+        self.trans_deadline.setSingleStep(1.0)
+        self.trans_deadline.setValue(8.0)
+        grid.addWidget(QLabel("翻译超时(秒):"), 6, 0)
+        grid.addWidget(self.trans_deadline, 6, 1)
+
+        # 翻译后端：在线百度翻译或本地离线模型
+        self.translation_backend = QComboBox()
+        for translator in TRANSLATORS.values():
+            self.translation_backend.addItem(translator.label, translator.name)
+        grid.addWidget(QLabel("翻译后端:"), 7, 0)
+        grid.addWidget(self.translation_backend, 7, 1)
+
+        # 本地翻译模型目录（每个语言对一个 CTranslate2 模型子目录，如 en-zh）
+        self.local_translation_dir = QLineEdit()
+        self.local_translation_dir.setPlaceholderText("如 models/translation")
+        local_dir_button = MaterialButton("选择...", "secondary")
+
+        def choose_local_dir():
+            path = QFileDialog.getExistingDirectory(
+                self, "选择本地翻译模型目录",
+                self.local_translation_dir.text())
+            if path:
+                self.local_translation_dir.setText(path)
+                update_local_pairs()
+
+        local_dir_button.clicked.connect(choose_local_dir)
+        grid.addWidget(QLabel("本地模型目录:"), 8, 0)
+        grid.addWidget(self.local_translation_dir, 8, 1)
+        grid.addWidget(local_dir_button, 8, 2)
+
+        self.local_pairs_label = QLabel("")
+        grid.addWidget(self.local_pairs_label, 9, 1, 1, 2)
+
+        def update_local_pairs():
+            pairs = LocalTranslator(self.local_translation_dir.text()).pairs()
+            self.local_pairs_label.setText(
+                "可用语言对：" + "、".join(pairs) if pairs else "目录中没有可用的模型")
+
+        self.local_translation_dir.editingFinished.connect(update_local_pairs)
+
+        self.local_translation_threads = QSpinBox()
+        self.local_translation_threads.setRange(0, 64)
+        self.local_translation_threads.setSpecialValueText("自动")
+        grid.addWidget(QLabel("本地推理线程数:"), 10, 0)
+        grid.addWidget(self.local_translation_threads, 10, 1)
+
+        def on_backend_changed(index):
+            # 百度翻译的参数只对百度后端有效，本地后端的参数同理
+            baidu = self.translation_backend.itemData(index) == 'baidu'
+            for widget in (self.baidu_appid, self.baidu_key, self.baidu_qps):
+                widget.setEnabled(baidu)
+            for widget in (self.local_translation_dir, local_dir_button,
+                           self.local_translation_threads):
+                widget.setEnabled(not baidu)
+
+        self.translation_backend.currentIndexChanged.connect(
+            on_backend_changed)
+        on_backend_changed(self.translation_backend.currentIndex())
+        self.update_local_pairs = update_local_pairs
+
+        # 推测翻译：说话过程中翻译实时预览中已稳定的部分
+        self.speculative_translation = QCheckBox("推测翻译实时预览")
+        self.speculative_translation.setToolTip(
+            "说话过程中翻译已稳定的分句，整句结束时先显示推测译文，再替换为整句译文")
+        grid.addWidget(self.speculative_translation, 11, 0, 1, 2)
+
+        self.speculative_agreement = QSpinBox()
+        self.speculative_agreement.setRange(1, 5)
+        self.speculative_agreement.setToolTip("连续几次实时结果一致的前缀视为稳定；"
+                                              "越大越少作废，但译文出现越晚")
+        grid.addWidget(QLabel("稳定判定次数:"), 12, 0)
+        grid.addWidget(self.speculative_agreement, 12, 1)
+
+        # 各翻译后端在本次运行中的请求耗时
+        self.translator_stats_label = QLabel(format_translator_stats())
+        grid.addWidget(self.translator_stats_label, 13, 0, 1, 3)
+
+        group.setLayout(grid)
+        layout.addWidget(group)
+        tab.setLayout(layout)
+        return tab
+
+    def create_log_tab(self):
+        tab = QWidget()
+        layout = QGridLayout()
+        group = QGroupBox("日志参数")
+        grid = QGridLayout()
+
+        # fsync 策略
+        self.fsync_policy = QComboBox()
+        for policy, label in LOG_FSYNC_POLICIES.items():
+            self.fsync_policy.addItem(label, policy)
+        grid.addWidget(QLabel("落盘同步(fsync):"), 0, 0)
+        grid.addWidget(self.fsync_policy, 0, 1)
+
+        # 定时同步间隔
+        self.fsync_interval = QDoubleSpinBox()
+        self.fsync_interval.setRange(0.5, 300.0)
+        self.fsync_interval.setSingleStep(0.5)
+        self.fsync_interval.setValue(5.0)
+        grid.addWidget(QLabel("定时同步间隔(秒):"), 1, 0)
+        grid.addWidget(self.fsync_interval, 1, 1)
+
+        def on_policy_changed(index):
+            self.fsync_interval.setEnabled(
+                self.fsync_policy.itemData(index) == 'interval')
+
+        self.fsync_policy.currentIndexChanged.connect(on_policy_changed)
+        on_policy_changed(self.fsync_policy.currentIndex())
+
+        # 日志分段方式
+        self.log_rotation = QComboBox()
+        for rotation, label in LOG_ROTATIONS.items():
+            self.log_rotation.addItem(label, rotation)
+        grid.addWidget(QLabel("日志分段:"), 2, 0)
+        grid.addWidget(self.log_rotation, 2, 1)
+
+        # 分段大小上限
+        self.log_segment_mb = QSpinBox()
+        self.log_segment_mb.setRange(1, 4096)
+        self.log_segment_mb.setValue(64)
+        grid.addWidget(QLabel("分段大小上限(MB):"), 3, 0)
+        grid.addWidget(self.log_segment_mb, 3, 1)
+
+        def on_rotation_changed(index):
+            self.log_segment_mb.setEnabled(
+                self.log_rotation.itemData(index) == 'size')
+
+        self.log_rotation.currentIndexChanged.connect(on_rotation_changed)
+        on_rotation_changed(self.log_rotation.currentIndex())
+
+        # 保留天数
+        self.log_retention = QSpinBox()
+        self.log_retention.setRange(0, 3650)
+        self.log_retention.setSpecialValueText("永久保留")
+        grid.addWidget(QLabel("日志保留天数:"), 4, 0)
+        grid.addWidget(self.log_retention, 4, 1)
+
+        # 压缩已关闭的分段
+        self.log_compress = QCheckBox("压缩已关闭的日志分段 (.gz)")
+        self.log_compress.setChecked(True)
+        grid.addWidget(self.log_compress, 5, 0, 1, 2)
+
+        # 延迟统计导出
+        self.metrics_textfile = QLineEdit()
+        self.metrics_textfile.setPlaceholderText("留空不导出；.prom 为 Prometheus 格式")
+        grid.addWidget(QLabel("延迟统计导出:"), 6, 0)
+        grid.addWidget(self.metrics_textfile, 6, 1)
+
         group.setLayout(grid)
         layout.addWidget(group)
         tab.setLayout(layout)
@@ -433,67 +3717,1280 @@ class ConfigDialog(QDialog):
             'realtime_processing_pause': self.processing_pause.value(),
             'device': self.device_combo.currentText(),
             'compute_type': self.compute_type_combo.currentText(),
+            'cpu_threads': self.cpu_threads.value(),
+            'num_workers': self.num_workers.value(),
+            'latency_target': self.latency_target.value(),
+            'realtime_model': self.realtime_model_combo.currentData(),
+            'beam_size_realtime': self.beam_size_realtime.value(),
+            'engine_process': self.engine_process.isChecked(),
+            'audio_buffer_seconds': self.audio_buffer_seconds.value(),
+            'audio_overflow_policy': self.audio_overflow_policy.currentData(),
+            'recorder_pool_memory_mb': self.pool_memory.value(),
+            'preload_model': self.preload_model.isChecked(),
+            'view_max_segments': self.view_max_segments.value(),
             'enable_translation': self.enable_trans.isChecked(),
+            'translation_backend': self.translation_backend.currentData(),
+            'speculative_translation':
+            self.speculative_translation.isChecked(),
+            'speculative_agreement': self.speculative_agreement.value(),
+            'local_translation_dir': self.local_translation_dir.text(),
+            'local_translation_threads':
+            self.local_translation_threads.value(),
             'baidu_appid': self.baidu_appid.text(),
             'baidu_key': self.baidu_key.text(),
+            'baidu_qps': self.baidu_qps.value(),
+            'translation_concurrency': self.trans_concurrency.value(),
+            'translation_deadline': self.trans_deadline.value(),
+            'log_fsync_policy': self.fsync_policy.currentData(),
+            'log_fsync_interval': self.fsync_interval.value(),
+            'log_rotation': self.log_rotation.currentData(),
+            'log_max_segment_mb': self.log_segment_mb.value(),
+            'log_retention_days': self.log_retention.value(),
+            'log_compress': self.log_compress.isChecked(),
+            'metrics_textfile': self.metrics_textfile.text().strip(),
             'target_language': self.target_lang.currentText()
         }
 
 
-class LogWorker(QRunnable):
-    """异步日志写入工作器"""
+class LatencyDialog(QDialog):
+    """各阶段延迟的统计面板（非模态，每秒刷新）"""
 
-    def __init__(self, content, add_furigana_flag=False):
-        super().__init__()
-        self.content = content
-        self.add_furigana_flag = add_furigana_flag
+    def __init__(self, labels_provider, parent=None):
+        super().__init__(parent)
+        self.labels_provider = labels_provider
+        self.setWindowTitle("延迟统计")
+        self.setMinimumWidth(560)
+        layout = QVBoxLayout(self)
 
-    def run(self):
+        self.table = QTableWidget(len(LATENCY_STAGES), 4)
+        self.table.setHorizontalHeaderLabels(
+            ["句数", "p50 (ms)", "p95 (ms)", "p99 (ms)"])
+        self.table.setVerticalHeaderLabels(list(LATENCY_STAGES.values()))
+        self.table.horizontalHeader().setSectionResizeMode(
+            QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+        json_button = MaterialButton("导出 JSON", "secondary")
+        prom_button = MaterialButton("导出 Prometheus", "secondary")
+        json_button.clicked.connect(lambda: self.export("JSON (*.json)"))
+        prom_button.clicked.connect(
+            lambda: self.export("Prometheus textfile (*.prom)"))
+        button_layout.addWidget(json_button)
+        button_layout.addWidget(prom_button)
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        stats = LATENCY.percentiles()
+        for row, stage in enumerate(LATENCY_STAGES):
+            values = [str(stats[stage]['count'])] + [
+                "-" if stats[stage][name] is None else
+                f"{stats[stage][name]:.0f}" for name in ('p50', 'p95', 'p99')
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+
+    def export(self, file_filter):
+        suffix = ".prom" if file_filter.endswith("(*.prom)") else ".json"
+        path, _ = QFileDialog.getSaveFileName(
+            self, "导出延迟统计", "latency" + suffix, file_filter)
+        if not path:
+            return
+        if not path.endswith(suffix):
+            path += suffix
+        try:
+            LATENCY.export(path, self.labels_provider())
+        except Exception as e:
+            print(f"导出延迟统计失败: {e}")
+
+
+class SearchDialog(QDialog):
+    """历史转写搜索面板（非模态）：原文和译文全文检索，按时间倒序列出"""
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.setWindowTitle("历史搜索")
+        self.setMinimumSize(720, 480)
+        layout = QVBoxLayout(self)
+
+        search_layout = QHBoxLayout()
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("输入关键词，空格分隔多个词")
+        self.query_edit.returnPressed.connect(self.run_search)
+        search_button = MaterialButton("搜索", "primary")
+        search_button.clicked.connect(self.run_search)
+        search_layout.addWidget(self.query_edit)
+        search_layout.addWidget(search_button)
+        layout.addLayout(search_layout)
+
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["时间", "会话", "原文", "译文"])
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.Stretch)
+        header.setSectionResizeMode(3, QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+    def run_search(self):
+        query = self.query_edit.text().strip()
+        if not query:
+            return
+        if not self.index.available:
+            self.summary_label.setText("当前 SQLite 不支持 FTS5，历史搜索不可用")
+            return
+        started = time.perf_counter()
+        rows = self.index.search(query)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.table.setRowCount(len(rows))
+        for row, (session, seq, at_ms, text, translation) in enumerate(rows):
+            when = "-"
+            if at_ms is not None:
+                when = datetime.fromtimestamp(
+                    at_ms / 1000).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            values = [when, f"{session} #{seq}", text, translation or ""]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setToolTip(value)
+                self.table.setItem(row, column, item)
+        self.summary_label.setText(
+            f"找到 {len(rows)} 条（最多显示 200 条），耗时 {elapsed_ms:.0f} ms")
+
+
+def annotate_log_content(content):
+    """仅为正文内容添加注音，不处理时间戳和其他格式标记"""
+    if content.startswith(">"):
+        # 提取实际文本内容
+        text_match = re.match(r"^>(.*?)(?:\n|$)", content)
+        if text_match:
+            text = text_match.group(1).strip()
+            return f"> {add_furigana(text)}\n"
+    return content
+
+
+# 日志 fsync 策略：不同步 / 每次会话结束 / 定时
+LOG_FSYNC_POLICIES = {'none': "不同步", 'session': "每次会话", 'interval': "定时"}
+
+
+# 日志分段方式：按天 / 按大小
+LOG_ROTATIONS = {'daily': "按天", 'size': "按大小"}
+
+
+class TranscriptStore:
+    """分段存储的转写日志：按天或按大小切分文件，旁路索引记录每个会话的文件和偏移
+
+    只在日志写入线程中调用 write/begin_session，读取接口可在任意线程使用
+    """
+
+    # 正在后台压缩的分段，避免同一分段被重复压缩
+    _compressing = set()
+    _compress_lock = threading.Lock()
+
+    def __init__(self,
+                 directory=LOG_DIR,
+                 rotation='daily',
+                 max_segment_mb=64,
+                 retention_days=0,
+                 compress=True):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self.rotation = rotation
+        self.max_segment_mb = max_segment_mb
+        self.retention_days = retention_days  # 0 表示永久保留
+        self.compress = compress
+        self._file = None
+        self._path = None
+        self._day = None
+        try:
+            self._migrate_legacy()
+        except Exception as e:
+            print(f"导入旧日志失败: {e}")
+
+    def _migrate_legacy(self):
+        """把分段存储之前的 transcript.md 改名保留，并把其中的会话加入索引"""
+        legacy = os.path.join(self.directory, LEGACY_LOG_FILE)
+        target = os.path.join(self.directory, LEGACY_LOG_NAME)
+        if os.path.exists(legacy) and not os.path.exists(target):
+            os.replace(legacy, target)
+        if not os.path.exists(target):
+            return
+        existing = self.sessions()
+        if any(entry['file'] == LEGACY_LOG_NAME for entry in existing):
+            return
+
+        # 录音开始只记录时分秒，日期取之前最近的新会话，没有时取文件修改日期
+        day = datetime.fromtimestamp(
+            os.path.getmtime(target)).strftime("%Y-%m-%d")
+        entries = []
+        offset = 0
+        with open(target, "rb") as f:
+            for line in f:
+                match = LEGACY_SESSION_RE.match(line.decode("utf-8", "replace"))
+                if match:
+                    if match.group(1):
+                        start, kind = match.group(1), 'app'
+                        day = start[:10]
+                    else:
+                        start, kind = f"{day} {match.group(2)}", 'recording'
+                    entries.append({
+                        'start': start,
+                        'kind': kind,
+                        'file': LEGACY_LOG_NAME,
+                        'offset': offset,
+                        'session': (start.replace("-", "").replace(":", "")
+                                    .replace(" ", "-") +
+                                    f"-legacy{len(entries):03d}")
+                    })
+                offset += len(line)
+        if not entries:
+            entries.append({
+                'start': f"{day} 00:00:00",
+                'kind': 'app',
+                'file': LEGACY_LOG_NAME,
+                'offset': 0,
+                'session': day.replace("-", "") + "-000000-legacy000"
+            })
+        self._write_index(entries + existing)
+
+    def _write_index(self, entries):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(
+                json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+        os.replace(tmp_path, self.index_path)
+
+    def configure(self, rotation, max_segment_mb, retention_days, compress):
+        self.rotation = rotation
+        self.max_segment_mb = max_segment_mb
+        self.retention_days = retention_days
+        self.compress = compress
+
+    def fileno(self):
+        return self._file.fileno() if self._file else None
+
+    def write(self, data):
+        data = data.encode("utf-8")
+        if self._needs_rotation(len(data)):
+            self._open_segment()
+        self._file.write(data)
+        self._file.flush()
+
+    def begin_session(self, started_at, header, kind='app', session_id=None):
+        """写入会话头，并在索引中记录会话起点所在的文件和字节偏移"""
+        if self._needs_rotation(0):
+            self._open_segment()
+        # 开始时间只精确到秒，同一秒内的会话靠会话 ID 区分；录音会话的 ID
+        # 与结构化记录中的会话 ID 相同
+        entry = {
+            'start': started_at,
+            'kind': kind,
+            'file': os.path.basename(self._path),
+            'offset': self._file.tell(),
+            'session': session_id or new_session_id()
+        }
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.write(header)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _needs_rotation(self, incoming):
+        if self._file is None:
+            return True
+        if self.rotation == 'daily' and self._day != datetime.now().strftime(
+                "%Y%m%d"):
+            return True
+        return (self.rotation == 'size' and self._file.tell() + incoming >
+                self.max_segment_mb * 1024 * 1024)
+
+    def _open_segment(self):
+        """关闭当前分段并打开新的分段；当天未写满的分段继续追加"""
+        closed = self._path
+        self.close()
+
+        self._day = datetime.now().strftime("%Y%m%d")
+        segments = self._segment_files(self._day)
+        number = max((int(os.path.basename(p).split("-")[2][:3])
+                      for p in segments),
+                     default=0)
+        path = segments[-1] if segments else None
+        if path is None or path.endswith(".gz") or path == closed or (
+                self.rotation == 'size' and os.path.getsize(path) >=
+                self.max_segment_mb * 1024 * 1024):
+            number += 1
+            path = os.path.join(
+                self.directory,
+                f"{LOG_SEGMENT_PREFIX}{self._day}-{number:03d}.md")
+
+        new_file = not os.path.exists(path)
+        # 以二进制追加，tell() 即为索引使用的字节偏移
+        self._file = open(path, "ab")
+        self._path = path
+        if new_file:
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._file.write(("# 🎙️ 语音转写记录\n\n"
+                              "## 📝 会话信息\n\n"
+                              f"- 📅 **开始时间**：{current_time}\n"
+                              "## 📄 转写内容\n\n").encode("utf-8"))
+
+        self._apply_retention()
+        if self.compress:
+            # 压缩所有已关闭的分段，包括上次退出时仍打开、或压缩被中断的分段
+            for segment in self._segment_files():
+                if segment != path and not segment.endswith(".gz"):
+                    threading.Thread(target=self._compress_segment,
+                                     args=(segment, ),
+                                     daemon=True).start()
+
+    def _segment_files(self, day="*"):
+        pattern = os.path.join(self.directory,
+                               f"{LOG_SEGMENT_PREFIX}{day}-*.md*")
+        # 忽略压缩中断留下的 .gz.tmp，重新压缩时会覆盖
+        return sorted(p for p in glob.glob(pattern)
+                      if p.endswith((".md", ".md.gz")))
+
+    def _apply_retention(self):
+        """删除超过保留天数的分段，并清理索引中失效的条目"""
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        removed = False
+        for path in self._segment_files():
+            if path != self._path and os.path.getmtime(path) < cutoff:
+                try:
+                    os.remove(path)
+                    removed = True
+                except OSError as e:
+                    print(f"删除过期日志失败: {e}")
+        if removed:
+            existing = {
+                os.path.basename(p).replace(".gz", "")
+                for p in self._segment_files()
+            }
+            existing.add(LEGACY_LOG_NAME)
+            self._write_index(
+                [e for e in self.sessions() if e['file'] in existing])
+
+    @staticmethod
+    def _compress_segment(path):
+        """后台压缩已关闭的分段；先写临时文件，中途退出不会留下损坏的 .gz"""
+        with TranscriptStore._compress_lock:
+            if path in TranscriptStore._compressing:
+                return
+            TranscriptStore._compressing.add(path)
+        try:
+            with open(path, "rb") as src, gzip.open(path + ".gz.tmp",
+                                                    "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(path + ".gz.tmp", path + ".gz")
+            os.remove(path)
+        except Exception as e:
+            print(f"压缩日志失败: {e}")
+        finally:
+            with TranscriptStore._compress_lock:
+                TranscriptStore._compressing.discard(path)
+
+    def sessions(self):
+        """读取会话索引"""
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _open_for_read(self, name):
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            return open(path, "rb")
+        if os.path.exists(path + ".gz"):
+            return gzip.open(path + ".gz", "rb")
+        return None
+
+    def read_session(self, started_at):
+        """按索引直接定位并读取一个会话（会话 ID 或开始时间），不扫描其他日志
+
+        同一秒开始的多个会话按开始时间只能读到第一个，需用会话 ID 区分。
+        """
+        entries = self.sessions()
+        matches = [i for i, entry in enumerate(entries)
+                   if entry.get('session') == started_at]
+        matches = matches or [i for i, entry in enumerate(entries)
+                              if entry['start'] == started_at]
+        if not matches:
+            return None
+        if len(matches) > 1:
+            print(f"有 {len(matches)} 个会话在 {started_at} 开始，读取第一个；"
+                  "可用 --list-sessions 查看会话 ID")
+        i = matches[0]
+        entry = entries[i]
+        end = entries[i + 1] if i + 1 < len(entries) else None
+
+        # 会话可能因按大小切分而跨越多个分段；旧日志只有一个文件
+        names = [entry['file']]
+        if not end or end['file'] != entry['file']:
+            all_names = sorted({
+                os.path.basename(p).replace(".gz", "")
+                for p in self._segment_files()
+            })
+            if entry['file'] in all_names:
+                names = [
+                    n for n in all_names if n >= entry['file'] and (
+                        end is None or n <= end['file'])
+                ]
+
+        chunks = []
+        for name in names:
+            f = self._open_for_read(name)
+            if f is None:
+                continue
+            with f:
+                if name == entry['file']:
+                    f.seek(entry['offset'])
+                if end and name == end['file']:
+                    chunks.append(f.read(max(0, end['offset'] - f.tell())))
+                else:
+                    chunks.append(f.read())
+        return b"".join(chunks).decode("utf-8", errors="replace")
+
+
+def new_session_id():
+    """会话 ID：开始时间 + 随机后缀，前 8 位即为记录所在文件的日期"""
+    return datetime.now().strftime("%Y%m%d-%H%M%S-") + os.urandom(2).hex()
+
+
+class SegmentStore:
+    """结构化转写记录：每天一个只追加的 JSONL 文件（logs/segments-YYYYMMDD.jsonl）
+
+    每行一条记录，按 type 区分：
+    - session：会话 ID、开始时间（墙钟）、语言、输入来源和引擎设置
+    - segment：会话 ID、序号、语音起止时间、原文、识别语言、译文及翻译状态
+    - end：会话结束时间和统计
+    起止时间是相对会话开始的秒数（单调时钟），不受系统改时影响。Markdown
+    日志由同一组记录渲染，也可随时用 render_markdown 重新生成。
+    只在日志写入线程中调用 append/flush，读取接口可在任意线程使用。
+    """
+
+    def __init__(self, directory=LOG_DIR, buffer_bytes=64 * 1024,
+                 retention_days=0):
+        self.directory = directory
+        self.buffer_bytes = buffer_bytes
+        self.retention_days = retention_days  # 0 表示永久保留
+        self._file = None
+        self._day = None
+
+    def append(self, record):
+        day = datetime.now().strftime("%Y%m%d")
+        if day != self._day:
+            self._open(day)
+        self._file.write(
+            json.dumps(record, ensure_ascii=False, separators=(',', ':')) +
+            "\n")
+
+    def flush(self):
+        if self._file:
+            self._file.flush()
+
+    def fileno(self):
+        return self._file.fileno() if self._file else None
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+            self._day = None
+
+    def _open(self, day):
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        # 缓冲写入，由日志写入线程在成组写出或会话结束时 flush
+        self._file = open(self._path(day),
+                          "a",
+                          encoding="utf-8",
+                          buffering=self.buffer_bytes)
+        self._day = day
+        self._apply_retention()
+
+    def _path(self, day):
+        return os.path.join(self.directory,
+                            f"{SEGMENT_FILE_PREFIX}{day}.jsonl")
+
+    def _files(self):
+        return sorted(
+            glob.glob(
+                os.path.join(self.directory,
+                             f"{SEGMENT_FILE_PREFIX}*.jsonl")))
+
+    def _apply_retention(self):
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for path in self._files():
+            if path != self._path(self._day) and os.path.getmtime(path) < cutoff:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"删除过期记录失败: {e}")
+
+    def records(self, since_day=None):
+        """按时间顺序逐条读取记录；since_day（YYYYMMDD）之前的文件直接跳过"""
+        for path in self._files():
+            day = os.path.basename(path)[len(SEGMENT_FILE_PREFIX):-6]
+            if since_day and day < since_day:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # 异常退出时写了一半的行
+
+    def read_session(self, session_id):
+        """读取一个会话的全部记录；会话 ID 给出起始日期，只扫描当天及之后的文件"""
+        found = []
+        for record in self.records(since_day=session_id[:8]):
+            if record.get('session') != session_id:
+                continue
+            found.append(record)
+            if record['type'] == 'end':
+                break
+        return found
+
+
+def render_session_header(record):
+    """会话开始记录 -> Markdown"""
+    settings = record['settings']
+    content = (
+        f"\n### 🎬 录音开始 `{record['started_at'][11:]}`\n\n"
+        "当前会话配置：\n"
+        f"- 🤖 **模型**：`{settings['model']}`"
+        f"（beam {settings['beam_size']}），实时预览 "
+        f"`{settings['realtime_model']}`"
+        f"（beam {settings['beam_size_realtime']}）\n"
+        f"- 🌐 **语言**：`{record['language_name']}`\n"
+        f"- ⚡ **设备**：`{settings['device']}`\n"
+        f"- 🎯 **精度**：`{settings['compute_type']}`\n"
+        f"- 🎤 **灵敏度**：`{settings['silero_sensitivity']}`\n"
+        f"- ⏱️ **静音检测**：`{settings['post_speech_silence_duration']}秒`\n"
+        f"- 🎧 **输入**：`{record['input']}`\n")
+    content += "".join(f"  - `{path}`\n" for path in record['files'])
+    return content + "\n"
+
+
+def render_translation(record):
+    """句子记录中的译文 -> Markdown（未翻译时只有换行）"""
+    status = record.get('translation_status')
+    if status == 'ok':
+        return f"> 🔄 译文：{record['translation']}\n\n"
+    if status == 'timeout':
+        return "> 🔄 译文：（翻译超时，已跳过）\n\n"
+    if status == 'dropped':
+        return "> 🔄 译文：（翻译队列已满，已跳过）\n\n"
+    return "\n"
+
+
+def render_session_end(record):
+    """会话结束记录 -> Markdown"""
+    stats = record['stats']
+    current_time = record['ended_at'][11:]
+    cache = stats['cache']
+    hits = cache['memory_hits'] + cache['disk_hits'] + cache['merged']
+    content = (
+        f"\n### 🏁 录音结束 `{current_time}`\n\n"
+        "会话统计：\n"
+        f"- ⏱️ **结束时间**：`{current_time}`\n"
+        f"- 💾 **翻译缓存**：命中 `{hits}`（内存 {cache['memory_hits']}"
+        f" / 磁盘 {cache['disk_hits']} / 合并 {cache['merged']}），"
+        f"未命中 `{cache['misses']}`，节省 `{cache['saved_chars']}` 字符、"
+        f"约 `{cache['saved_seconds']:.1f}秒`\n"
+        f"- 🖥️ **实时更新**：收到 `{stats['received']}` 次，渲染 "
+        f"`{stats['rendered']}` 次\n")
+    share = stats.get('compute_share')
+    if share:
+        content += (f"- 🧮 **算力占比**：实时模型 `{share[0]:.0%}`，主模型 "
+                    f"`{share[1]:.0%}`\n")
+    if stats.get('fed_seconds') is not None:
+        finished = "（已全部送完）" if stats['source_finished'] else ""
+        content += (f"- 🎧 **音频输入**：送入 "
+                    f"`{stats['fed_seconds']:.1f}秒`{finished}\n")
+    ring = stats.get('ring')
+    if ring:
+        content += (f"- 🎚️ **音频缓冲**：容量 `{ring['capacity_seconds']:.0f}秒`，"
+                    f"溢出 `{ring['overruns']}` 次（丢弃 "
+                    f"`{ring['dropped_seconds']:.1f}秒`），最大延迟 "
+                    f"`{ring['max_lag_ms']:.0f} ms`\n")
+    speculative = stats.get('speculative')
+    if speculative:
+        content += (f"- 🔮 **推测翻译**：发送 `{speculative['sent']}` 段，作废 "
+                    f"`{speculative['superseded']}` 段，提前显示 "
+                    f"`{speculative['previews']}` 句\n")
+    return content + "---\n\n"
+
+
+def render_markdown(records):
+    """由结构化记录重新生成一个或多个会话的 Markdown 日志"""
+    parts = []
+    for record in records:
+        kind = record.get('type')
+        if kind == 'session':
+            parts.append(render_session_header(record))
+        elif kind == 'segment':
+            text = record['text']
+            if record.get('language') == 'ja':
+                text = add_furigana(text)
+            parts.append(f"> {text}\n")
+            parts.append(render_translation(record))
+        elif kind == 'end':
+            parts.append(render_session_end(record))
+    return "".join(parts)
+
+
+# 中日韩文字（含假名、谚文）的连续片段
+CJK_RUN_RE = re.compile(
+    r'[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯]+')
+
+
+def cjk_bigrams(text, tail=True):
+    """把 CJK 连续片段展开为重叠的二字词，其余文本原样保留
+
+    中日文没有空格，unicode61 分词器会把整段当作一个词；展开后任意连续
+    两个字都能命中。入库时片段末字另作一词（tail），单字查询用前缀匹配
+    加末字词覆盖；查询短语不加末字，否则无法与文中的二字词相邻匹配。
+    """
+
+    def expand(match):
+        run = match.group(0)
+        words = [run[i:i + 2] for i in range(len(run) - 1)]
+        if tail or len(run) == 1:
+            words.append(run[-1])
+        return " " + " ".join(words) + " "
+
+    return CJK_RUN_RE.sub(expand, text)
+
+
+def fts_query(query):
+    """把用户输入转换为 FTS5 查询：空格分隔的各项都须命中，每项按短语匹配"""
+    terms = []
+    for term in query.split():
+        term = term.replace('"', '""')
+        if CJK_RUN_RE.fullmatch(term) and len(term) == 1:
+            terms.append(f'"{term}"*')
+        else:
+            terms.append(f'"{cjk_bigrams(term, tail=False).strip()}"')
+    return " AND ".join(terms)
+
+
+class TranscriptSearchIndex:
+    """历史转写全文检索：后台线程增量读取结构化记录，写入 SQLite FTS5 索引
+
+    每个 JSONL 文件记录已索引到的字节偏移，只处理新追加的记录；删除索引
+    文件后会从全部记录重建。入库和查询都在 CJK 片段上使用二字词分词。
+    查询使用独立的连接（WAL），不等待正在进行的索引。
+    """
+
+    def __init__(self, path=SEARCH_INDEX_FILE, directory=LOG_DIR):
+        self.path = path
+        self.directory = directory
+        self.available = True
+        self.indexed = 0  # 本次运行新索引的句数
+        self._db = None
+        self._reader = None
+        self._reader_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = False
+        self._thread = None
+
+    def start(self):
+        """启动后台索引线程，先补齐历史记录"""
+        self._thread = threading.Thread(target=self._run,
+                                        name="search-indexer",
+                                        daemon=True)
+        self._thread.start()
+        self._wake.set()
+
+    def request_update(self, *args):
+        """有新记录写入时唤醒索引线程（可在任意线程调用）"""
+        self._wake.set()
+
+    def close(self, timeout=2.0):
+        self._closing = True
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._closing:
+            self._wake.wait(30)
+            self._wake.clear()
+            if self._closing:
+                break
+            self.update()
+        if self._db:
+            self._db.close()
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS segments (
+                    id INTEGER PRIMARY KEY, session TEXT, seq INTEGER,
+                    at_ms INTEGER, text TEXT, translation TEXT, language TEXT,
+                    UNIQUE (session, seq));
+                CREATE INDEX IF NOT EXISTS idx_segments_at ON segments (at_ms);
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session TEXT PRIMARY KEY, wall_time REAL);
+                CREATE TABLE IF NOT EXISTS files (
+                    name TEXT PRIMARY KEY, offset INTEGER);
+                CREATE VIRTUAL TABLE IF NOT EXISTS segment_fts USING fts5 (
+                    body, translation, tokenize = 'unicode61');
+            """)
+            self._db = db
+        return self._db
+
+    def update(self):
+        """索引各记录文件中新追加的完整行（只在索引线程或命令行中调用）"""
+        if not self.available:
+            return 0
+        added = 0
+        try:
+            db = self._connect()
+            pattern = os.path.join(self.directory,
+                                   f"{SEGMENT_FILE_PREFIX}*.jsonl")
+            for path in sorted(glob.glob(pattern)):
+                added += self._index_file(db, path)
+        except sqlite3.OperationalError as e:
+            if "fts5" in str(e):
+                self.available = False
+                print("当前 SQLite 不支持 FTS5，历史搜索不可用")
+            else:
+                print(f"更新搜索索引失败: {e}")
+        except (sqlite3.Error, OSError) as e:
+            print(f"更新搜索索引失败: {e}")
+        self.indexed += added
+        return added
+
+    def _index_file(self, db, path):
+        name = os.path.basename(path)
+        row = db.execute("SELECT offset FROM files WHERE name = ?",
+                         (name, )).fetchone()
+        offset = row[0] if row else 0
+        if os.path.getsize(path) <= offset:
+            return 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # 只处理完整的行，写了一半的行留到下次
+        end = data.rfind(b"\n") + 1
+        added = 0
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            added += self._index_record(db, record)
+        db.execute("INSERT OR REPLACE INTO files VALUES (?, ?)",
+                   (name, offset + end))
+        db.commit()
+        return added
+
+    def _index_record(self, db, record):
+        kind = record.get('type')
+        if kind == 'session':
+            db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?)",
+                       (record['session'], record['wall_time']))
+            return 0
+        if kind != 'segment' or not record.get('final', True):
+            return 0
+        row = db.execute("SELECT wall_time FROM sessions WHERE session = ?",
+                         (record['session'], )).fetchone()
+        offset = record.get('start')
+        if offset is None:
+            offset = record.get('end') or 0.0
+        at_ms = int(round((row[0] + offset) * 1000)) if row else None
+        cursor = db.execute(
+            "INSERT OR IGNORE INTO segments "
+            "(session, seq, at_ms, text, translation, language) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (record['session'], record['seq'], at_ms, record['text'],
+             record.get('translation'), record.get('language')))
+        if cursor.rowcount != 1:
+            return 0  # 已索引过
+        db.execute(
+            "INSERT INTO segment_fts (rowid, body, translation) "
+            "VALUES (?, ?, ?)",
+            (cursor.lastrowid, cjk_bigrams(record['text']),
+             cjk_bigrams(record.get('translation') or "")))
+        return 1
+
+    def search(self, query, limit=200):
+        """返回最新的匹配句：[(会话 ID, 序号, 毫秒时间戳, 原文, 译文), ...]"""
+        match = fts_query(query)
+        if not match or not self.available:
+            return []
+        try:
+            with self._reader_lock:
+                if self._reader is None:
+                    if not os.path.exists(self.path):
+                        return []
+                    self._reader = sqlite3.connect(self.path,
+                                                   timeout=10,
+                                                   check_same_thread=False)
+                return self._reader.execute(
+                    "SELECT s.session, s.seq, s.at_ms, s.text, s.translation "
+                    "FROM segment_fts JOIN segments s "
+                    "ON s.id = segment_fts.rowid "
+                    "WHERE segment_fts MATCH ? "
+                    "ORDER BY s.at_ms DESC LIMIT ?", (match, limit)).fetchall()
+        except sqlite3.Error as e:
+            print(f"搜索失败: {e}")
+            return []
+
+
+class TranscriptWriter:
+    """唯一的日志写入线程：独占日志存储和结构化记录，按大小或时间阈值成组写入，按策略 fsync"""
+
+    def __init__(self,
+                 store,
+                 segments=None,
+                 flush_bytes=64 * 1024,
+                 flush_interval=1.0,
+                 fsync_policy='session',
+                 fsync_interval=5.0):
+        self.store = store
+        self.segments = segments  # SegmentStore，与 Markdown 日志按同一顺序写入
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.writes = 0  # 实际的 write 调用次数
+        self.fsyncs = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run,
+                                        name="transcript-writer",
+                                        daemon=True)
+        self._thread.start()
+
+    def configure(self, fsync_policy, fsync_interval):
+        self._queue.put(('configure', fsync_policy, fsync_interval))
+
+    def write(self, content, add_furigana=False, on_written=None):
+        """提交一条日志记录，不阻塞调用线程；on_written 在记录写出后调用"""
+        self._queue.put(('text', content, add_furigana, on_written))
+
+    def record(self, record, on_written=None):
+        """提交一条结构化记录，与前后提交的日志内容保持顺序；on_written 在记录落到文件后调用"""
+        self._queue.put(('record', record, on_written))
+
+    def begin_session(self, started_at, header, kind='app', session_id=None):
+        """开始新会话：写入会话头并记录到会话索引"""
+        self._queue.put(('session', started_at, header, kind, session_id))
+
+    def sync(self):
+        """会话结束：立即写出缓冲，并在 session/interval 策略下 fsync"""
+        self._queue.put(('sync', ))
+
+    def flush(self, timeout=None):
+        """写出缓冲并等待完成"""
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """写出剩余记录并关闭文件"""
+        if self._thread.is_alive():
+            self._queue.put(('close', ))
+            self._thread.join(timeout)
+
+    def _run(self):
+        buffer = []
+        callbacks = []
+        size = 0
+        records = False  # 是否有尚未 flush 的结构化记录
+        last_flush = last_fsync = time.monotonic()
+        while True:
+            timeout = None
+            if buffer or records:
+                timeout = max(0, last_flush + self.flush_interval -
+                              time.monotonic())
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = ('tick', )
+
+            kind = record[0]
+            if kind == 'text':
+                content = record[1]
+                if record[2]:
+                    try:
+                        content = annotate_log_content(content)
+                    except Exception as e:
+                        print(f"添加注音失败: {e}")
+                buffer.append(content)
+                if record[3]:
+                    callbacks.append(record[3])
+                size += len(content)
+                if size < self.flush_bytes:
+                    continue
+            elif kind == 'record':
+                # 写入文件自身的缓冲区，随下一次成组写出一起 flush
+                if self.segments:
+                    try:
+                        self.segments.append(record[1])
+                        records = True
+                    except Exception as e:
+                        print(f"写入结构化记录失败: {e}")
+                if record[2]:
+                    callbacks.append(record[2])
+                continue
+            elif kind == 'configure':
+                self.fsync_policy, self.fsync_interval = record[1:]
+                continue
+            elif kind == 'session':
+                if buffer:
+                    self._write("".join(buffer))
+                    buffer = []
+                    size = 0
+                if records:
+                    self._flush_segments()
+                    records = False
+                for callback in callbacks:
+                    callback(time.monotonic())
+                callbacks = []
+                try:
+                    self.store.begin_session(*record[1:])
+                except Exception as e:
+                    print(f"写入会话信息失败: {e}")
+                continue
+
+            # 成组写入：一次 write 调用写出缓冲区中的所有记录
+            if buffer:
+                self._write("".join(buffer))
+                buffer = []
+                size = 0
+            if records:
+                self._flush_segments()
+                records = False
+            last_flush = time.monotonic()
+            for callback in callbacks:
+                callback(last_flush)
+            callbacks = []
+
+            fsync = (kind in ('sync', 'close')
+                     and self.fsync_policy != 'none') or (
+                         self.fsync_policy == 'interval'
+                         and last_flush - last_fsync >= self.fsync_interval)
+            if fsync:
+                for target in (self.store, self.segments):
+                    if target is None or target.fileno() is None:
+                        continue
+                    try:
+                        os.fsync(target.fileno())
+                        self.fsyncs += 1
+                    except OSError as e:
+                        print(f"同步日志失败: {e}")
+                last_fsync = last_flush
+
+            if kind == 'flush':
+                record[1].set()
+            elif kind == 'close':
+                self.store.close()
+                if self.segments:
+                    self.segments.close()
+                return
+
+    def _write(self, data):
         try:
-            if self.add_furigana_flag:
-                # 仅为正文内容添加注音，不处理时间戳和其他格式标记
-                if self.content.startswith(">"):
-                    # 提取实际文本内容
-                    text_match = re.match(r"^>(.*?)(?:\n|$)", self.content)
-                    if text_match:
-                        text = text_match.group(1).strip()
-                        annotated_text = add_furigana(text)
-                        self.content = f"> {annotated_text}\n"
-
-            with open(LOG_FILE, "a", encoding="utf-8") as f:
-                f.write(self.content)
+            self.store.write(data)
+            self.writes += 1
         except Exception as e:
             print(f"写入日志失败: {e}")
 
+    def _flush_segments(self):
+        try:
+            self.segments.flush()
+        except Exception as e:
+            print(f"写入结构化记录失败: {e}")
+
 
 class TranslationWorker(QRunnable):
     """异步翻译工作器"""
 
-    def __init__(self, text, from_lang, to_lang, callback):
+    def __init__(self, text, from_lang, to_lang, callback, backend='baidu'):
         super().__init__()
         self.text = text
         self.from_lang = from_lang
         self.to_lang = to_lang
         self.callback = callback
+        self.backend = backend  # TRANSLATORS 中的翻译后端名称
 
     def run(self):
+        translated_text = None
         try:
             translated_text = translate_text(self.text, self.from_lang,
-                                             self.to_lang)
-            if translated_text:
-                self.callback(translated_text)
+                                             self.to_lang, self.backend)
         except Exception as e:
             print(f"翻译失败: {e}")
+        # 失败时也回调 None，流水线据此推进序号
+        self.callback(translated_text)
+
+
+class TranslationPipeline:
+    """有序翻译流水线：并发数和排队数有上限，结果按提交顺序输出，超时的句子标记为跳过"""
+
+    def __init__(self, max_workers=4, max_pending=64, deadline=8.0):
+        self.max_pending = max_pending
+        self.deadline = deadline
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(max_workers)
+        self._cond = threading.Condition()
+        self._entries = {}  # 序号 -> 条目
+        self._next_seq = 0
+        self._emit_seq = 0
+        self._sequencer = None
+
+    def configure(self, max_workers, max_pending, deadline):
+        with self._cond:
+            self._pool.setMaxThreadCount(max_workers)
+            self.max_pending = max_pending
+            self.deadline = deadline
+
+    def submit(self, text, from_lang, to_lang, on_result, backend='baidu'):
+        """提交一句翻译；on_result(译文, 状态, 完成时间) 在流水线线程中按提交顺序调用
+
+        状态为 ok / failed / timeout（超过截止时间）/ dropped（队列已满）
+        """
+        with self._cond:
+            entry = self._add_entry(on_result)
+            if len(self._entries) > self.max_pending:
+                entry['done'] = True
+                entry['status'] = 'dropped'
+                worker = None
+            else:
+                seq = entry['seq']
+                worker = TranslationWorker(
+                    text, from_lang, to_lang,
+                    lambda result: self._complete(seq, result), backend)
+            self._cond.notify_all()
+        if worker:
+            self._pool.start(worker)
+        return entry['seq']
+
+    def call_in_order(self, callback, timeout=None):
+        """在此前提交的翻译全部输出后调用 callback()
+
+        timeout 不为空时用于排空：此前未完成的翻译最多再等 timeout 秒
+        """
+        with self._cond:
+            if timeout is not None:
+                limit = time.monotonic() + timeout
+                for entry in self._entries.values():
+                    entry['deadline'] = min(entry['deadline'], limit)
+            entry = self._add_entry(lambda *args: callback())
+            entry['done'] = True
+            entry['status'] = 'marker'
+            self._cond.notify_all()
+
+    def _add_entry(self, callback):
+        """登记一个新序号（需持有锁）"""
+        if self._sequencer is None:
+            self._sequencer = threading.Thread(target=self._sequence_loop,
+                                               name="translation-sequencer",
+                                               daemon=True)
+            self._sequencer.start()
+        entry = {
+            'seq': self._next_seq,
+            'callback': callback,
+            'deadline': time.monotonic() + self.deadline,
+            'done': False,
+            'result': None,
+            'status': None,
+            'completed_at': None
+        }
+        self._entries[self._next_seq] = entry
+        self._next_seq += 1
+        return entry
+
+    def _complete(self, seq, result):
+        with self._cond:
+            entry = self._entries.get(seq)
+            # 已超时跳过的句子，迟到的结果直接丢弃
+            if entry and not entry['done']:
+                entry['done'] = True
+                entry['result'] = result
+                entry['status'] = 'ok' if result else 'failed'
+                entry['completed_at'] = time.monotonic()
+                self._cond.notify_all()
+
+    def _sequence_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    entry = self._entries.get(self._emit_seq)
+                    if entry is None:
+                        self._cond.wait()
+                        continue
+                    if entry['done']:
+                        break
+                    remaining = entry['deadline'] - time.monotonic()
+                    if remaining <= 0:
+                        entry['done'] = True
+                        entry['status'] = 'timeout'
+                        break
+                    self._cond.wait(remaining)
+                del self._entries[self._emit_seq]
+                self._emit_seq += 1
+            try:
+                entry['callback'](entry['result'], entry['status'],
+                                  entry['completed_at'])
+            except Exception as e:
+                print(f"输出翻译结果失败: {e}")
+
+
+class FuriganaLoadWorker(QRunnable):
+    """后台加载日语注音引擎"""
+
+    def run(self):
+        FURIGANA.load()
+
+
+class PreloadWorker(QRunnable):
+    """后台预加载录音器工作器"""
+
+    def __init__(self, key, recorder_kwargs):
+        super().__init__()
+        self.key = key
+        self.recorder_kwargs = recorder_kwargs
+
+    def run(self):
+        try:
+            RECORDER_POOL.preload(self.key, self.recorder_kwargs)
+        except Exception as e:
+            print(f"预加载模型失败: {e}")
+
+
+class EngineLoader(QThread):
+    """后台导入 torch 和 RealtimeSTT 并检测计算设备，避免阻塞窗口显示"""
+    progress_signal = pyqtSignal(str)
+    ready_signal = pyqtSignal(str)  # 检测到的默认计算设备
+    failed_signal = pyqtSignal(str)
+
+    def run(self):
+        try:
+            self.progress_signal.emit("⏳ 正在加载 torch...")
+            import torch
+            # 检测系统是否支持 CUDA
+            default_device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+            self.progress_signal.emit("⏳ 正在加载 RealtimeSTT...")
+            import RealtimeSTT  # noqa: F401
+
+            self.ready_signal.emit(default_device)
+        except Exception as e:
+            print(f"加载识别引擎失败: {e}")
+            self.failed_signal.emit(str(e))
+
+
+class TuneThread(QObject):
+    """在守护线程中运行自动调优，完成后发出调优结果（失败时为 None）
+
+    不使用 QThread：关闭窗口时若模型仍在加载，线程随进程退出，不必强行结束
+    一个可能持有 CTranslate2 内部锁的线程。
+    """
+    progress_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(object)
+
+    def __init__(self, sample, device, silence_duration, latency_target,
+                 cpu_threads=0, current_model=None):
+        super().__init__()
+        self.sample = sample
+        self.device = device
+        self.silence_duration = silence_duration
+        self.latency_target = latency_target
+        self.cpu_threads = cpu_threads
+        self.current_model = current_model
+        self.cancelled = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def isRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout_ms):
+        """等待调优结束，返回是否已结束"""
+        self._thread.join(timeout_ms / 1000)
+        return not self._thread.is_alive()
+
+    def cancel(self):
+        """在当前转写的下一段结果处停止调优"""
+        self.cancelled = True
+
+    def run(self):
+        profile = None
+        try:
+            profile = tune_engine(self.sample[0], self.sample[1], self.device,
+                                  self.silence_duration, self.latency_target,
+                                  self.progress_signal.emit,
+                                  lambda: self.cancelled,
+                                  self.cpu_threads, self.current_model)
+            if profile:
+                save_engine_profile(profile)
+        except Exception as e:
+            print(f"自动调优失败: {e}")
+        self.finished_signal.emit(profile)
 
 
 class MainWindow(QMainWindow):
+    engine_ready_signal = pyqtSignal()
+    engine_failed_signal = pyqtSignal(str)
+    translation_signal = pyqtSignal(int, str)  # 句子序号, 译文
 
     def __init__(self):
         super().__init__()
         self.thread_pool = QThreadPool()
+        self.engine_ready = False
+        self.engine_error = None
+        self.device_configured = False
+        self.first_paint_at = None
+        self.input_paths = []  # 音频文件输入来源的文件或目录
+        self.autorun = False  # 引擎就绪后自动开始，输入结束后退出
+        self.compute_share = None  # 上次录音的 (实时模型, 主模型) 推理耗时占比
+        self.engine_host = None  # 独立的引擎宿主进程（启用时）
+        # 当前会话的结构化记录状态
+        self.session_id = None
+        self.session_origin = None  # 会话开始的单调时钟，记录中的时间相对于它
+        self.segment_seq = 0
+        self.speech_started_at = None
+        self.detected_language = None
         self.init_ui()
-        self.init_log_file()
         self.current_realtime_text = ""
+        self.state_changed_at = None
+        self.latency_dialog = None
+        self.search_dialog = None
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.export_metrics)
+        self.metrics_timer.start(
+            int(self.config['metrics_export_interval'] * 1000))
+        self.usage_timer = QTimer(self)
+        self.usage_timer.timeout.connect(self.update_engine_usage)
+        self.usage_timer.start(1000)
+        self.load_engine()
 
     def init_ui(self):
         self.setWindowTitle("实时语音转文字")
@@ -511,47 +5008,177 @@ class MainWindow(QMainWindow):
         self.setup_signals()
 
     def init_config(self):
-        # 检测系统是否支持 CUDA
-        import torch
-        default_device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        # 计算设备在引擎加载完成后按 CUDA 检测结果确定
+        self.config = dict(DEFAULT_CONFIG)
+        self.transcription_thread = None
+        RECORDER_POOL.set_memory_limit(self.config['recorder_pool_memory_mb'])
+        self.translation_pipeline = TranslationPipeline(
+            self.config['translation_concurrency'],
+            self.config['translation_queue_size'],
+            self.config['translation_deadline'])
+        store = TranscriptStore(LOG_DIR,
+                                rotation=self.config['log_rotation'],
+                                max_segment_mb=self.config['log_max_segment_mb'],
+                                retention_days=self.config['log_retention_days'],
+                                compress=self.config['log_compress'])
+        self.log_writer = TranscriptWriter(
+            store,
+            SegmentStore(LOG_DIR,
+                         retention_days=self.config['log_retention_days']),
+            fsync_policy=self.config['log_fsync_policy'],
+            fsync_interval=self.config['log_fsync_interval'])
+        # 历史搜索索引在后台线程中补齐并增量更新
+        self.search_index = TranscriptSearchIndex(SEARCH_INDEX_FILE, LOG_DIR)
+        self.search_index.start()
+
+    def load_engine(self):
+        """窗口显示后在后台加载识别引擎，加载完成前禁用录音按钮"""
+        self.record_button.setEnabled(False)
+        self.status_label.setText("⏳ 正在加载识别引擎...")
+        self.engine_loader = EngineLoader()
+        self.engine_loader.progress_signal.connect(self.status_label.setText)
+        self.engine_loader.ready_signal.connect(self.on_engine_ready)
+        self.engine_loader.failed_signal.connect(self.on_engine_failed)
+        self.engine_loader.start()
+
+    def on_engine_ready(self, default_device):
+        self.engine_ready = True
+        # 用户已在配置中手动选择设备时保留其选择
+        if not self.device_configured:
+            self.config['device'] = default_device
+        self.record_button.setEnabled(True)
+        self.status_label.setText("准备就绪")
+        self.init_log_file()
+        self.update_engine_host()
+        # 已有调优结果时套用（含用户之后的手动修改）；首次运行且有校准录音时
+        # 自动调优，只有合成音频时测量结果没有意义，不自动调优
+        profile = load_engine_profile(self.config['device'])
+        if profile:
+            self.apply_engine_profile(profile)
+        elif not self.autorun:
+            if calibration_sample():
+                self.start_engine_tuning()
+            else:
+                self.status_label.setText(
+                    "准备就绪（未找到校准录音，未自动调优，可在配置中重新调优）")
+        self.preload_recorder()
+        self.engine_ready_signal.emit()
+        if self.autorun:
+            self.start_recording()
 
-        self.config = {
-            'silero_sensitivity': 0.8,  # 默认灵敏度调整为 0.8
-            'post_speech_silence_duration': 0.8,  # 默认静音检测调整为 0.8s
-            'min_length_of_recording': 0.5,
-            'beam_size': 3,
-            'realtime_processing_pause': 0.2,
-            'device': default_device,
-            'compute_type': 'float32',  # 默认使用 float32
-            'enable_translation': True,
-            'baidu_appid': BAIDU_APPID,
-            'baidu_key': BAIDU_KEY,
-            'target_language': '中文'
+    def update_engine_host(self):
+        """按配置启动或关闭独立的引擎宿主进程（不在录音时调用）"""
+        if self.config['engine_process'] and self.engine_host is None:
+            try:
+                self.engine_host = EngineHost()
+            except Exception as e:
+                print(f"启动引擎进程失败，改为在界面进程中运行: {e}")
+        elif not self.config['engine_process'] and self.engine_host:
+            self.engine_host.close()
+            self.engine_host = None
+            self.engine_usage_label.setText("")
+
+    def update_engine_usage(self):
+        """显示引擎进程自身上报的 CPU 和内存占用，以及录音中的音频缓冲区状态"""
+        parts = []
+        host = self.engine_host
+        if host is not None:
+            parts.append(f"引擎进程 {host.pid or '启动中'}")
+            if host.cpu_percent is not None:
+                parts.append(f"CPU {host.cpu_percent:.0f}%")
+            if host.rss_mb is not None:
+                parts.append(f"内存 {host.rss_mb:.0f} MB")
+            if host.restarts:
+                parts.append(f"已重启 {host.restarts} 次")
+        thread = self.transcription_thread
+        if thread and thread.is_recording:
+            metrics = thread.ring_metrics()
+            if metrics:
+                parts.append(format_ring_metrics(metrics))
+        self.engine_usage_label.setText(" · ".join(parts))
+
+    def apply_engine_profile(self, profile):
+        """套用调优结果：模型和相关性能参数"""
+        settings = engine_profile_settings(profile)
+        self.model_combo.setCurrentText(settings.pop('model'))
+        self.config.update(settings)
+
+    def record_profile_overrides(self, *args):
+        """用户手动修改了调优过的设置时记入调优结果，之后启动时保留这些修改"""
+        profile = load_engine_profile(self.config['device'])
+        if not profile:
+            return
+        current = dict(self.config, model=self.model_combo.currentText())
+        overrides = {
+            key: current[key]
+            for key in TUNED_KEYS if current[key] != profile[key]
         }
-        self.transcription_thread = None
+        if overrides != profile.get('overrides', {}):
+            profile['overrides'] = overrides
+            try:
+                save_engine_profile(profile)
+            except OSError as e:
+                print(f"保存调优结果失败: {e}")
+
+    def start_engine_tuning(self):
+        """在后台测量候选设置并选出满足延迟目标的设置，期间暂停录音"""
+        if getattr(self, 'tune_thread', None) and self.tune_thread.isRunning():
+            return
+        sample = calibration_sample()
+        if sample is None:
+            path, _ = QFileDialog.getOpenFileName(self, "选择校准录音（真实语音）", "",
+                                                  "音频文件 (*.wav *.flac)")
+            if not path:
+                return
+            sample = (path, None)
+
+        self.record_button.setEnabled(False)
+        self.config_button.setEnabled(False)
+        self.tune_thread = TuneThread(sample, self.config['device'],
+                                      self.config['post_speech_silence_duration'],
+                                      self.config['latency_target'],
+                                      self.config['cpu_threads'],
+                                      self.model_combo.currentText())
+        self.tune_thread.progress_signal.connect(self.status_label.setText)
+        self.tune_thread.finished_signal.connect(self.on_tuning_finished)
+        self.tune_thread.start()
+
+    def on_tuning_finished(self, profile):
+        self.record_button.setEnabled(True)
+        self.config_button.setEnabled(True)
+        if not profile:
+            self.status_label.setText("❌ 自动调优失败，保留当前设置")
+            return
+        self.apply_engine_profile(profile)
+        met = "" if profile['met_target'] else "（未达到目标，已选最快设置）"
+        self.status_label.setText(
+            f"✅ 调优完成：{profile['model']} / {profile['compute_type']} / "
+            f"beam {profile['beam_size']}，预计延迟 "
+            f"{profile['expected_latency']:.1f}秒{met}")
+        self.preload_recorder()
+
+    def on_engine_failed(self, error):
+        self.engine_error = error
+        self.status_label.setText(f"❌ 识别引擎加载失败: {error}")
+        self.engine_failed_signal.emit(error)
+
+    def paintEvent(self, event):
+        if self.first_paint_at is None:
+            self.first_paint_at = time.perf_counter()
+        super().paintEvent(event)
 
     def init_log_file(self):
         try:
-            # 如果日志文件不存在，创建新的日志文件
-            if not os.path.exists(LOG_FILE):
-                with open(LOG_FILE, "w", encoding="utf-8") as f:
-                    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    f.write("# 🎙️ 语音转写记录\n\n")
-                    f.write(f"## 📝 会话信息\n\n")
-                    f.write(f"- 📅 **开始时间**：{current_time}\n")
-                    f.write("## 📄 转写内容\n\n")
-
-            # 添加新的会话分隔线
-            with open(LOG_FILE, "a", encoding="utf-8") as f:
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                f.write(f"\n### 🆕 新会话 `{current_time}`\n\n")
-                f.write(f"- 🤖 **模型**：`{self.model_combo.currentText()}`\n")
-                f.write(f"- 🌐 **语言**：`{self.language_combo.currentText()}`\n")
-                f.write(f"- ⚡ **设备**：`{self.config['device']}`\n")
-                f.write(f"- 🎯 **精度**：`{self.config['compute_type']}`\n")
-                f.write(
-                    f"- 🔄 **翻译**：{'启用' if self.config['enable_translation'] else '禁用'}\n\n"
-                )
+            # 添加新的会话分隔线，文件头由日志存储在新建分段时写入
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.log_writer.begin_session(
+                current_time, f"\n### 🆕 新会话 `{current_time}`\n\n"
+                f"- 🤖 **模型**：`{self.model_combo.currentText()}`\n"
+                f"- 🌐 **语言**：`{self.language_combo.currentText()}`\n"
+                f"- ⚡ **设备**：`{self.config['device']}`\n"
+                f"- 🎯 **精度**：`{self.config['compute_type']}`\n"
+                f"- 🔄 **翻译**：{'启用' if self.config['enable_translation'] else '禁用'}\n\n"
+            )
 
         except Exception as e:
             print(f"初始化日志文件失败: {e}")
@@ -585,6 +5212,8 @@ class MainWindow(QMainWindow):
         self.status_label.setObjectName("status_label")
         status_layout.addWidget(self.status_label)
         status_layout.addStretch()
+        self.engine_usage_label = QLabel("")
+        status_layout.addWidget(self.engine_usage_label)
         layout.addLayout(status_layout)
 
         # 模型选择
@@ -611,6 +5240,21 @@ class MainWindow(QMainWindow):
         language_layout.addStretch()
         layout.addLayout(language_layout)
 
+        # 输入来源
+        source_layout = QHBoxLayout()
+        source_label = QLabel("输入来源:")
+        self.source_combo = QComboBox()
+        self.source_combo.addItems(list(INPUT_SOURCES))
+        self.source_button = MaterialButton("选择文件", "secondary")
+        self.source_path_label = QLabel("")
+        source_layout.addWidget(source_label)
+        source_layout.addWidget(self.source_combo)
+        source_layout.addWidget(self.source_button)
+        source_layout.addWidget(self.source_path_label)
+        source_layout.addStretch()
+        layout.addLayout(source_layout)
+        self.on_source_changed(self.source_combo.currentText())
+
         # 实时转写选项
         self.realtime_checkbox = QCheckBox("启用实时转写")
         self.realtime_checkbox.setChecked(True)
@@ -620,8 +5264,12 @@ class MainWindow(QMainWindow):
         button_layout = QHBoxLayout()
         self.record_button = MaterialButton("开始录音", "primary")
         self.config_button = MaterialButton("配置", "secondary")
+        self.latency_button = MaterialButton("延迟统计", "secondary")
+        self.search_button = MaterialButton("历史搜索", "secondary")
         button_layout.addWidget(self.record_button)
         button_layout.addWidget(self.config_button)
+        button_layout.addWidget(self.latency_button)
+        button_layout.addWidget(self.search_button)
         button_layout.addStretch()
         layout.addLayout(button_layout)
 
@@ -641,20 +5289,112 @@ class MainWindow(QMainWindow):
         self.realtime_text.setMinimumHeight(100)
         layout.addWidget(realtime_label)
         layout.addWidget(self.realtime_text)
+        self.realtime_renderer = RealtimeRenderer(self.realtime_text)
+
+        # 推测译文：说话过程中显示已稳定部分的译文
+        self.speculative_label = QLabel("实时译文:")
+        self.speculative_text = QLabel("")
+        self.speculative_text.setWordWrap(True)
+        self.speculative_text.setTextInteractionFlags(
+            Qt.TextSelectableByMouse)
+        layout.addWidget(self.speculative_label)
+        layout.addWidget(self.speculative_text)
+        self.speculative_translator = SpeculativeTranslator(
+            self.config['speculative_agreement'], self)
+        self.speculative_translator.text_changed.connect(
+            self.speculative_text.setText)
+        self.apply_speculative_config()
 
         # 完整转写显示
         complete_label = QLabel("完整转写:")
-        self.complete_text = QTextEdit()
-        self.complete_text.setReadOnly(True)
+        # 列表视图只布局可见行，内存中的句子数有上限
+        self.complete_model = TranscriptModel(
+            self.config['view_max_segments'], parent=self)
+        self.complete_text = QListView()
+        self.complete_text.setModel(self.complete_model)
+        self.complete_text.setWordWrap(True)
+        self.complete_text.setUniformItemSizes(False)
+        self.complete_text.setLayoutMode(QListView.Batched)
+        self.complete_text.setBatchSize(50)
+        self.complete_text.setResizeMode(QListView.Adjust)
+        self.complete_text.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.complete_text.setSelectionMode(QListView.NoSelection)
         self.complete_text.setMinimumHeight(200)
+        self.complete_text.verticalScrollBar().valueChanged.connect(
+            self.on_complete_scrolled)
         layout.addWidget(complete_label)
         layout.addWidget(self.complete_text)
 
         return card
 
     def setup_signals(self):
+        self.translation_signal.connect(self.complete_model.set_translation)
         self.record_button.clicked.connect(self.toggle_recording)
         self.config_button.clicked.connect(self.show_config_dialog)
+        self.latency_button.clicked.connect(self.show_latency_dialog)
+        self.search_button.clicked.connect(self.show_search_dialog)
+        # 用键盘或滚轮快速切换选项时只预加载最后停留的选择
+        self.preload_timer = QTimer(self)
+        self.preload_timer.setSingleShot(True)
+        self.preload_timer.setInterval(PRELOAD_DEBOUNCE_MS)
+        self.preload_timer.timeout.connect(self.preload_recorder)
+        self.model_combo.currentTextChanged.connect(self.schedule_preload)
+        # activated 只在用户选择时发出，套用调优结果时不会记为手动修改
+        self.model_combo.activated.connect(self.record_profile_overrides)
+        self.language_combo.currentTextChanged.connect(self.schedule_preload)
+        self.language_combo.currentTextChanged.connect(self.preload_furigana)
+        self.realtime_checkbox.toggled.connect(self.schedule_preload)
+        self.source_combo.currentTextChanged.connect(self.on_source_changed)
+        self.source_button.clicked.connect(self.choose_input_file)
+        self.preload_recorder()
+
+    def on_source_changed(self, source):
+        """选择音频文件来源时显示文件选择按钮"""
+        use_file = INPUT_SOURCES.get(source) is not None
+        self.source_button.setVisible(use_file)
+        self.source_path_label.setVisible(use_file)
+        if use_file and not self.input_paths and self.isVisible():
+            self.choose_input_file()
+
+    def choose_input_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择音频文件", "",
+                                              "音频文件 (*.wav *.flac)")
+        if path:
+            self.set_input_paths([path])
+
+    def set_input_paths(self, paths, pace=None):
+        """设置音频文件输入来源（文件或目录）；pace 为 realtime/fast 时同时切换来源"""
+        self.input_paths = list(paths)
+        self.source_path_label.setText(", ".join(
+            os.path.basename(os.path.normpath(p)) for p in self.input_paths))
+        if pace:
+            for name, source_pace in INPUT_SOURCES.items():
+                if source_pace == pace:
+                    self.source_combo.setCurrentText(name)
+
+    def preload_furigana(self, language):
+        """首次选择日语时在后台加载注音引擎"""
+        if language == "日语 (Japanese)":
+            self.thread_pool.start(FuriganaLoadWorker())
+
+    def schedule_preload(self, *args):
+        """选项变化后重新计时，停留 PRELOAD_DEBOUNCE_MS 后才预加载"""
+        self.preload_timer.start()
+
+    def preload_recorder(self, *args):
+        """在后台预加载当前选择的模型，开始录音时即可直接复用"""
+        if not self.engine_ready or not self.config.get('preload_model'):
+            return
+        model = self.model_combo.currentText()
+        language = self.language_combo.currentText()
+        enable_realtime = self.realtime_checkbox.isChecked()
+        key = make_recorder_key(model, language, self.config, enable_realtime)
+        recorder_kwargs = build_recorder_kwargs(model, language, self.config)
+        if self.engine_host:
+            self.engine_host.send('preload', key, recorder_kwargs)
+            return
+        worker = PreloadWorker(key, recorder_kwargs)
+        self.thread_pool.start(worker)
 
     def toggle_recording(self):
         if not self.transcription_thread or not self.transcription_thread.is_recording:
@@ -664,24 +5404,36 @@ class MainWindow(QMainWindow):
 
     def start_recording(self):
         """开始录音"""
+        pace = INPUT_SOURCES[self.source_combo.currentText()]
+        source = None
+        if pace:
+            source = AudioFileSource(self.input_paths, pace)
+            if not source.files:
+                self.status_label.setText("请先选择 WAV/FLAC 音频文件")
+                if self.autorun:
+                    print(f"未找到音频文件: {self.input_paths}")
+                    self.close()
+                return
         try:
             self.current_realtime_text = ""
+            self.realtime_renderer.reset()
+            self.speculative_translator.clear()
+            self.speculative_translator.reset_stats()
             self.status_label.setText("正在初始化...")
             self.status_label.setProperty("status", "recording")
+            TRANSLATION_CACHE.reset_stats()
 
-            # 异步记录开始新的录音会话
-            current_time = datetime.now().strftime("%H:%M:%S")
-            log_content = (
-                f"\n### 🎬 录音开始 `{current_time}`\n\n"
-                "当前会话配置：\n"
-                f"- 🤖 **模型**：`{self.model_combo.currentText()}`\n"
-                f"- 🌐 **语言**：`{self.language_combo.currentText()}`\n"
-                f"- ⚡ **设备**：`{self.config['device']}`\n"
-                f"- 🎯 **精度**：`{self.config['compute_type']}`\n"
-                f"- 🎤 **灵敏度**：`{self.config['silero_sensitivity']}`\n"
-                f"- ⏱️ **静音检测**：`{self.config['post_speech_silence_duration']}秒`\n\n"
-            )
-            self.async_log(log_content)
+            # 异步记录开始新的录音会话，并登记到会话索引
+            session = self.make_session_record(source)
+            started_at = session['started_at']
+            log_content = render_session_header(session)
+
+            def begin_session():
+                self.log_writer.begin_session(started_at, log_content,
+                                              'recording', session['session'])
+                self.log_writer.record(session)
+
+            self.translation_pipeline.call_in_order(begin_session)
 
             # 禁用控件
             self.record_button.setText("停止录音")
@@ -689,12 +5441,22 @@ class MainWindow(QMainWindow):
             self.model_combo.setEnabled(False)
             self.language_combo.setEnabled(False)
             self.realtime_checkbox.setEnabled(False)
+            self.source_combo.setEnabled(False)
+            self.source_button.setEnabled(False)
             self.config_button.setEnabled(False)
 
-            # 创建并配置转录线程
-            self.transcription_thread = TranscriptionThread(
-                model=self.model_combo.currentText(),
-                enable_realtime=self.realtime_checkbox.isChecked())
+            # 创建并配置转录线程（启用引擎进程时只在本进程转发结果）
+            if self.engine_host:
+                self.transcription_thread = RemoteTranscriptionThread(
+                    self.engine_host,
+                    model=self.model_combo.currentText(),
+                    enable_realtime=self.realtime_checkbox.isChecked(),
+                    source=source)
+            else:
+                self.transcription_thread = TranscriptionThread(
+                    model=self.model_combo.currentText(),
+                    enable_realtime=self.realtime_checkbox.isChecked(),
+                    source=source)
             self.transcription_thread.language = self.language_combo.currentText(
             )
             self.transcription_thread.config = self.config.copy()  # 使用配置的副本
@@ -707,6 +5469,8 @@ class MainWindow(QMainWindow):
             self.transcription_thread.finished_signal.connect(
                 self.on_recording_finished)
             self.transcription_thread.status_signal.connect(self.update_status)
+            self.transcription_thread.language_signal.connect(
+                self.on_language_detected)
 
             # 启动线程
             self.transcription_thread.is_recording = True
@@ -720,6 +5484,8 @@ class MainWindow(QMainWindow):
             self.model_combo.setEnabled(True)
             self.language_combo.setEnabled(True)
             self.realtime_checkbox.setEnabled(True)
+            self.source_combo.setEnabled(True)
+            self.source_button.setEnabled(True)
             self.config_button.setEnabled(True)
             self.status_label.setText("准备就绪")
             self.status_label.setProperty("status", "")
@@ -735,18 +5501,48 @@ class MainWindow(QMainWindow):
     def on_recording_finished(self):
         try:
             if self.current_realtime_text:
-                # 异步记录最后的实时转写结果
-                self.async_log(f"> {self.current_realtime_text}\n\n")
+                # 异步记录最后的实时转写结果（未完成的句子，不翻译）
+                segment = self.make_segment_record(self.current_realtime_text,
+                                                   self.speech_started_at,
+                                                   None,
+                                                   final=False)
+                self.translation_pipeline.call_in_order(
+                    lambda: self.log_segment(segment))
+
+            # 等剩余翻译输出（最多等待排空时间）后再添加结束标记和统计信息
+            thread = self.transcription_thread
+            self.compute_share = thread.compute_share()
+            stats = {
+                'received': self.realtime_renderer.received,
+                'rendered': self.realtime_renderer.rendered,
+                'compute_share': self.compute_share,
+                'ring': thread.ring_metrics()
+            }
+            if self.config['speculative_translation']:
+                stats['speculative'] = self.speculative_translator.stats()
+            if thread.source:
+                stats['fed_seconds'] = thread.source.fed_seconds
+                stats['source_finished'] = thread.source_finished
+            end = {
+                'type': 'end',
+                'session': self.session_id,
+                'ended_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'end': round(time.monotonic() - self.session_origin, 3),
+                'segments': self.segment_seq,
+                'stats': stats
+            }
+
+            def write_footer():
+                stats['cache'] = TRANSLATION_CACHE.stats()
+                self.write_log(render_session_end(end))
+                self.log_writer.record(end)
+                self.log_writer.sync()
 
-            # 异步添加结束标记和统计信息
-            current_time = datetime.now().strftime("%H:%M:%S")
-            log_content = (f"\n### 🏁 录音结束 `{current_time}`\n\n"
-                           "会话统计：\n"
-                           f"- ⏱️ **结束时间**：`{current_time}`\n"
-                           "---\n\n")
-            self.async_log(log_content)
+            self.translation_pipeline.call_in_order(
+                write_footer, timeout=self.config['translation_drain_timeout'])
 
             self.current_realtime_text = ""
+            self.speculative_translator.clear()
         except Exception as e:
             print(f"写入会话结束信息失败: {e}")
 
@@ -756,81 +5552,124 @@ class MainWindow(QMainWindow):
         self.model_combo.setEnabled(True)
         self.language_combo.setEnabled(True)
         self.realtime_checkbox.setEnabled(True)
+        self.source_combo.setEnabled(True)
+        self.source_button.setEnabled(True)
         self.config_button.setEnabled(True)
         self.status_label.setText("准备就绪")
         self.status_label.setProperty("status", "")
 
+        # 自动运行时音频文件送完即退出
+        if self.autorun and self.transcription_thread.source_finished:
+            self.close()
+
     def update_realtime_text(self, text):
         if text:
             try:
-                # 更新界面显示
-                self.realtime_text.setText(text)
-                self.realtime_text.verticalScrollBar().setValue(
-                    self.realtime_text.verticalScrollBar().maximum())
+                # 更新界面显示（按帧合并）
+                self.realtime_renderer.submit(text)
 
                 # 更新当前实时转写文本
                 self.current_realtime_text = text
+
+                # 推测翻译已稳定的前缀
+                languages = self.translation_languages()
+                if self.config['speculative_translation'] and languages:
+                    self.speculative_translator.update(
+                        text, *languages, self.config['translation_backend'])
             except Exception as e:
                 print(f"更新实时文本失败: {e}")
 
-    def update_complete_text(self, text):
+    def translation_languages(self):
+        """当前设置下翻译的 (源语言, 目标语言)，不需要翻译时返回 None"""
+        if (not self.config['enable_translation'] or
+                self.language_combo.currentText() == "中文 (Chinese)"):
+            return None
+        return (BAIDU_FROM_LANG.get(self.language_combo.currentText(), "auto"),
+                BAIDU_TO_LANG.get(self.config['target_language'], "zh"))
+
+    def apply_speculative_config(self):
+        visible = bool(self.config['speculative_translation'])
+        self.speculative_label.setVisible(visible)
+        self.speculative_text.setVisible(visible)
+        self.speculative_translator.agreement = self.config[
+            'speculative_agreement']
+
+    def on_complete_scrolled(self, value):
+        """滚动到顶部时从磁盘读回更早的句子，回到底部时回收内存"""
+        scroll_bar = self.complete_text.verticalScrollBar()
+        if value == scroll_bar.minimum() and self.complete_model.can_page_back():
+            count = self.complete_model.page_back()
+            # 保持原来第一行的位置，避免视图跳动
+            self.complete_text.scrollTo(self.complete_model.index(count),
+                                        QListView.PositionAtTop)
+        elif value >= scroll_bar.maximum() - 4:
+            self.complete_model.trim()
+
+    def update_complete_text(self, text, speech_end=None):
         if text and text != self.current_realtime_text:  # 避免重复记录
+            LATENCY.record('signal_delivered', speech_end)
             try:
                 current_time = datetime.now().strftime("%H:%M:%S")
-                formatted_text = f"[{current_time}] {text}\n"
-
-                # 更新界面显示
-                self.complete_text.append(formatted_text)
-                self.complete_text.verticalScrollBar().setValue(
-                    self.complete_text.verticalScrollBar().maximum())
-
-                # 异步写入日志（对日语文本添加注音）
-                log_content = f"> {text}\n"
-                self.async_log(log_content, add_furigana=True)
-
-                # 如果需要翻译，异步执行翻译
-                if self.config[
-                        'enable_translation'] and self.language_combo.currentText(
-                        ) != "中文 (Chinese)":
-                    from_lang = {
-                        "英语 (English)": "en",
-                        "日语 (Japanese)": "jp",
-                        "韩语 (Korean)": "kor",
-                        "俄语 (Russian)": "ru",
-                        "德语 (German)": "de",
-                        "法语 (French)": "fra",
-                        "西班牙语 (Spanish)": "spa",
-                        "自动检测": "auto"
-                    }.get(self.language_combo.currentText(), "auto")
-
-                    to_lang = {
-                        "中文": "zh",
-                        "英语": "en",
-                        "日语": "jp",
-                        "韩语": "kor",
-                        "俄语": "ru",
-                        "德语": "de",
-                        "法语": "fra",
-                        "西班牙语": "spa"
-                    }.get(self.config['target_language'], "zh")
-
-                    def on_translation_complete(translated_text):
-                        # 异步写入翻译结果
-                        translation_content = f"> 🔄 译文：{translated_text}\n\n"
-                        self.async_log(translation_content)
-
-                    worker = TranslationWorker(text, from_lang, to_lang,
-                                               on_translation_complete)
-                    self.thread_pool.start(worker)
+
+                # 更新界面显示；用户向上翻看历史时不自动滚动，也暂不回收内存
+                scroll_bar = self.complete_text.verticalScrollBar()
+                at_bottom = scroll_bar.value() >= scroll_bar.maximum() - 4
+                segment_index = self.complete_model.append_segment(
+                    current_time, text, trim=at_bottom)
+                if at_bottom:
+                    self.complete_text.scrollToBottom()
+                LATENCY.record('gui_append', speech_end)
+
+                def on_log_written(written_at):
+                    LATENCY.record('log_write', speech_end, written_at)
+
+                segment = self.make_segment_record(text,
+                                                   self.speech_started_at,
+                                                   speech_end)
+
+                # 如果需要翻译，原文和译文按顺序一起写入日志
+                languages = self.translation_languages()
+                if languages:
+                    from_lang, to_lang = languages
+
+                    def on_preview(translated_text, complete):
+                        # 整句译文到达前先显示推测译文，到达后被替换
+                        if segment['translation_status'] is not None:
+                            return
+                        if complete:
+                            LATENCY.record('translation_preview', speech_end)
+                        self.translation_signal.emit(
+                            segment_index,
+                            translated_text if complete else translated_text + "…")
+
+                    if self.config['speculative_translation']:
+                        self.speculative_translator.finish(text, on_preview)
+
+                    def on_translation_result(translated_text, status,
+                                              completed_at):
+                        segment['target_language'] = to_lang
+                        segment['translation_status'] = status
+                        segment['translation'] = (translated_text
+                                                  if status == 'ok' else None)
+                        if status == 'ok':
+                            LATENCY.record('translation_done', speech_end,
+                                           completed_at)
+                            self.translation_signal.emit(
+                                segment_index, translated_text)
+                        self.log_segment(segment, on_log_written)
+
+                    self.translation_pipeline.submit(
+                        text, from_lang, to_lang, on_translation_result,
+                        self.config['translation_backend'])
                 else:
-                    # 如果不需要翻译，直接添加换行
-                    self.async_log("\n")
+                    self.translation_pipeline.call_in_order(
+                        lambda: self.log_segment(segment, on_log_written))
 
             except Exception as e:
                 print(f"更新完整文本失败: {e}")
 
     def show_config_dialog(self):
-        dialog = ConfigDialog(self)
+        dialog = ConfigDialog(self, model=self.model_combo.currentText())
         # 加载当前配置到对话框
         dialog.silero_sensitivity.setValue(self.config['silero_sensitivity'])
         dialog.silence_duration.setValue(
@@ -841,81 +5680,898 @@ class MainWindow(QMainWindow):
             self.config['realtime_processing_pause'])
         dialog.device_combo.setCurrentText(self.config['device'])
         dialog.compute_type_combo.setCurrentText(self.config['compute_type'])
+        dialog.cpu_threads.setValue(self.config['cpu_threads'])
+        dialog.num_workers.setValue(self.config['num_workers'])
+        dialog.latency_target.setValue(self.config['latency_target'])
+        dialog.realtime_model_combo.setCurrentIndex(
+            dialog.realtime_model_combo.findData(self.config['realtime_model']))
+        dialog.beam_size_realtime.setValue(self.config['beam_size_realtime'])
+        dialog.engine_process.setChecked(self.config['engine_process'])
+        dialog.audio_buffer_seconds.setValue(
+            self.config['audio_buffer_seconds'])
+        dialog.audio_overflow_policy.setCurrentIndex(
+            dialog.audio_overflow_policy.findData(
+                self.config['audio_overflow_policy']))
+        if self.compute_share:
+            realtime_share, final_share = self.compute_share
+            dialog.compute_share_label.setText(
+                f"算力占比（上次录音）：实时模型 {realtime_share:.0%}，"
+                f"主模型 {final_share:.0%}")
+        dialog.pool_memory.setValue(self.config['recorder_pool_memory_mb'])
+        dialog.preload_model.setChecked(self.config['preload_model'])
+        dialog.view_max_segments.setValue(self.config['view_max_segments'])
         dialog.enable_trans.setChecked(self.config['enable_translation'])
+        dialog.translation_backend.setCurrentIndex(
+            dialog.translation_backend.findData(
+                self.config['translation_backend']))
+        dialog.local_translation_dir.setText(
+            self.config['local_translation_dir'])
+        dialog.local_translation_threads.setValue(
+            self.config['local_translation_threads'])
+        dialog.update_local_pairs()
+        dialog.speculative_translation.setChecked(
+            self.config['speculative_translation'])
+        dialog.speculative_agreement.setValue(
+            self.config['speculative_agreement'])
         dialog.baidu_appid.setText(self.config['baidu_appid'])
         dialog.baidu_key.setText(self.config['baidu_key'])
+        dialog.baidu_qps.setValue(self.config['baidu_qps'])
+        dialog.trans_concurrency.setValue(
+            self.config['translation_concurrency'])
+        dialog.trans_deadline.setValue(self.config['translation_deadline'])
+        dialog.fsync_policy.setCurrentIndex(
+            dialog.fsync_policy.findData(self.config['log_fsync_policy']))
+        dialog.fsync_interval.setValue(self.config['log_fsync_interval'])
+        dialog.log_rotation.setCurrentIndex(
+            dialog.log_rotation.findData(self.config['log_rotation']))
+        dialog.log_segment_mb.setValue(self.config['log_max_segment_mb'])
+        dialog.log_retention.setValue(self.config['log_retention_days'])
+        dialog.log_compress.setChecked(self.config['log_compress'])
+        dialog.metrics_textfile.setText(self.config['metrics_textfile'])
         dialog.target_lang.setCurrentText(self.config['target_language'])
 
         if dialog.exec_() == QDialog.Accepted:
             new_config = dialog.get_config()
 
-            # 确保 CPU 设备使用 float32 精度
-            if new_config['device'] == 'cpu' and new_config[
-                    'compute_type'] != 'float32':
+            # 确保精度是所选设备支持的
+            if new_config['compute_type'] not in DEVICE_COMPUTE_TYPES.get(
+                    new_config['device'], ["float32"]):
                 new_config['compute_type'] = 'float32'
 
             # 记录配置变更
             try:
-                with open(LOG_FILE, "a", encoding="utf-8") as f:
-                    current_time = datetime.now().strftime("%H:%M:%S")
-                    f.write(f"\n### ⚙️ 配置更新 `{current_time}`\n\n")
-
-                    # 检查并记录变更的配置项
-                    changes = []
-                    for key, new_value in new_config.items():
-                        old_value = self.config.get(key)
-                        if new_value != old_value:
-                            if key in ['baidu_appid', 'baidu_key']:
-                                changes.append(f"- {key}: `[已修改]`")
-                            else:
-                                changes.append(
-                                    f"- {key}: `{old_value}` → `{new_value}`")
-
-                    if changes:
-                        f.write("变更项：\n")
-                        f.write("\n".join(changes))
-                        f.write("\n\n---\n\n")
-                    else:
-                        f.write("配置未发生变更\n\n---\n\n")
+                current_time = datetime.now().strftime("%H:%M:%S")
+                log_content = f"\n### ⚙️ 配置更新 `{current_time}`\n\n"
+
+                # 检查并记录变更的配置项
+                changes = []
+                for key, new_value in new_config.items():
+                    old_value = self.config.get(key)
+                    if new_value != old_value:
+                        if key in ['baidu_appid', 'baidu_key']:
+                            changes.append(f"- {key}: `[已修改]`")
+                        else:
+                            changes.append(
+                                f"- {key}: `{old_value}` → `{new_value}`")
+
+                if changes:
+                    log_content += "变更项：\n" + "\n".join(
+                        changes) + "\n\n---\n\n"
+                else:
+                    log_content += "配置未发生变更\n\n---\n\n"
+                self.async_log(log_content)
             except Exception as e:
                 print(f"写入配置更新日志失败: {e}")
 
             # 更新配置
+            if new_config['device'] != self.config['device']:
+                self.device_configured = True
             self.config.update(new_config)
-            # 更新全局翻译配置
-            global BAIDU_APPID, BAIDU_KEY
-            BAIDU_APPID = self.config['baidu_appid']
-            BAIDU_KEY = self.config['baidu_key']
-
-    def update_status(self, status):
-        """更新状态显示"""
-        self.status_label.setText(status)
-        # 根据不同状态设置不同的属性
-        if "录音" in status:
-            self.status_label.setProperty("status", "recording")
-        elif "转录" in status:
-            self.status_label.setProperty("status", "transcribing")
-        elif "监听" in status:
-            self.status_label.setProperty("status", "listening")
-        else:
-            self.status_label.setProperty("status", "")
+            self.apply_speculative_config()
+            # 更新翻译客户端配置
+            configure_translators(self.config)
+            self.translation_pipeline.configure(
+                self.config['translation_concurrency'],
+                self.config['translation_queue_size'],
+                self.config['translation_deadline'])
+            self.log_writer.configure(self.config['log_fsync_policy'],
+                                      self.config['log_fsync_interval'])
+            self.log_writer.store.configure(self.config['log_rotation'],
+                                            self.config['log_max_segment_mb'],
+                                            self.config['log_retention_days'],
+                                            self.config['log_compress'])
+            self.log_writer.segments.retention_days = self.config[
+                'log_retention_days']
+
+            RECORDER_POOL.set_memory_limit(
+                self.config['recorder_pool_memory_mb'])
+            self.complete_model.max_segments = self.config['view_max_segments']
+            self.complete_model.trim()
+            if self.engine_ready:
+                self.update_engine_host()
+            self.preload_recorder()
+            self.record_profile_overrides()
+            if dialog.retune_requested:
+                self.start_engine_tuning()
+
+    def update_status(self, state, changed_at=None):
+        """更新状态显示，仅在样式属性变化时重新应用样式"""
+        if state == 'recording':
+            self.speech_started_at = changed_at  # 当前句语音开始的时间
+        text, status = RECORDER_STATES.get(state, (state, ""))
+        self.status_label.setText(text)
+        self.state_changed_at = changed_at
+
+        if self.status_label.property("status") != status:
+            self.status_label.setProperty("status", status)
+            # 强制更新样式
+            self.status_label.style().unpolish(self.status_label)
+            self.status_label.style().polish(self.status_label)
+
+    def on_language_detected(self, language):
+        self.detected_language = language
+
+    def make_session_record(self, source):
+        """开始新会话：生成会话 ID 和会话记录（语言、输入来源和引擎设置）"""
+        self.session_id = new_session_id()
+        self.session_origin = time.monotonic()
+        self.segment_seq = 0
+        self.speech_started_at = None
+        self.detected_language = None
+        model = self.model_combo.currentText()
+        language_name = self.language_combo.currentText()
+        settings = {
+            name: self.config[name]
+            for name in ('beam_size', 'beam_size_realtime', 'device',
+                         'compute_type', 'cpu_threads', 'num_workers',
+                         'silero_sensitivity', 'post_speech_silence_duration',
+                         'min_length_of_recording', 'realtime_processing_pause',
+                         'enable_translation', 'translation_backend',
+                         'speculative_translation', 'target_language')
+        }
+        settings['model'] = model
+        settings['realtime_model'] = self.config['realtime_model'] or model
+        settings['realtime'] = self.realtime_checkbox.isChecked()
+        return {
+            'type': 'session',
+            'session': self.session_id,
+            'started_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'wall_time': time.time(),
+            'language': LANGUAGE_MAP.get(language_name),
+            'language_name': language_name,
+            'input': self.source_combo.currentText(),
+            'files': source.files if source else [],
+            'settings': settings
+        }
+
+    def make_segment_record(self, text, speech_start, speech_end, final=True):
+        """一句转写的结构化记录；时间为相对会话开始的秒数"""
+        def offset(at):
+            if at is None or self.session_origin is None:
+                return None
+            return round(at - self.session_origin, 3)
+
+        self.segment_seq += 1
+        return {
+            'type': 'segment',
+            'session': self.session_id,
+            'seq': self.segment_seq,
+            'start': offset(speech_start),
+            'end': offset(speech_end),
+            'text': text,
+            'language': LANGUAGE_MAP.get(self.language_combo.currentText())
+            or self.detected_language,
+            'final': final,
+            'translation': None,
+            'translation_status': None,
+            'target_language': None
+        }
 
-        # 强制更新样式
-        self.status_label.style().unpolish(self.status_label)
-        self.status_label.style().polish(self.status_label)
+    def log_segment(self, segment, on_written=None):
+        """写入一句：Markdown 由结构化记录渲染，两者按同一顺序交给写入线程"""
+        self.write_log(f"> {segment['text']}\n", segment['language'] == 'ja',
+                       on_written)
+        self.write_log(render_translation(segment))
+        self.log_writer.record(segment, self.search_index.request_update)
 
-    def async_log(self, content, add_furigana=False):
-        """异步写入日志"""
+    def async_log(self, content, add_furigana=False, on_written=None):
+        """异步写入日志，与翻译流水线的输出保持先后顺序"""
         # 仅当选择日语且内容是实际转写文本时添加注音
         should_add_furigana = (add_furigana
                                and self.language_combo.currentText()
                                == "日语 (Japanese)" and content.startswith(">"))
-        worker = LogWorker(content, should_add_furigana)
-        self.thread_pool.start(worker)
+        self.translation_pipeline.call_in_order(
+            lambda: self.write_log(content, should_add_furigana, on_written))
+
+    def write_log(self, content, add_furigana=False, on_written=None):
+        """交给日志写入线程，注音在写入线程中完成"""
+        self.log_writer.write(content, add_furigana
+                              and content.startswith(">"), on_written)
+
+    def metrics_labels(self):
+        """延迟统计的标签，便于按模型和解码参数对比"""
+        return {
+            'model': self.model_combo.currentText(),
+            'beam_size': self.config['beam_size'],
+            'compute_type': self.config['compute_type'],
+            'device': self.config['device']
+        }
+
+    def show_search_dialog(self):
+        if self.search_dialog is None:
+            self.search_dialog = SearchDialog(self.search_index, self)
+        self.search_dialog.show()
+        self.search_dialog.raise_()
+
+    def show_latency_dialog(self):
+        if self.latency_dialog is None:
+            self.latency_dialog = LatencyDialog(self.metrics_labels, self)
+        self.latency_dialog.show()
+        self.latency_dialog.raise_()
+
+    def export_metrics(self):
+        """按配置定期导出延迟统计，供外部采集"""
+        path = self.config['metrics_textfile']
+        if not path:
+            return
+        try:
+            LATENCY.export(path, self.metrics_labels())
+        except Exception as e:
+            print(f"导出延迟统计失败: {e}")
+
+    def closeEvent(self, event):
+        """退出时停止录音并释放常驻模型"""
+        if self.transcription_thread and self.transcription_thread.is_recording:
+            self.transcription_thread.stop_recording()
+            self.transcription_thread.wait(3000)
+
+        # 等剩余翻译写入日志后关闭日志文件
+        drained = threading.Event()
+        self.translation_pipeline.call_in_order(
+            drained.set, timeout=self.config['translation_drain_timeout'])
+        drained.wait(self.config['translation_drain_timeout'] + 1)
+        if getattr(self, 'tune_thread', None) and self.tune_thread.isRunning():
+            # 取消在当前转写的下一段结果处生效；加载模型等无法中断的步骤不等待
+            self.tune_thread.cancel()
+            if not self.tune_thread.wait(5000):
+                print("自动调优未能及时停止，随进程退出")
+        self.log_writer.close()
+        self.search_index.close()
+        TRANSLATION_CACHE.flush()
+        self.complete_model.spill.close()
+        self.export_metrics()
+        if self.engine_host:
+            self.engine_host.close()
+
+        RECORDER_POOL.shutdown()
+        super().closeEvent(event)
+
+
+# 多客户端转写服务的帧格式：1 字节类型 + 4 字节大端长度 + 负载
+FRAME_HEADER = struct.Struct(">cI")
+FRAME_JSON = b'J'  # UTF-8 JSON 消息（客户端的 hello、服务端的事件）
+FRAME_AUDIO = b'A'  # 16 kHz 单声道 int16 PCM
+FRAME_END = b'E'  # 客户端音频结束
+MAX_FRAME_BYTES = 1 << 20
+
+
+def send_frame(sock, kind, payload):
+    sock.sendall(FRAME_HEADER.pack(kind, len(payload)) + payload)
+
+
+def recv_frame(stream):
+    """从 makefile('rb') 得到的流中读取一帧，连接关闭时返回 (None, None)"""
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None, None
+    kind, length = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"帧过大: {length}")
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None, None
+    return kind, payload
+
+
+class SharedEngine:
+    """所有会话共享的一份 faster_whisper 模型
+
+    每个会话同一时刻最多一个推理任务在执行，保证结果按顺序返回；工作线程按
+    会话轮转取任务、整句优先于实时预览，单个客户端无法独占模型。
+    """
+
+    def __init__(self,
+                 model,
+                 device='cpu',
+                 compute_type='int8',
+                 beam_size=3,
+                 cpu_threads=0,
+                 workers=2,
+                 max_pending=4):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model,
+                                  device=device,
+                                  compute_type=compute_type,
+                                  cpu_threads=cpu_threads,
+                                  num_workers=workers)
+        self.beam_size = beam_size
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        # 会话 -> {'final': deque, 'partial': 待处理的预览音频, 'busy': bool}
+        self._sessions = OrderedDict()
+        self._closed = False
+        for _ in range(workers):
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def register(self, session):
+        with self._cond:
+            self._sessions[session] = {
+                'final': deque(),
+                'partial': None,
+                'busy': False
+            }
+
+    def unregister(self, session):
+        with self._cond:
+            self._sessions.pop(session, None)
+
+    def submit_final(self, session, segment_id, audio):
+        """提交整句；超出会话队列上限时丢弃最早的一句并返回其编号"""
+        with self._cond:
+            state = self._sessions.get(session)
+            if state is None:
+                return None
+            dropped = None
+            if len(state['final']) >= self.max_pending:
+                dropped = state['final'].popleft()[0]
+            state['final'].append((segment_id, audio))
+            # 整句已提交，同一句的预览没有必要再做
+            state['partial'] = None
+            self._cond.notify()
+            return dropped
+
+    def submit_partial(self, session, segment_id, audio):
+        """提交实时预览，只保留每个会话最新的一份"""
+        with self._cond:
+            state = self._sessions.get(session)
+            if state is not None:
+                state['partial'] = (segment_id, audio)
+                self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return sum(len(s['final']) for s in self._sessions.values())
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _next_job(self):
+        """按会话轮转取下一个任务（需持有锁）"""
+        for kind in ('final', 'partial'):
+            for session, state in self._sessions.items():
+                if state['busy']:
+                    continue
+                if kind == 'final' and state['final']:
+                    job = state['final'].popleft()
+                elif kind == 'partial' and state['partial']:
+                    job, state['partial'] = state['partial'], None
+                else:
+                    continue
+                state['busy'] = True
+                # 轮转：刚被服务的会话移到末尾
+                self._sessions.move_to_end(session)
+                return session, kind, job
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                task = self._next_job()
+                while task is None and not self._closed:
+                    self._cond.wait()
+                    task = self._next_job()
+                if task is None:
+                    return
+            session, kind, (segment_id, audio) = task
+            text = ""
+            try:
+                segments, _ = self.model.transcribe(
+                    audio,
+                    language=session.language_code,
+                    beam_size=self.beam_size if kind == 'final' else 1,
+                    without_timestamps=True)
+                text = "".join(segment.text for segment in segments).strip()
+            except Exception as e:
+                print(f"会话 {session.name} 转写失败: {e}")
+            with self._cond:
+                state = self._sessions.get(session)
+                if state:
+                    state['busy'] = False
+                self._cond.notify()
+            session.on_result(kind, segment_id, text)
+
+
+class ServerSession:
+    """一个客户端连接：自己的 VAD 状态、语言和翻译设置，推理交给共享模型"""
+
+    FRAME_SECONDS = 0.03  # webrtcvad 帧长
+    FRAME_BYTES = 960  # 30 ms × 16 kHz × 2 字节
+    PREROLL_FRAMES = 10  # 语音开始前保留的帧数
+
+    def __init__(self, server, sock, name, hello):
+        import webrtcvad
+
+        self.server = server
+        self.sock = sock
+        self.name = name
+        config = server.config
+        self.language = resolve_language(hello.get('language', "自动检测"))
+        self.language_code = LANGUAGE_MAP.get(self.language)
+        self.translate = bool(hello.get('translate', False))
+        self.to_lang = BAIDU_TO_LANG.get(
+            hello.get('target_language', config['target_language']), "zh")
+        self.from_lang = BAIDU_FROM_LANG.get(self.language, "auto")
+        self.silence_duration = float(
+            hello.get('post_speech_silence_duration',
+                      config['post_speech_silence_duration']))
+        self.partial_interval = config['realtime_processing_pause']
+        self.max_segment_seconds = config['server_max_segment_seconds']
+        self.vad = webrtcvad.Vad(int(hello.get('vad_mode', 2)))
+        self._send_lock = threading.Lock()
+        self._pending = bytearray()  # 不足一帧的剩余音频
+        self._preroll = deque(maxlen=self.PREROLL_FRAMES)
+        self._segment = None  # 当前句的音频，None 表示不在语音中
+        self._silence = 0.0
+        self._since_partial = 0.0
+        self.segment_id = 0
+        self.speech_end = {}  # 句子编号 -> 语音结束时间
+        # 尚未返回的翻译：读取线程加入，翻译回调线程移除，需加锁
+        self._translations = set()
+        self._translations_lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def translating(self):
+        """尚未返回的翻译数"""
+        with self._translations_lock:
+            return len(self._translations)
+
+    def feed(self, pcm):
+        """按 30 ms 帧做 VAD，静音超过设定时长时切出一句"""
+        self._pending.extend(pcm)
+        while len(self._pending) >= self.FRAME_BYTES:
+            frame = bytes(self._pending[:self.FRAME_BYTES])
+            del self._pending[:self.FRAME_BYTES]
+            self._process_frame(frame)
+
+    def _process_frame(self, frame):
+        speech = self.vad.is_speech(frame, 16000)
+        if self._segment is None:
+            self._preroll.append(frame)
+            if speech:
+                self.segment_id += 1
+                self._segment = bytearray(b"".join(self._preroll))
+                self._preroll.clear()
+                self._silence = 0.0
+                self._since_partial = 0.0
+            return
+
+        self._segment.extend(frame)
+        self._silence = 0.0 if speech else self._silence + self.FRAME_SECONDS
+        self._since_partial += self.FRAME_SECONDS
+        seconds = len(self._segment) / 32000
+        if (self._silence >= self.silence_duration
+                or seconds >= self.max_segment_seconds):
+            self.finish_segment()
+        elif self._since_partial >= self.partial_interval:
+            self._since_partial = 0.0
+            self.server.engine.submit_partial(self, self.segment_id,
+                                              self._audio(self._segment))
+
+    def finish_segment(self):
+        if self._segment is None:
+            return
+        segment, self._segment = self._segment, None
+        # 太短的片段多为噪声，不做转写
+        if len(segment) / 32000 - self._silence < 0.3:
+            return
+        self.speech_end[self.segment_id] = time.monotonic()
+        dropped = self.server.engine.submit_final(self, self.segment_id,
+                                                  self._audio(segment))
+        if dropped is not None:
+            self.dropped += 1
+            self.speech_end.pop(dropped, None)
+            self.send({'type': 'dropped', 'segment': dropped})
+
+    @staticmethod
+    def _audio(pcm):
+        import numpy as np
+        return np.frombuffer(bytes(pcm), dtype=np.int16).astype(
+            np.float32) / 32768.0
+
+    def on_result(self, kind, segment_id, text):
+        if kind == 'partial':
+            if text and segment_id == self.segment_id:
+                self.send({
+                    'type': 'partial',
+                    'segment': segment_id,
+                    'text': text
+                })
+            return
+
+        # 翻译登记之后才移出 speech_end，断开前的等待不会在两者之间漏掉这一句
+        try:
+            self._on_final(segment_id, text)
+        finally:
+            self.speech_end.pop(segment_id, None)
+
+    def _on_final(self, segment_id, text):
+        speech_end = self.speech_end.get(segment_id)
+        latency = (time.monotonic() - speech_end) * 1000 if speech_end else None
+        if not text:
+            return
+        self.send({
+            'type': 'final',
+            'segment': segment_id,
+            'text': text,
+            'latency_ms': latency
+        })
+        if self.translate and self.language != "中文 (Chinese)":
+            future = translate_async(text, self.from_lang, self.to_lang,
+                                     self.server.config['translation_backend'])
+            with self._translations_lock:
+                self._translations.add(future)
+            future.add_done_callback(lambda f: self._send_translation(
+                segment_id, f))
+
+    def _send_translation(self, segment_id, future):
+        try:
+            translated_text = future.result()
+        except Exception as e:
+            print(f"翻译请求失败: {e}")
+            translated_text = None
+        with self._translations_lock:
+            self._translations.discard(future)
+        if translated_text:
+            self.send({
+                'type': 'translation',
+                'segment': segment_id,
+                'text': translated_text
+            })
+
+    def send(self, message):
+        try:
+            with self._send_lock:
+                send_frame(self.sock, FRAME_JSON,
+                           json.dumps(message, ensure_ascii=False).encode())
+        except OSError:
+            pass  # 客户端已断开
+
+
+class TranscriptionRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        server = self.server
+        name = f"{self.client_address[0]}:{self.client_address[1]}"
+        stream = self.request.makefile('rb')
+        session = None
+        try:
+            kind, payload = recv_frame(stream)
+            if kind != FRAME_JSON:
+                return
+            if not server.admit():
+                send_frame(
+                    self.request, FRAME_JSON,
+                    json.dumps({
+                        'type': 'error',
+                        'error': 'busy'
+                    }).encode())
+                return
+            try:
+                session = ServerSession(server, self.request, name,
+                                        json.loads(payload))
+            except Exception as e:
+                server.leave()
+                send_frame(
+                    self.request, FRAME_JSON,
+                    json.dumps({
+                        'type': 'error',
+                        'error': str(e)
+                    }, ensure_ascii=False).encode())
+                return
+
+            server.engine.register(session)
+            print(f"会话接入: {name}（{session.language}）")
+            session.send({'type': 'ready', 'session': name})
+            while True:
+                kind, payload = recv_frame(stream)
+                if kind == FRAME_AUDIO:
+                    session.feed(payload)
+                elif kind == FRAME_END or kind is None:
+                    break
+            session.finish_segment()
+            # 等本会话剩余的整句转写和翻译完成后再断开
+            deadline = time.monotonic() + server.config['translation_deadline']
+            while ((session.speech_end or session.translating)
+                   and time.monotonic() < deadline):
+                time.sleep(0.05)
+            session.send({'type': 'end', 'dropped': session.dropped})
+        except (OSError, ValueError) as e:
+            print(f"会话 {name} 连接错误: {e}")
+        finally:
+            if session:
+                server.engine.unregister(session)
+                server.leave()
+                print(f"会话断开: {name}")
+
+
+class TranscriptionServer(socketserver.ThreadingTCPServer):
+    """多客户端转写服务：所有会话共享一份常驻模型，超过会话上限时拒绝接入"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, engine, config, max_sessions=8):
+        super().__init__(address, TranscriptionRequestHandler)
+        self.engine = engine
+        self.config = config
+        self.max_sessions = max_sessions
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def admit(self):
+        with self._lock:
+            if self.sessions >= self.max_sessions:
+                return False
+            self.sessions += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.sessions -= 1
+
+
+def run_server(args):
+    """无界面运行多客户端转写服务"""
+    config = dict(DEFAULT_CONFIG,
+                  device=args.device,
+                  compute_type=args.compute_type,
+                  beam_size=args.beam_size,
+                  target_language=args.target_language,
+                  **translator_config(args))
+    configure_translators(config)
+    print(f"正在加载模型 {args.model}/{args.compute_type}...")
+    engine = SharedEngine(args.model,
+                          device=args.device,
+                          compute_type=args.compute_type,
+                          beam_size=args.beam_size,
+                          cpu_threads=args.cpu_threads,
+                          workers=args.server_workers,
+                          max_pending=args.session_queue)
+    server = TranscriptionServer((args.host, args.port),
+                                 engine,
+                                 config,
+                                 max_sessions=args.max_sessions)
+    print(f"转写服务已启动: {args.host}:{args.port}（最多 {args.max_sessions} 个会话，"
+          f"{args.server_workers} 个推理线程）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        engine.close()
+        TRANSLATION_CACHE.flush()
+    return 0
+
+
+def run_startup_report():
+    """以 -X importtime 启动一次界面，汇总导入耗时、首次绘制和引擎就绪时间"""
+    cmd = [
+        sys.executable, "-X", "importtime",
+        os.path.abspath(__file__), "--startup-probe"
+    ]
+    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+
+    # 只统计顶层包：名称前只有 -X importtime 输出的一个空格
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            imports.append((int(cumulative), name.strip()))
+
+    print("导入耗时（累计，前 15 个顶层模块）：")
+    for cumulative, name in sorted(imports, reverse=True)[:15]:
+        print(f"  {cumulative / 1000:9.1f} ms  {name}")
+
+    timings = None
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP "):
+            # 其他线程的输出可能接在同一行之后，只解析第一个 JSON 对象
+            timings = json.JSONDecoder().raw_decode(line[len("STARTUP "):])[0]
+    if not timings:
+        print("未获取到启动计时：")
+        print(proc.stdout + proc.stderr[-2000:])
+        return 1
+    print("启动计时（自模块开始导入起）：")
+    for label, key in (("界面模块导入", 'imports_ms'), ("窗口创建", 'window_ms'),
+                       ("首次绘制", 'first_paint_ms'), ("识别引擎就绪",
+                                                       'engine_ready_ms')):
+        print(f"  {label}: {timings[key]:.0f} ms")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="RealtimeSTT 实时语音转写工具")
+    parser.add_argument("--batch",
+                        nargs="+",
+                        metavar="PATH",
+                        help="无界面批量转写：目录或通配符匹配的 WAV/FLAC 文件")
+    parser.add_argument("--model", default="tiny", help="批量模式使用的模型")
+    parser.add_argument("--language",
+                        default="自动检测",
+                        type=language_arg,
+                        help="语言名称或代码，如 ja、zh、en")
+    parser.add_argument("--device", default="cpu", help="计算设备 (cpu/cuda)")
+    parser.add_argument("--compute-type",
+                        default=DEFAULT_CONFIG['compute_type'],
+                        help="计算精度")
+    parser.add_argument("--beam-size",
+                        type=int,
+                        default=DEFAULT_CONFIG['beam_size'])
+    parser.add_argument("--workers",
+                        type=int,
+                        default=0,
+                        help="工作进程数（默认 CPU 核数 / 每进程线程数）")
+    parser.add_argument("--cpu-threads",
+                        type=int,
+                        default=4,
+                        help="每个工作进程的推理线程数，0 表示自动")
+    parser.add_argument("--output",
+                        default=os.path.join(LOG_DIR, "batch"),
+                        help="转写结果输出目录")
+    parser.add_argument("--translate",
+                        action="store_true",
+                        help="批量模式下翻译转写结果")
+    parser.add_argument("--list-sessions",
+                        action="store_true",
+                        help="列出日志索引中的会话")
+    parser.add_argument("--read-session",
+                        metavar="TIME",
+                        help="按索引读取一个会话（开始时间或会话 ID），"
+                        "如 \"2024-12-06 10:00:00\"")
+    parser.add_argument("--render-session",
+                        metavar="ID",
+                        help="由结构化记录重新生成一个会话的 Markdown，"
+                        "如 20241206-100000-1a2b")
+    parser.add_argument("--search",
+                        metavar="QUERY",
+                        help="在历史转写（原文和译文）中搜索，空格分隔多个词")
+    parser.add_argument("--startup-report",
+                        action="store_true",
+                        help="打印导入耗时和首次绘制时间报告")
+    parser.add_argument("--startup-probe",
+                        action="store_true",
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--input",
+                        nargs="+",
+                        metavar="PATH",
+                        help="以 WAV/FLAC 文件或目录代替麦克风作为输入来源")
+    parser.add_argument("--pace",
+                        choices=["realtime", "fast"],
+                        default="realtime",
+                        help="音频文件送入速度：实时 / 尽可能快")
+    parser.add_argument("--autorun",
+                        action="store_true",
+                        help="引擎就绪后自动开始转写，音频文件送完后退出")
+    parser.add_argument("--server",
+                        action="store_true",
+                        help="无界面运行多客户端转写服务（TCP）")
+    parser.add_argument("--host", default="127.0.0.1", help="服务监听地址")
+    parser.add_argument("--port", type=int, default=8766, help="服务监听端口")
+    parser.add_argument("--max-sessions",
+                        type=int,
+                        default=8,
+                        help="同时接入的会话上限")
+    parser.add_argument("--session-queue",
+                        type=int,
+                        default=4,
+                        help="每个会话排队等待转写的整句上限")
+    parser.add_argument("--server-workers",
+                        type=int,
+                        default=2,
+                        help="共享模型的并行推理数")
+    parser.add_argument("--translator",
+                        choices=list(TRANSLATORS),
+                        default=DEFAULT_CONFIG['translation_backend'],
+                        help="翻译后端：baidu（在线）/ local（本地离线模型）")
+    parser.add_argument("--baidu-appid", help="百度翻译 API ID（批量模式和服务模式）")
+    parser.add_argument("--baidu-key", help="百度翻译密钥")
+    parser.add_argument("--baidu-qps", type=int, help="百度翻译账户的 QPS 上限")
+    parser.add_argument("--local-translation-dir",
+                        help="本地翻译模型目录（默认 models/translation）")
+    parser.add_argument("--local-translation-threads",
+                        type=int,
+                        help="本地翻译推理线程数，0 表示自动")
+    parser.add_argument("--target-language",
+                        default=DEFAULT_CONFIG['target_language'],
+                        choices=list(BAIDU_TO_LANG),
+                        help="翻译目标语言")
+    # 未识别的参数留给 Qt 处理
+    return parser.parse_known_args(argv)[0]
 
 
 if __name__ == '__main__':
+    args = parse_args()
+    if args.batch:
+        sys.exit(run_batch(args))
+    if args.server:
+        sys.exit(run_server(args))
+    if args.list_sessions:
+        for entry in TranscriptStore(LOG_DIR).sessions():
+            print(f"{entry['start']}  {entry['kind']:<9}  "
+                  f"{entry['file']}@{entry['offset']}  "
+                  f"{entry.get('session', '')}")
+        sys.exit(0)
+    if args.render_session:
+        records = SegmentStore(LOG_DIR).read_session(args.render_session)
+        if not records:
+            print(f"未找到会话: {args.render_session}")
+            sys.exit(1)
+        print(render_markdown(records))
+        sys.exit(0)
+    if args.search:
+        index = TranscriptSearchIndex(SEARCH_INDEX_FILE, LOG_DIR)
+        index.update()
+        for session, seq, at_ms, text, translation in index.search(args.search):
+            when = "-" if at_ms is None else datetime.fromtimestamp(
+                at_ms / 1000).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            print(f"{when}  {session} #{seq}  {text}")
+            if translation:
+                print(f"{' ' * len(when)}  {translation}")
+        sys.exit(0)
+    if args.read_session:
+        content = TranscriptStore(LOG_DIR).read_session(args.read_session)
+        if content is None:
+            print(f"未找到会话: {args.read_session}")
+            sys.exit(1)
+        print(content)
+        sys.exit(0)
+    if args.startup_report:
+        sys.exit(run_startup_report())
+
     app = QApplication(sys.argv)
     window = MainWindow()
+    window_created = time.perf_counter()
+    if args.input:
+        window.set_input_paths(args.input, args.pace)
+        window.model_combo.setCurrentText(args.model)
+        window.language_combo.setCurrentText(resolve_language(args.language))
+        window.autorun = args.autorun
     window.show()
+
+    if args.startup_probe:
+        # 引擎就绪后输出计时并退出，供 --startup-report 汇总
+        def report_startup():
+            first_paint = window.first_paint_at or time.perf_counter()
+            print("STARTUP " + json.dumps({
+                'imports_ms': (_STARTUP_IMPORTED - _STARTUP_T0) * 1000,
+                'window_ms': (window_created - _STARTUP_T0) * 1000,
+                'first_paint_ms': (first_paint - _STARTUP_T0) * 1000,
+                'engine_ready_ms': (time.perf_counter() - _STARTUP_T0) * 1000
+            }), flush=True)
+            window.close()
+
+        # 加载线程的信号经事件循环转到界面线程的 on_engine_failed，再由窗口
+        # 信号转发；窗口信号在事件循环开始前连接，不会错过过早的失败
+        window.engine_ready_signal.connect(report_startup)
+        window.engine_failed_signal.connect(lambda e: window.close())
+        if window.engine_ready:
+            QTimer.singleShot(0, report_startup)
+        elif window.engine_error is not None:
+            QTimer.singleShot(0, window.close)
+
     sys.exit(app.exec_())
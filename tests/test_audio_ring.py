@@ -0,0 +1,123 @@
+"""AudioRingBuffer 的溢出策略与租约安全"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realtime_stt_gui import AudioRingBuffer
+
+
+@pytest.fixture
+def make_ring():
+    rings = []
+
+    def make(capacity=2048, policy='drop_oldest'):
+        ring = AudioRingBuffer(capacity, frame_samples=512, policy=policy)
+        rings.append(ring)
+        return ring
+
+    yield make
+    for ring in rings:
+        ring.stop()
+        ring.close()
+
+
+def ramp(start, n):
+    return np.arange(start, start + n) % 32768
+
+
+def read_all(ring):
+    views = ring.read(timeout=0)
+    data = np.concatenate(views) if views else np.array([], np.int16)
+    ring.consume()
+    return data
+
+
+def test_drop_oldest_keeps_newest(make_ring):
+    ring = make_ring()
+    assert ring.write(ramp(0, 1500)) == 1500
+    assert ring.write(ramp(1500, 1500)) == 1500
+    np.testing.assert_array_equal(read_all(ring), ramp(3000 - 2048, 2048))
+    metrics = ring.metrics()
+    assert metrics['overruns'] == 1
+    assert metrics['dropped_seconds'] == (3000 - 2048) / 16000
+
+
+def test_drop_newest_keeps_oldest(make_ring):
+    ring = make_ring(policy='drop_newest')
+    ring.write(ramp(0, 1500))
+    assert ring.write(ramp(1500, 1500)) == 2048 - 1500
+    np.testing.assert_array_equal(read_all(ring), ramp(0, 2048))
+    assert ring.metrics()['overruns'] == 1
+
+
+def test_block_waits_for_consumer(make_ring):
+    ring = make_ring(policy='block')
+    ring.write(ramp(0, 2048))
+
+    def consume_later():
+        time.sleep(0.1)
+        ring.read(1024)
+        ring.consume()
+
+    thread = threading.Thread(target=consume_later)
+    thread.start()
+    started = time.monotonic()
+    assert ring.write(ramp(2048, 1024)) == 1024
+    assert time.monotonic() - started >= 0.05
+    thread.join()
+    np.testing.assert_array_equal(read_all(ring), ramp(1024, 2048))
+    assert ring.metrics()['overruns'] == 0
+
+
+def test_block_timeout_drops_remainder(make_ring):
+    ring = make_ring(policy='block')
+    ring.write(ramp(0, 2000))
+    assert ring.write(ramp(2000, 100), timeout=0.05) == 48
+    assert ring.metrics()['overruns'] == 1
+
+
+def test_drop_oldest_never_overwrites_leased(make_ring):
+    ring = make_ring()
+    ring.write(ramp(0, 1500))
+    views = ring.read(1000)
+    leased = np.concatenate(views)
+    np.testing.assert_array_equal(leased, ramp(0, 1000))
+
+    # 写满时只能丢弃租出部分之后的数据
+    ring.write(ramp(1500, 1500))
+    np.testing.assert_array_equal(np.concatenate(views), ramp(0, 1000))
+    del views
+    ring.consume()
+    np.testing.assert_array_equal(read_all(ring), ramp(3000 - 1048, 1048))
+    assert ring.fill == 0
+
+
+def test_drop_oldest_with_everything_leased_drops_newest(make_ring):
+    ring = make_ring()
+    ring.write(ramp(0, 2048))
+    views = ring.read()
+    assert ring.write(ramp(2048, 100)) == 0
+    np.testing.assert_array_equal(np.concatenate(views), ramp(0, 2048))
+    del views
+    ring.consume()
+    assert ring.metrics()['overruns'] == 1
+
+
+def test_wrapped_lease_survives_overflow(make_ring):
+    ring = make_ring()
+    ring.write(ramp(0, 1800))
+    read_all(ring)
+    ring.write(ramp(1800, 1000))  # 跨过缓冲区末尾
+    views = ring.read(600)
+    assert len(views) == 2
+    ring.write(ramp(2800, 2000))
+    np.testing.assert_array_equal(np.concatenate(views), ramp(1800, 600))
+    del views
+    ring.consume()
+    np.testing.assert_array_equal(read_all(ring), ramp(4800 - 1448, 1448))
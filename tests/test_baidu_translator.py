@@ -0,0 +1,113 @@
+"""BaiduTranslator：多句合并为多行请求、按行拆回、按错误码重试"""
+import os
+import sys
+import threading
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import realtime_stt_gui as app
+
+
+class FakeResponse:
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """按顺序返回预设的响应，记录每次请求的参数"""
+
+    def __init__(self, responses=None):
+        self.responses = list(responses or [])
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def post(self, url, data, timeout):
+        with self._lock:
+            self.requests.append(data)
+            if self.responses:
+                return FakeResponse(self.responses.pop(0))
+        # 没有预设响应时逐行回显
+        lines = data['q'].split("\n")
+        return FakeResponse({
+            'trans_result': [{
+                'src': line,
+                'dst': f"<{line}>"
+            } for line in lines]
+        })
+
+
+@pytest.fixture
+def make_translator(monkeypatch):
+
+    def make(responses=None, **kwargs):
+        session = FakeSession(responses)
+        monkeypatch.setattr(requests, "Session", lambda: session)
+        kwargs.setdefault('qps', 1000)
+        translator = app.BaiduTranslator("appid", "key", **kwargs)
+        return translator, session
+
+    return make
+
+
+def test_sentences_in_window_share_one_request(make_translator):
+    translator, session = make_translator(coalesce_window=0.2)
+    futures = [translator.translate_async(t) for t in ("one", "two", "three")]
+    assert [f.result(timeout=5) for f in futures] == ["<one>", "<two>", "<three>"]
+    assert len(session.requests) == 1
+    assert session.requests[0]['q'] == "one\ntwo\nthree"
+
+
+def test_language_pairs_are_sent_separately(make_translator):
+    translator, session = make_translator(coalesce_window=0.2)
+    en = translator.translate_async("hello", 'en', 'zh')
+    jp = translator.translate_async("こんにちは", 'jp', 'zh')
+    assert en.result(timeout=5) == "<hello>"
+    assert jp.result(timeout=5) == "<こんにちは>"
+    assert sorted(r['from'] for r in session.requests) == ['en', 'jp']
+
+
+def test_newlines_inside_a_sentence_are_joined(make_translator):
+    translator, session = make_translator()
+    assert translator.translate("a\nb  c") == "<a b c>"
+    assert session.requests[0]['q'] == "a b c"
+
+
+def test_retryable_error_is_retried(make_translator):
+    translator, session = make_translator([{
+        'error_code': '54003',
+        'error_msg': 'Invalid Access Limit'
+    }])
+    assert translator.translate("again") == "<again>"
+    assert len(session.requests) == 2
+
+
+def test_other_errors_are_not_retried(make_translator):
+    translator, session = make_translator([{
+        'error_code': '54001',
+        'error_msg': 'Invalid Sign'
+    }])
+    assert translator.translate("bad") is None
+    assert len(session.requests) == 1
+
+
+def test_line_count_mismatch_fails_whole_batch(make_translator):
+    translator, session = make_translator(
+        [{
+            'trans_result': [{
+                'src': 'x',
+                'dst': 'only one'
+            }]
+        }],
+        coalesce_window=0.2)
+    futures = [translator.translate_async(t) for t in ("x", "y")]
+    assert [f.result(timeout=5) for f in futures] == [None, None]
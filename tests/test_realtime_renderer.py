@@ -0,0 +1,84 @@
+"""RealtimeRenderer：每帧最多渲染一次，只替换变化的后缀"""
+import os
+import sys
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication, QTextEdit
+
+from realtime_stt_gui import RealtimeRenderer
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def renderer(qapp):
+    text_edit = QTextEdit()
+    renderer = RealtimeRenderer(text_edit, frame_interval_ms=50)
+    changes = []
+    text_edit.document().contentsChange.connect(
+        lambda position, removed, added: changes.append(
+            (position, removed, added)))
+    renderer.changes = changes
+    yield renderer
+    renderer.timer.stop()
+    text_edit.deleteLater()
+
+
+def process_events(qapp, seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.005)
+
+
+def test_only_changed_suffix_is_replaced(renderer):
+    renderer.submit("hello wor")
+    renderer.changes.clear()
+    renderer.last_render = 0.0
+    renderer.submit("hello world")
+    assert renderer.text_edit.toPlainText() == "hello world"
+    assert renderer.changes == [(9, 0, 2)]
+
+
+def test_rewritten_tail_replaces_from_divergence(renderer):
+    renderer.submit("the cat sat")
+    renderer.changes.clear()
+    renderer.last_render = 0.0
+    renderer.submit("the car")
+    assert renderer.text_edit.toPlainText() == "the car"
+    assert renderer.changes == [(6, 5, 1)]
+
+
+def test_cursor_positions_count_utf16_units(renderer):
+    renderer.submit("😀今天a")
+    renderer.changes.clear()
+    renderer.last_render = 0.0
+    renderer.submit("😀今天b")
+    assert renderer.text_edit.toPlainText() == "😀今天b"
+    # 😀 占两个 UTF-16 单位
+    assert renderer.changes == [(4, 1, 1)]
+
+
+def test_updates_within_a_frame_are_coalesced(qapp, renderer):
+    renderer.submit("one")
+    renderer.submit("one two")
+    renderer.submit("one two three")
+    assert renderer.text_edit.toPlainText() == "one"
+    process_events(qapp, 0.2)
+    assert renderer.text_edit.toPlainText() == "one two three"
+    assert (renderer.received, renderer.rendered) == (3, 2)
+
+
+def test_unchanged_text_is_not_rendered(renderer):
+    renderer.submit("same")
+    renderer.last_render = 0.0
+    renderer.submit("same")
+    assert renderer.rendered == 1
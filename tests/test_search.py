@@ -0,0 +1,109 @@
+"""历史搜索：CJK 二字词切分、FTS5 查询构造和增量索引"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import realtime_stt_gui as app
+
+
+def test_cjk_runs_expand_to_bigrams_with_tail():
+    assert app.cjk_bigrams("今天天气").split() == ["今天", "天天", "天气", "气"]
+    assert app.cjk_bigrams("今天天气", tail=False).split() == [
+        "今天", "天天", "天气"
+    ]
+
+
+def test_latin_text_is_kept_and_runs_are_separated():
+    assert app.cjk_bigrams("GPU很快ok").split() == ["GPU", "很快", "快", "ok"]
+    assert app.cjk_bigrams("hello world") == "hello world"
+
+
+def test_kana_and_hangul_are_cjk():
+    assert app.cjk_bigrams("ありがとう", tail=False).split() == [
+        "あり", "りが", "がと", "とう"
+    ]
+    assert app.cjk_bigrams("안녕", tail=False).split() == ["안녕"]
+
+
+def test_fts_query_terms():
+    assert app.fts_query("天气 GPU") == '"天气" AND "GPU"'
+    # 单字用前缀匹配
+    assert app.fts_query("天") == '"天"*'
+    assert app.fts_query('say "hi"') == '"say" AND """hi"""'
+    assert app.fts_query("   ") == ""
+
+
+@pytest.fixture
+def index(tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    index = app.TranscriptSearchIndex(str(tmp_path / "search.sqlite3"),
+                                      str(logs))
+    yield index, logs / f"{app.SEGMENT_FILE_PREFIX}20241206.jsonl"
+    index.close()
+
+
+def write_records(path, *records):
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def segment(seq, text, translation=None, start=1.0):
+    return {
+        'type': 'segment',
+        'session': "s1",
+        'seq': seq,
+        'start': start,
+        'text': text,
+        'translation': translation
+    }
+
+
+def test_index_and_search(index):
+    index, path = index
+    write_records(path, {
+        'type': 'session',
+        'session': "s1",
+        'wall_time': 1000.0
+    }, segment(1, "今天天气很好", "The weather is nice today", start=2.5),
+                  segment(2, "明天会下雨", "It will rain tomorrow", start=5.0))
+    assert index.update() == 2
+
+    # 原文中间的任意两个字、单字、译文中的词都能命中
+    assert [r[1] for r in index.search("天气")] == [1]
+    assert [r[1] for r in index.search("好")] == [1]
+    assert [r[1] for r in index.search("rain")] == [2]
+    assert index.search("天气 rain") == []
+    session, seq, at_ms, text, translation = index.search("下雨")[0]
+    assert (session, seq, at_ms, text) == ("s1", 2, 1005000, "明天会下雨")
+
+
+def test_update_only_reads_new_complete_lines(index):
+    index, path = index
+    write_records(path, {
+        'type': 'session',
+        'session': "s1",
+        'wall_time': 1000.0
+    }, segment(1, "第一句"))
+    assert index.update() == 1
+    assert index.update() == 0
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(segment(2, "第二句"), ensure_ascii=False)[:20])
+    assert index.update() == 0
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(segment(2, "第二句"), ensure_ascii=False)[20:] + "\n")
+    assert index.update() == 1
+    assert [r[1] for r in index.search("二句")] == [2]
+
+
+def test_partial_realtime_segments_are_not_indexed(index):
+    index, path = index
+    record = dict(segment(1, "未完成的句子"), final=False)
+    write_records(path, record)
+    assert index.update() == 0
@@ -0,0 +1,127 @@
+"""SegmentStore 读写会话记录，render_markdown 由记录重新生成日志"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import realtime_stt_gui as app
+
+SESSION_ID = "20241206-100000-1a2b"
+
+
+def session_records(session_id=SESSION_ID):
+    settings = {
+        'model': 'small',
+        'beam_size': 3,
+        'realtime_model': 'tiny',
+        'beam_size_realtime': 1,
+        'device': 'cpu',
+        'compute_type': 'int8',
+        'silero_sensitivity': 0.7,
+        'post_speech_silence_duration': 0.5
+    }
+    cache = {
+        'memory_hits': 2,
+        'disk_hits': 1,
+        'merged': 0,
+        'misses': 3,
+        'saved_chars': 40,
+        'saved_seconds': 1.5
+    }
+    return [{
+        'type': 'session',
+        'session': session_id,
+        'started_at': "2024-12-06 10:00:00",
+        'language': 'en',
+        'language_name': "英语 (English)",
+        'input': "音频文件（实时）",
+        'files': ["talk.wav"],
+        'settings': settings
+    }, {
+        'type': 'segment',
+        'session': session_id,
+        'seq': 1,
+        'start': 0.5,
+        'end': 2.25,
+        'text': "Hello there.",
+        'language': 'en',
+        'translation': "你好。",
+        'translation_status': 'ok'
+    }, {
+        'type': 'segment',
+        'session': session_id,
+        'seq': 2,
+        'start': 3.0,
+        'end': 4.0,
+        'text': "Slow one.",
+        'language': 'en',
+        'translation': None,
+        'translation_status': 'timeout'
+    }, {
+        'type': 'end',
+        'session': session_id,
+        'ended_at': "2024-12-06 10:05:00",
+        'end': 300.0,
+        'segments': 2,
+        'stats': {
+            'received': 10,
+            'rendered': 4,
+            'cache': cache
+        }
+    }]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = app.SegmentStore(str(tmp_path))
+    yield store
+    store.close()
+
+
+def test_read_session_returns_only_its_records(store):
+    records = session_records()
+    other = session_records("20241206-100000-ffff")
+    # 两个会话的记录交错写入
+    for mine, theirs in zip(records, other):
+        store.append(mine)
+        store.append(theirs)
+    store.flush()
+    assert store.read_session(SESSION_ID) == records
+
+
+def test_partial_last_line_is_skipped(store, tmp_path):
+    for record in session_records()[:2]:
+        store.append(record)
+    store.close()
+    path = next(tmp_path.glob(f"{app.SEGMENT_FILE_PREFIX}*.jsonl"))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "segment", "sess')
+    assert [r['type'] for r in store.read_session(SESSION_ID)] == [
+        'session', 'segment'
+    ]
+
+
+def test_files_before_the_session_day_are_not_read(store, tmp_path):
+    earlier = tmp_path / f"{app.SEGMENT_FILE_PREFIX}20241205.jsonl"
+    earlier.write_text(json.dumps(session_records()[1]) + "\n",
+                       encoding="utf-8")
+    assert store.read_session(SESSION_ID) == []
+
+
+def test_markdown_round_trip(store):
+    records = session_records()
+    for record in records:
+        store.append(record)
+    store.flush()
+    markdown = app.render_markdown(store.read_session(SESSION_ID))
+    assert markdown == app.render_markdown(records)
+    assert "### 🎬 录音开始 `10:00:00`" in markdown
+    assert "> Hello there.\n> 🔄 译文：你好。\n\n" in markdown
+    assert "> Slow one.\n> 🔄 译文：（翻译超时，已跳过）\n\n" in markdown
+    assert "  - `talk.wav`\n" in markdown
+    assert "### 🏁 录音结束 `10:05:00`" in markdown
+    assert "命中 `3`" in markdown
+    assert markdown.endswith("---\n\n")
@@ -0,0 +1,110 @@
+"""SpeculativeTranslator：稳定前缀按分句送出，改写时回退，整句结束时补齐推测译文"""
+import os
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+
+import realtime_stt_gui as app
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """记录送出的分句，返回由测试手动完成的 Future"""
+    sent = {}
+
+    def translate_async(text, from_lang, to_lang, backend):
+        sent[text] = Future()
+        return sent[text]
+
+    monkeypatch.setattr(app, "translate_async", translate_async)
+    return sent
+
+
+@pytest.fixture
+def translator(qapp, sent):
+    translator = app.SpeculativeTranslator(agreement=2)
+    translator.texts = []
+    translator.text_changed.connect(translator.texts.append)
+    return translator
+
+
+def feed(translator, *texts):
+    for text in texts:
+        translator.update(text, 'en', 'zh', 'baidu')
+
+
+def test_stable_clause_is_sent_once(translator, sent):
+    feed(translator, "Hello world, how")
+    assert sent == {}  # 只有一次结果，尚未稳定
+    feed(translator, "Hello world, how are")
+    assert list(sent) == ["Hello world,"]
+    feed(translator, "Hello world, how are you")
+    assert list(sent) == ["Hello world,"]
+    assert translator.sent == 1
+
+
+def test_translation_is_shown_as_it_arrives(translator, sent):
+    feed(translator, "Hello world, how", "Hello world, how are")
+    assert translator.texts[-1] == "…"
+    sent["Hello world,"].set_result("你好世界，")
+    assert translator.texts[-1] == "你好世界，"
+
+
+def test_rewrite_rolls_back_and_drops_late_result(translator, sent):
+    feed(translator, "Hello world, how", "Hello world, how are")
+    feed(translator, "Yellow world, now", "Yellow world, now we")
+    assert translator.superseded == 1
+    assert list(sent) == ["Hello world,", "Yellow world,"]
+    sent["Hello world,"].set_result("旧的")
+    assert "旧的" not in translator.texts[-1]
+    sent["Yellow world,"].set_result("黄色世界，")
+    assert translator.texts[-1] == "黄色世界，"
+
+
+def test_finish_waits_for_pending_chunks(translator, sent):
+    feed(translator, "One, two, three", "One, two, three four")
+    assert list(sent) == ["One, two,"]
+    results = []
+    translator.finish("One, two,", lambda *args: results.append(args))
+    assert results == []
+    sent["One, two,"].set_result("一，二，")
+    assert results == [("一，二，", True)]
+    assert translator.previews == 1
+
+
+def test_finish_with_longer_final_is_partial(translator, sent):
+    feed(translator, "One, two, three", "One, two, three four")
+    sent["One, two,"].set_result("一，二，")
+    results = []
+    translator.finish("One, two, three four.",
+                      lambda *args: results.append(args))
+    assert results == [("一，二，", False)]
+
+
+def test_finish_with_different_final_discards_speculation(
+        translator, sent):
+    feed(translator, "One, two, three", "One, two, three four")
+    results = []
+    translator.finish("Won, too, tree", lambda *args: results.append(args))
+    sent["One, two,"].set_result("一，二，")
+    assert results == []
+    assert translator.superseded == 1
+    assert translator.texts[-1] == ""
+
+
+def test_long_text_without_punctuation_is_cut_at_a_space(translator, sent):
+    words = "word " * 12
+    feed(translator, words + "tail", words + "tail more")
+    (source, ) = sent
+    assert source == words.strip()
@@ -0,0 +1,51 @@
+"""TranscriptModel 溢出文件：迟到的译文不丢失，遗留文件被清理"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import realtime_stt_gui as app
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "CACHE_DIR", str(tmp_path))
+    model = app.TranscriptModel(max_segments=4, page_size=2)
+    yield model
+    model.clear()
+
+
+def translations(model, count):
+    """读回全部句子，返回各句译文"""
+    while model.can_page_back():
+        model.page_back()
+    return [model.data(model.index(row)) for row in range(count)]
+
+
+def test_translation_for_trimmed_row(model):
+    for i in range(6):
+        model.append_segment("00:00:00", f"s{i}")
+    # 第 0 句已移出内存
+    model.set_translation(0, "t0")
+    assert translations(model, 6)[0].endswith("t0")
+
+
+def test_translation_for_paged_back_row_survives_trim(model):
+    for i in range(6):
+        model.append_segment("00:00:00", f"s{i}")
+    model.page_back()
+    model.set_translation(1, "t1")
+    model.trim()
+    assert translations(model, 6)[1].endswith("t1")
+
+
+def test_remove_stale_spill_files(tmp_path, model):
+    stale = tmp_path / f"{app.SPILL_FILE_PREFIX}999999999.jsonl"
+    stale.write_text("{}\n")
+    own = tmp_path / f"{app.SPILL_FILE_PREFIX}{os.getpid()}.jsonl"
+    own.write_text("{}\n")
+    app.SegmentSpill.remove_stale(str(tmp_path))
+    assert not stale.exists()
+    assert own.exists()
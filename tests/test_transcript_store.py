@@ -0,0 +1,43 @@
+"""TranscriptStore：旧日志导入索引，同一秒开始的会话按 ID 区分"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import realtime_stt_gui as app
+
+LEGACY = """# 🎙️ 语音转写记录
+
+### 🆕 新会话 `2024-05-01 09:00:00`
+第一句
+### 🎬 录音开始 `09:05:00`
+第二句
+"""
+
+
+def test_legacy_transcript_is_indexed(tmp_path):
+    (tmp_path / app.LEGACY_LOG_FILE).write_text(LEGACY, encoding="utf-8")
+    store = app.TranscriptStore(str(tmp_path), compress=False)
+    assert not (tmp_path / app.LEGACY_LOG_FILE).exists()
+    entries = store.sessions()
+    assert [(e['start'], e['kind']) for e in entries] == [
+        ("2024-05-01 09:00:00", 'app'), ("2024-05-01 09:05:00", 'recording')
+    ]
+    assert store.read_session("2024-05-01 09:00:00").rstrip().endswith("第一句")
+    assert store.read_session(entries[1]['session']).rstrip().endswith("第二句")
+
+    # 再次打开不重复导入
+    assert len(app.TranscriptStore(str(tmp_path)).sessions()) == 2
+
+
+def test_sessions_in_same_second_are_distinct(tmp_path):
+    store = app.TranscriptStore(str(tmp_path), compress=False)
+    store.begin_session("2024-05-01 10:00:00", "\n### a\n")
+    store.write("甲\n")
+    store.begin_session("2024-05-01 10:00:00", "\n### b\n")
+    store.write("乙\n")
+    store.close()
+    first, second = store.sessions()
+    assert first['session'] != second['session']
+    assert "乙" in store.read_session(second['session'])
+    assert "乙" not in store.read_session(first['session'])
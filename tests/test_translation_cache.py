@@ -0,0 +1,117 @@
+"""TranslationCache：在途请求合并、内存和磁盘命中、淘汰"""
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import Future
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realtime_stt_gui import TranslationCache
+
+
+class Backend:
+    """记录调用，返回由测试手动完成的 Future"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text, from_lang, to_lang):
+        future = Future()
+        self.calls.append((text, future))
+        return future
+
+    def finish(self, result=None):
+        for text, future in self.calls:
+            if not future.done():
+                future.set_result(result if result is not None else text.upper())
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "translations.sqlite3")
+
+
+def translate(cache, backend, text, namespace=""):
+    return cache.translate_async(text, 'en', 'zh', backend, namespace)
+
+
+def test_inflight_requests_are_merged(path):
+    cache, backend = TranslationCache(path), Backend()
+    first = translate(cache, backend, "Hello world")
+    second = translate(cache, backend, "  hello   WORLD ")
+    assert second is first
+    assert len(backend.calls) == 1
+    backend.finish()
+    assert second.result(timeout=1) == "HELLO WORLD"
+    assert cache.stats()['merged'] == 1
+
+
+def test_memory_and_disk_hits(path):
+    cache, backend = TranslationCache(path), Backend()
+    translate(cache, backend, "good morning")
+    backend.finish()
+    assert translate(cache, backend, "Good morning").result() == "GOOD MORNING"
+    assert cache.stats()['memory_hits'] == 1
+
+    # 新实例只能从磁盘读到
+    other = TranslationCache(path)
+    assert translate(other, backend, "good morning").result() == "GOOD MORNING"
+    assert other.stats()['disk_hits'] == 1
+    assert len(backend.calls) == 1
+
+
+def test_namespaces_are_separate(path):
+    cache, backend = TranslationCache(path), Backend()
+    translate(cache, backend, "cat")
+    backend.finish("baidu")
+    assert translate(cache, backend, "cat", "local").done() is False
+    assert len(backend.calls) == 2
+
+
+def test_failed_translation_is_not_cached(path):
+    cache, backend = TranslationCache(path), Backend()
+    future = translate(cache, backend, "oops")
+    backend.calls[0][1].set_exception(RuntimeError("network"))
+    assert future.result(timeout=1) is None
+    translate(cache, backend, "oops")
+    assert len(backend.calls) == 2
+
+
+def test_memory_lru_is_bounded(path):
+    cache, backend = TranslationCache(path, memory_size=2), Backend()
+    for text in ("a", "b", "c"):
+        translate(cache, backend, text)
+        backend.finish()
+    assert list(key[0] for key in cache._memory) == ["b", "c"]
+
+
+def test_eviction_keeps_most_recently_used(path):
+    cache, backend = TranslationCache(path), Backend()
+    for text in ("one", "two", "three", "four"):
+        translate(cache, backend, text)
+        backend.finish()
+        time.sleep(0.01)
+    # 读到 one 之后它成为最近使用的条目；读取不写库，使用时间在 flush 时写入
+    reader = TranslationCache(path, memory_size=0)
+    translate(reader, backend, "one").result()
+    reader.flush()
+
+    TranslationCache(path, max_entries=2)._connect()
+    db = sqlite3.connect(path)
+    kept = sorted(row[0] for row in db.execute("SELECT text FROM translations"))
+    assert kept == ["four", "one"]
+
+
+def test_expired_entries_are_evicted(path):
+    cache, backend = TranslationCache(path), Backend()
+    translate(cache, backend, "old")
+    backend.finish()
+    db = sqlite3.connect(path)
+    db.execute("UPDATE translations SET last_used = ?",
+               (time.time() - 10 * 86400, ))
+    db.commit()
+    TranslationCache(path, max_age_days=5)._connect()
+    assert db.execute("SELECT COUNT(*) FROM translations").fetchone()[0] == 0
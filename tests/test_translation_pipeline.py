@@ -0,0 +1,106 @@
+"""TranslationPipeline：按提交顺序输出、超时跳过、队列满时丢弃"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import realtime_stt_gui as app
+
+
+@pytest.fixture
+def release():
+    """fake_translate 中以 wait: 开头的句子等到此事件才返回"""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+@pytest.fixture(autouse=True)
+def fake_translate(monkeypatch, release):
+
+    def translate_text(text, from_lang, to_lang, backend):
+        if text.startswith("sleep:"):
+            time.sleep(float(text.split(":")[1]))
+        elif text.startswith("wait:"):
+            release.wait(5)
+        elif text == "fail":
+            return None
+        return text.upper()
+
+    monkeypatch.setattr(app, "translate_text", translate_text)
+
+
+class Collector:
+
+    def __init__(self):
+        self.results = []
+        self.done = threading.Event()
+
+    def callback(self, name):
+        return lambda result, status, completed_at: self.results.append(
+            (name, result, status))
+
+    def wait(self, pipeline, timeout=5):
+        pipeline.call_in_order(self.done.set)
+        assert self.done.wait(timeout)
+        return self.results
+
+
+def submit(pipeline, collector, text):
+    pipeline.submit(text, 'en', 'zh', collector.callback(text))
+
+
+def test_results_follow_submission_order():
+    pipeline, collector = app.TranslationPipeline(), Collector()
+    for text in ("sleep:0.3", "sleep:0.1", "now"):
+        submit(pipeline, collector, text)
+    assert collector.wait(pipeline) == [
+        ("sleep:0.3", "SLEEP:0.3", 'ok'),
+        ("sleep:0.1", "SLEEP:0.1", 'ok'),
+        ("now", "NOW", 'ok'),
+    ]
+
+
+def test_failed_translation_is_reported():
+    pipeline, collector = app.TranslationPipeline(), Collector()
+    submit(pipeline, collector, "fail")
+    assert collector.wait(pipeline) == [("fail", None, 'failed')]
+
+
+def test_overdue_sentence_is_skipped_without_blocking_later_ones(release):
+    pipeline, collector = app.TranslationPipeline(deadline=0.2), Collector()
+    submit(pipeline, collector, "wait:")
+    submit(pipeline, collector, "after")
+    started = time.monotonic()
+    assert collector.wait(pipeline) == [("wait:", None, 'timeout'),
+                                        ("after", "AFTER", 'ok')]
+    assert time.monotonic() - started < 2
+    # 迟到的结果被丢弃，不会再次回调
+    release.set()
+    time.sleep(0.1)
+    assert len(collector.results) == 2
+
+
+def test_full_queue_drops_new_sentences(release):
+    pipeline = app.TranslationPipeline(max_workers=1, max_pending=1)
+    collector = Collector()
+    submit(pipeline, collector, "wait:")
+    submit(pipeline, collector, "extra")
+    release.set()
+    assert collector.wait(pipeline) == [("wait:", "WAIT:", 'ok'),
+                                        ("extra", None, 'dropped')]
+
+
+def test_drain_timeout_bounds_the_wait():
+    pipeline, collector = app.TranslationPipeline(deadline=30), Collector()
+    submit(pipeline, collector, "wait:")
+    drained = threading.Event()
+    started = time.monotonic()
+    pipeline.call_in_order(drained.set, timeout=0.2)
+    assert drained.wait(5)
+    assert time.monotonic() - started < 2
+    assert collector.results == [("wait:", None, 'timeout')]